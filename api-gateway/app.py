@@ -52,6 +52,35 @@ def _forward_json(service_key: str, endpoint: str):
     except requests.exceptions.RequestException as e:
         return jsonify({"error": "service_unavailable", "details": str(e)}), 503
 
+def _forward_get(service_key: str, endpoint: str):
+    url = f"{SERVICE_URLS[service_key].rstrip('/')}/{endpoint.lstrip('/')}"
+    try:
+        r = requests.get(url, timeout=DEFAULT_TIMEOUT)
+        return jsonify(r.json()), r.status_code
+    except ValueError:
+        return jsonify({"error": "backend_error", "details": "invalid JSON from backend"}), 502
+    except requests.exceptions.RequestException as e:
+        return jsonify({"error": "service_unavailable", "details": str(e)}), 503
+
+def _forward_stream(service_key: str, endpoint: str):
+    """Forward a POST whose response is streamed (e.g. NDJSON) without buffering it."""
+    url = f"{SERVICE_URLS[service_key].rstrip('/')}/{endpoint.lstrip('/')}"
+    print(f"[API Gateway] Streaming request to: {url}")
+
+    try:
+        r = requests.post(url, json=(request.get_json(silent=True) or {}), stream=True, timeout=DEFAULT_TIMEOUT)
+    except requests.exceptions.RequestException as e:
+        return jsonify({"error": "service_unavailable", "details": str(e)}), 503
+
+    def relay():
+        try:
+            for chunk in r.iter_content(chunk_size=None):
+                yield chunk
+        finally:
+            r.close()
+
+    return Response(relay(), status=r.status_code, content_type=r.headers.get("Content-Type"))
+
 # ---------- HEALTH ----------
 @app.route("/health", methods=["GET"])
 def health():
@@ -75,6 +104,14 @@ def create_assessment():
 def create_assessment_agent():
     return _forward_json("assessment", "/create-assessment-agent")
 
+@app.route("/api/create-assessment-batch", methods=["POST"])
+def create_assessment_batch():
+    return _forward_stream("assessment", "/create-assessment-batch")
+
+@app.route("/api/grade-submissions", methods=["POST"])
+def grade_submissions():
+    return _forward_json("assessment", "/grade-submissions")
+
 # ---------- PERSONALIZATION ----------
 @app.route("/api/personalize-content", methods=["POST"])
 def personalize_content():
@@ -89,33 +126,98 @@ def personalize_content_agent():
 def summarize_text():
     return _forward_json("summarization", "/summarize-text")
 
+@app.route("/api/summarize-session", methods=["POST"])
+def create_summary_session():
+    return _forward_json("summarization", "/summarize-session")
+
+@app.route("/api/summarize-session/<session_id>/<action>", methods=["POST"])
+def summary_session_action(session_id: str, action: str):
+    if action not in ("append", "refresh"):
+        return jsonify({"error": f"Unknown session action '{action}'"}), 404
+    return _forward_json("summarization", f"/summarize-session/{session_id}/{action}")
+
 # ---------- TRANSLATION ----------
+def _multi_language() -> bool:
+    """Requests with `target_languages` get an NDJSON stream back, one line per language."""
+    return bool((request.get_json(silent=True) or {}).get("target_languages"))
+
 @app.route("/api/localize-text", methods=["POST"])
 def localize_text():
+    if _multi_language():
+        return _forward_stream("translation", "/localize-text")
     return _forward_json("translation", "/localize-text")
 
+@app.route("/api/localize-text-stream", methods=["POST"])
+def localize_text_stream():
+    return _forward_stream("translation", "/localize-text-stream")
+
 @app.route("/api/localize-text-agent", methods=["POST"])
 def localize_text_agent():
+    if _multi_language():
+        return _forward_stream("translation", "/localize-text-agent")
     return _forward_json("translation", "/localize-text-agent")
 
+@app.route("/api/bulk-localization-jobs", methods=["POST"])
+def create_bulk_localization_job():
+    return _forward_json("translation", "/bulk-jobs")
+
+@app.route("/api/bulk-localization-jobs/<job_id>", methods=["GET"])
+def bulk_localization_job_status(job_id: str):
+    return _forward_get("translation", f"/bulk-jobs/{job_id}")
+
+@app.route("/api/bulk-localization-jobs/<job_id>/<action>", methods=["POST"])
+def bulk_localization_job_action(job_id: str, action: str):
+    if action not in ("resume", "cancel"):
+        return jsonify({"error": f"Unknown job action '{action}'"}), 404
+    return _forward_json("translation", f"/bulk-jobs/{job_id}/{action}")
+
 # ---------- MULTIMEDIA ----------
 @app.route("/api/generate-image", methods=["POST"])
 def generate_image():
     return _forward_json("multimedia", "/generate-image")
 
+@app.route("/api/generate-images", methods=["POST"])
+def generate_images():
+    return _forward_stream("multimedia", "/generate-images")
+
+@app.route("/api/media-vectors/bulk", methods=["POST"])
+def bulk_media_vectors():
+    return _forward_stream("multimedia", "/media-vectors/bulk")
+
+@app.route("/api/media-jobs", methods=["POST"])
+def enqueue_media_job():
+    return _forward_json("multimedia", "/jobs")
+
+@app.route("/api/media-jobs/metrics", methods=["GET"])
+def media_job_metrics():
+    return _forward_get("multimedia", "/jobs/metrics")
+
+@app.route("/api/media-jobs/<int:job_id>", methods=["GET"])
+def media_job_status(job_id: int):
+    return _forward_get("multimedia", f"/jobs/{job_id}")
+
 @app.route("/api/media/<int:media_id>", methods=["GET"])
 def media_proxy(media_id: int):
     base = SERVICE_URLS["multimedia"].rstrip("/")
     url = f"{base}/media/{media_id}"
+    # Pass through conditional/range headers so the media service can answer 304/206
+    upstream_headers = {k: v for k, v in request.headers.items()
+                        if k.lower() in ("range", "if-none-match", "if-modified-since", "if-range")}
     try:
-        with requests.get(url, stream=True, timeout=60) as r:
-            headers = {
-                k: v for k, v in r.headers.items()
-                if k.lower() not in ("content-encoding", "content-length", "transfer-encoding", "connection")
-            }
-            return Response(r.iter_content(chunk_size=64 * 1024), status=r.status_code, headers=headers)
+        r = requests.get(url, stream=True, timeout=60, headers=upstream_headers)
     except requests.exceptions.RequestException as e:
         return jsonify({"error": "service_unavailable", "details": str(e)}), 503
+    headers = {
+        k: v for k, v in r.headers.items()
+        if k.lower() not in ("content-encoding", "transfer-encoding", "connection")
+    }
+    if r.headers.get("Content-Encoding"):
+        # iter_content decodes gzip/deflate, so the upstream length no longer applies
+        headers.pop("Content-Length", None)
+    response = Response(r.iter_content(chunk_size=64 * 1024), status=r.status_code, headers=headers)
+    # Keep the upstream connection open until the body has been relayed
+    response.call_on_close(r.close)
+    return response
 
 # ---------- RUN ----------
 if __name__ == "__main__":
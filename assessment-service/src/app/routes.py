@@ -1,10 +1,18 @@
-from flask import Blueprint, request, jsonify
-from .services import generator
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from .services import generator, grading
+from .services.question_bank import question_bank
 from .agents.graph import build_graph
 
 bp = Blueprint("assessment_service", __name__)
 graph = build_graph()
 
+BATCH_MAX_WORKERS = int(os.getenv("ASSESSMENT_BATCH_MAX_WORKERS", "4"))
+BATCH_MAX_ITEMS = int(os.getenv("ASSESSMENT_BATCH_MAX_ITEMS", "200"))
+GRADE_MAX_SUBMISSIONS = int(os.getenv("ASSESSMENT_GRADE_MAX_SUBMISSIONS", "50000"))
+
 @bp.route("/create-assessment", methods=["POST"])
 def create_assessment_legacy():
     data = request.get_json(silent=True) or {}
@@ -13,8 +21,93 @@ def create_assessment_legacy():
     if not content:
         return jsonify({"error": "content is required"}), 400
     try:
-        result = generator.create_advanced_assessment(content, assessment_type)
-        return jsonify({"assessment": result, "type": assessment_type}), 200
+        result = generator.get_or_create_assessment(content, assessment_type)
+        return jsonify({**result, "type": assessment_type}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def _batch_item(index: int, item: dict) -> dict:
+    """Run one batch entry; errors are reported per item instead of failing the batch."""
+    assessment_type = item.get("assessment_type", "multiple_choice")
+    try:
+        result = generator.get_or_create_assessment(item["content"], assessment_type)
+        return {"index": index, **result, "type": assessment_type}
+    except Exception as e:
+        return {"index": index, "error": str(e), "type": assessment_type}
+
+@bp.route("/create-assessment-batch", methods=["POST"])
+def create_assessment_batch():
+    """
+    Generate assessments for many content items concurrently.
+    Expects JSON: { "items": [{"content": "...", "assessment_type": "scenario"}, ...], "max_workers": 4 }
+    Streams one NDJSON line per item, in completion order, tagged with its input index.
+    If the client disconnects, queued items are cancelled rather than generated for nobody.
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "items must be a non-empty list"}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"at most {BATCH_MAX_ITEMS} items per batch"}), 400
+
+    try:
+        max_workers = int(data.get("max_workers", BATCH_MAX_WORKERS))
+    except (TypeError, ValueError):
+        return jsonify({"error": "max_workers must be an integer"}), 400
+    max_workers = max(1, min(max_workers, BATCH_MAX_WORKERS))
+
+    def generate():
+        pending = {}
+        pool = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            for i, item in enumerate(items):
+                content = item.get("content") if isinstance(item, dict) else None
+                if not isinstance(content, str) or not content.strip():
+                    yield json.dumps({"index": i, "error": "content must be a non-empty string"}) + "\n"
+                    continue
+                pending[pool.submit(_batch_item, i, item)] = i
+            for fut in as_completed(pending):
+                yield json.dumps(fut.result()) + "\n"
+        finally:
+            # Don't block the closing generator on work nobody will read
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@bp.route("/grade-submissions", methods=["POST"])
+def grade_submissions():
+    """
+    Grade learner submissions locally against a stored structured assessment.
+    Expects JSON: {
+        "content_hash": "...", "assessment_type": "multiple_choice",   # or "questions": [...]
+        "submissions": [{"submission_id": "u1", "answers": ["B", "C"] or {"<question id>": "B"}}, ...]
+    }
+    MCQ and fill-in-the-blank items are scored; open (scenario) items are reported as ungraded.
+    """
+    data = request.get_json(silent=True) or {}
+    submissions = data.get("submissions")
+    if not isinstance(submissions, list) or not submissions:
+        return jsonify({"error": "submissions must be a non-empty list"}), 400
+    if len(submissions) > GRADE_MAX_SUBMISSIONS:
+        return jsonify({"error": f"at most {GRADE_MAX_SUBMISSIONS} submissions per request"}), 400
+
+    questions = data.get("questions")
+    if not questions:
+        content_hash = data.get("content_hash")
+        if not content_hash:
+            return jsonify({"error": "questions or content_hash is required"}), 400
+        stored = question_bank.get_by_hash(content_hash, data.get("assessment_type", "multiple_choice"))
+        if not stored:
+            return jsonify({"error": "assessment not found"}), 404
+        questions = stored["questions"]
+
+    try:
+        grading.validate(questions, submissions)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        return jsonify(grading.grade_submissions(questions, submissions)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -2,7 +2,11 @@ from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
 from langchain_aws import ChatBedrock
 import os
+import re
+import json
+from typing import List, Dict, Any
 from dotenv import load_dotenv
+from .question_bank import question_bank
 
 load_dotenv()
 
@@ -17,6 +21,40 @@ def get_llm():
         }
     )
 
+# A dictionary mapping assessment types to specific, high-quality prompts
+TEMPLATES = {
+    "multiple_choice": """You are an expert quiz designer. Based on the content below, create a 5-question multiple-choice quiz.
+- Each question must have 4 options (A, B, C, D).
+- Only one option should be correct.
+- After all the questions, provide a separate answer key.
+
+Content:
+---
+{content}
+---
+""",
+    "scenario": """You are an expert in instructional design. Based on the content below, create a realistic workplace scenario that tests a user's decision-making and practical application of the knowledge.
+- The scenario should be detailed and plausible.
+- After the scenario, ask a single, clear question about what the user should do next.
+- Finally, provide an 'Ideal Answer' section that explains the best course of action with justifications based on the content.
+
+Content:
+---
+{content}
+---
+""",
+    "fill_in_the_blanks": """You are a meticulous editor. Based on the key concepts in the content below, create a 5-item fill-in-the-blanks quiz.
+- Each item should be a complete sentence with a single blank space represented by '____'.
+- The sentences should test important definitions or process steps.
+- Provide a separate, clearly labeled answer key with the words that fill the blanks.
+
+Content:
+---
+{content}
+---
+"""
+}
+
 def create_advanced_assessment(content: str, assessment_type: str) -> str:
     """
     Generates an assessment of a specified type based on the provided content.
@@ -30,47 +68,177 @@ def create_advanced_assessment(content: str, assessment_type: str) -> str:
     """
     llm = get_llm()
 
-    # A dictionary mapping assessment types to specific, high-quality prompts
-    templates = {
-        "multiple_choice": """You are an expert quiz designer. Based on the content below, create a 5-question multiple-choice quiz.
+    # Select the appropriate template, defaulting to multiple_choice if the type is invalid
+    template = TEMPLATES.get(assessment_type, TEMPLATES["multiple_choice"])
+
+    prompt = PromptTemplate(input_variables=["content"], template=template)
+    
+    # Create and run the LangChain chain
+    chain = LLMChain(llm=llm, prompt=prompt)
+    response = chain.invoke({"content": content})
+    
+    return response['text']
+
+# Structured variants: same tasks, but answers come back as typed JSON items that can be
+# stored in the question bank and graded locally.
+STRUCTURED_TEMPLATES = {
+    "multiple_choice": """You are an expert quiz designer. Based on the content below, create a 5-question multiple-choice quiz.
 - Each question must have 4 options (A, B, C, D).
 - Only one option should be correct.
-- After all the questions, provide a separate answer key.
+
+Return ONLY a JSON object of the form:
+{{"questions": [{{"prompt": "...", "options": {{"A": "...", "B": "...", "C": "...", "D": "..."}}, "answer": "B"}}]}}
 
 Content:
 ---
 {content}
 ---
 """,
-        "scenario": """You are an expert in instructional design. Based on the content below, create a realistic workplace scenario that tests a user's decision-making and practical application of the knowledge.
-- The scenario should be detailed and plausible.
-- After the scenario, ask a single, clear question about what the user should do next.
-- Finally, provide an 'Ideal Answer' section that explains the best course of action with justifications based on the content.
+    "scenario": """You are an expert in instructional design. Based on the content below, create a realistic workplace scenario that tests a user's decision-making and practical application of the knowledge.
+- The scenario should be detailed and plausible and end with a single, clear question about what the user should do next.
+- The answer explains the best course of action with justifications based on the content.
+
+Return ONLY a JSON object of the form:
+{{"questions": [{{"prompt": "<scenario and question>", "answer": "<ideal answer>"}}]}}
 
 Content:
 ---
 {content}
 ---
 """,
-        "fill_in_the_blanks": """You are a meticulous editor. Based on the key concepts in the content below, create a 5-item fill-in-the-blanks quiz.
+    "fill_in_the_blanks": """You are a meticulous editor. Based on the key concepts in the content below, create a 5-item fill-in-the-blanks quiz.
 - Each item should be a complete sentence with a single blank space represented by '____'.
 - The sentences should test important definitions or process steps.
-- Provide a separate, clearly labeled answer key with the words that fill the blanks.
+- List any equally correct alternative answers (synonyms, abbreviations) in "accepted".
+
+Return ONLY a JSON object of the form:
+{{"questions": [{{"prompt": "Sentence with a ____ .", "answer": "word", "accepted": ["alternative"]}}]}}
 
 Content:
 ---
 {content}
 ---
 """
-    }
+}
 
-    # Select the appropriate template, defaulting to multiple_choice if the type is invalid
-    template = templates.get(assessment_type, templates["multiple_choice"])
+_KINDS = {"multiple_choice": "mcq", "fill_in_the_blanks": "fill_blank", "scenario": "open"}
+
+_ANSWER_HEADER = re.compile(r"^[\s#*]*(answer\s*key|answers|ideal\s*answer)\b.*$", re.I | re.M)
+_QUESTION_LINE = re.compile(r"^[\s#*]*(?:q(?:uestion)?\s*)?(\d+)[.):]\**\s+(.*\S)", re.I)
+_OPTION_LINE = re.compile(r"^\s*\(?([A-Da-d])[).:]\s+(.*\S)")
+_ANSWER_LINE = re.compile(r"^[\s*-]*(?:q(?:uestion)?\s*)?(\d+)[.):]*\**\s*(.*\S)", re.I)
+
+def parse_assessment(text: str, assessment_type: str) -> List[Dict[str, Any]]:
+    """
+    Best-effort parse of a generated assessment into question dicts:
+    {"kind": "mcq"|"fill_blank"|"open", "prompt": str, "options": {letter: text},
+     "answer": str, "accepted": [str]}.
+    """
+    text = text or ""
+    header = _ANSWER_HEADER.search(text)
+    body, key = (text[:header.start()], text[header.end():]) if header else (text, "")
+
+    if assessment_type == "scenario":
+        return [{"kind": "open", "prompt": body.strip(), "options": {}, "answer": key.strip(), "accepted": []}]
+
+    kind = "fill_blank" if assessment_type == "fill_in_the_blanks" else "mcq"
+    questions: Dict[int, Dict[str, Any]] = {}
+    current = None
+    for line in body.splitlines():
+        q = _QUESTION_LINE.match(line)
+        if q:
+            current = {"kind": kind, "prompt": q.group(2).strip("* "), "options": {}, "answer": "", "accepted": []}
+            questions[int(q.group(1))] = current
+            continue
+        opt = _OPTION_LINE.match(line)
+        if opt and current is not None:
+            current["options"][opt.group(1).upper()] = opt.group(2).strip()
+
+    for line in key.splitlines():
+        a = _ANSWER_LINE.match(line)
+        if not a or int(a.group(1)) not in questions:
+            continue
+        answer = a.group(2).strip("* ")
+        if kind == "mcq":
+            letter = re.match(r"\(?([A-Da-d])\b", answer)
+            answer = letter.group(1).upper() if letter else answer
+        questions[int(a.group(1))]["answer"] = answer
+
+    return [questions[n] for n in sorted(questions)]
 
+def _parse_structured(text: str, assessment_type: str) -> List[Dict[str, Any]]:
+    """Validate the model's JSON into typed question dicts; raises ValueError if unusable."""
+    match = re.search(r"\{.*\}", text or "", re.S)
+    if not match:
+        raise ValueError("no JSON object in model output")
+    items = json.loads(match.group(0)).get("questions")
+    if not isinstance(items, list) or not items:
+        raise ValueError("model output has no questions")
+
+    kind = _KINDS.get(assessment_type, "mcq")
+    questions = []
+    for item in items:
+        if not isinstance(item, dict) or not item.get("prompt"):
+            continue
+        options = item.get("options") if kind == "mcq" else {}
+        questions.append({
+            "kind": kind,
+            "prompt": str(item["prompt"]).strip(),
+            "options": {str(k).upper(): str(v) for k, v in (options or {}).items()},
+            "answer": str(item.get("answer", "")).strip(),
+            "accepted": [str(a) for a in item.get("accepted") or []] if kind == "fill_blank" else [],
+        })
+    if not questions:
+        raise ValueError("model output has no valid questions")
+    return questions
+
+def render_assessment(questions: List[Dict[str, Any]]) -> str:
+    """Render structured questions as the human-readable text the frontend displays."""
+    if len(questions) == 1 and questions[0]["kind"] == "open":
+        return f"{questions[0]['prompt']}\n\nIdeal Answer:\n{questions[0]['answer']}"
+
+    lines = []
+    for n, q in enumerate(questions, 1):
+        lines.append(f"{n}. {q['prompt']}")
+        lines.extend(f"{k}) {v}" for k, v in q.get("options", {}).items())
+        lines.append("")
+    lines.append("Answer Key:")
+    lines.extend(f"{n}. {q['answer']}" for n, q in enumerate(questions, 1))
+    return "\n".join(lines)
+
+def create_structured_assessment(content: str, assessment_type: str) -> List[Dict[str, Any]]:
+    """
+    Generate an assessment as typed question dicts. Falls back to parsing prose output
+    when the model does not return usable JSON.
+    """
+    template = STRUCTURED_TEMPLATES.get(assessment_type, STRUCTURED_TEMPLATES["multiple_choice"])
     prompt = PromptTemplate(input_variables=["content"], template=template)
-    
-    # Create and run the LangChain chain
-    chain = LLMChain(llm=llm, prompt=prompt)
-    response = chain.invoke({"content": content})
-    
-    return response['text']
+    text = LLMChain(llm=get_llm(), prompt=prompt).invoke({"content": content})["text"]
+    try:
+        return _parse_structured(text, assessment_type)
+    except (ValueError, json.JSONDecodeError) as e:
+        print(f"[Assessment] Structured output rejected ({e}); parsing as prose")
+        return parse_assessment(text, assessment_type)
+
+def get_or_create_assessment(content: str, assessment_type: str) -> Dict[str, Any]:
+    """
+    Serve an assessment from the question bank when the content is unchanged,
+    otherwise generate, store and return it with its structured questions.
+    """
+    cached = question_bank.lookup(content, assessment_type)
+    if cached:
+        return {
+            "assessment": cached["raw_text"],
+            "questions": cached["questions"],
+            "content_hash": cached["content_hash"],
+            "cached": True,
+        }
+
+    questions = create_structured_assessment(content, assessment_type)
+    stored = question_bank.save(content, assessment_type, questions, render_assessment)
+    return {
+        "assessment": stored["raw_text"],
+        "questions": stored["questions"],
+        "content_hash": stored["content_hash"],
+        "cached": False,
+    }
@@ -0,0 +1,127 @@
+import re
+import time
+import unicodedata
+from typing import List, Dict, Any, Union
+import numpy as np
+
+GRADABLE_KINDS = {"mcq", "fill_blank"}
+
+_PUNCT = re.compile(r"[^\w\s]", re.UNICODE)
+_SPACE = re.compile(r"\s+")
+_CHOICE = re.compile(r"^\(?([A-Za-z])(?:[).:]|\s|$)")
+
+# Codes that never match a key entry
+_MISSING = -2
+_PAD = -1
+
+def normalize_text(value: Any) -> str:
+    """Case-fold, strip punctuation and collapse whitespace for fill-in-the-blank matching."""
+    s = unicodedata.normalize("NFKC", str(value or "")).casefold()
+    s = _PUNCT.sub(" ", s)
+    return _SPACE.sub(" ", s).strip()
+
+def normalize_choice(value: Any, options: Dict[str, str]) -> str:
+    """
+    Reduce an MCQ response to an option letter. Accepts "b", "(B)", "B) Paris" or the
+    option text itself ("Paris"); anything else is returned normalized and won't match.
+    """
+    raw = str(value or "").strip()
+    norm = normalize_text(raw)
+    for key, text in options.items():
+        if normalize_text(text) == norm:
+            return key
+    m = _CHOICE.match(raw)
+    letter = m.group(1).upper() if m else ""
+    return letter if letter in options else norm
+
+def _question_key(q: Dict[str, Any]) -> List[str]:
+    if q.get("kind") == "mcq":
+        # A prose-parsed MCQ can come back without an answer; it has no key to grade against
+        key = normalize_choice(q.get("answer", ""), q.get("options") or {})
+        return [key] if key else []
+    accepted = [q.get("answer", "")] + list(q.get("accepted") or [])
+    return [normalize_text(a) for a in accepted if normalize_text(a)]
+
+def _response_for(answers: Union[List[Any], Dict[str, Any]], q: Dict[str, Any], pos: int) -> Any:
+    """Submissions may answer by position (list) or by question id (dict)."""
+    if isinstance(answers, dict):
+        return answers.get(str(q.get("id", pos)), answers.get(str(pos)))
+    return answers[pos] if pos < len(answers) else None
+
+def validate(questions: Any, submissions: Any) -> None:
+    """Check the shapes grade_submissions relies on; raises ValueError with a client-facing message."""
+    if not isinstance(questions, list) or not questions:
+        raise ValueError("questions must be a non-empty list")
+    for i, q in enumerate(questions):
+        if not isinstance(q, dict):
+            raise ValueError(f"question {i} must be an object")
+        if not isinstance(q.get("options") or {}, dict):
+            raise ValueError(f"question {i}: options must be an object")
+        if not isinstance(q.get("accepted") or [], list):
+            raise ValueError(f"question {i}: accepted must be a list")
+    for s, sub in enumerate(submissions):
+        if not isinstance(sub, dict):
+            raise ValueError(f"submission {s} must be an object")
+        if not isinstance(sub.get("answers") or [], (list, dict)):
+            raise ValueError(f"submission {s}: answers must be a list or an object")
+
+def grade_submissions(questions: List[Dict[str, Any]], submissions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Score many submissions against one structured assessment without any LLM calls.
+
+    Responses are normalized and interned to integer codes; correctness is then a single
+    broadcast comparison of an (S, Q) response matrix against a (Q, K) key matrix, where K
+    is the largest number of accepted answers for any question.
+    """
+    started = time.perf_counter()
+    vocab: Dict[str, int] = {}
+    intern = lambda s: vocab.setdefault(s, len(vocab))
+
+    keys = [_question_key(q) if q.get("kind") in GRADABLE_KINDS else [] for q in questions]
+    gradable = np.array([bool(k) for k in keys], dtype=bool)
+    width = max([len(k) for k in keys] + [1])
+    key_codes = np.full((len(questions), width), _PAD, dtype=np.int64)
+    for i, accepted in enumerate(keys):
+        key_codes[i, :len(accepted)] = [intern(a) for a in accepted]
+
+    responses = np.full((len(submissions), len(questions)), _MISSING, dtype=np.int64)
+    for s, sub in enumerate(submissions):
+        answers = sub.get("answers") or []
+        for i, q in enumerate(questions):
+            if not gradable[i]:
+                continue
+            value = _response_for(answers, q, i)
+            if value is None or value == "":
+                continue
+            norm = normalize_choice(value, q.get("options") or {}) if q["kind"] == "mcq" else normalize_text(value)
+            code = vocab.get(norm)
+            if code is not None:
+                responses[s, i] = code
+
+    correct = (responses[:, :, None] == key_codes[None, :, :]).any(axis=2) & gradable[None, :]
+    scores = correct.sum(axis=1)
+    max_score = int(gradable.sum())
+    p_correct = correct.mean(axis=0) if len(submissions) else np.zeros(len(questions))
+
+    return {
+        "results": [
+            {
+                "submission_id": sub.get("submission_id", s),
+                "score": int(scores[s]),
+                "max_score": max_score,
+                "percent": round(100.0 * scores[s] / max_score, 2) if max_score else None,
+                "correct": [bool(c) if gradable[i] else None for i, c in enumerate(correct[s])],
+            }
+            for s, sub in enumerate(submissions)
+        ],
+        "questions": [
+            {
+                "id": q.get("id", i),
+                "kind": q.get("kind"),
+                "gradable": bool(gradable[i]),
+                "p_correct": round(float(p_correct[i]), 4) if gradable[i] else None,
+            }
+            for i, q in enumerate(questions)
+        ],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
@@ -0,0 +1,251 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Any, Callable, Iterator
+import numpy as np
+from langchain_aws import BedrockEmbeddings
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+BANK_PATH = os.getenv("QUESTION_BANK_PATH", os.path.join(_BASE_DIR, "data", "question_bank.db"))
+DUPLICATE_THRESHOLD = float(os.getenv("QUESTION_BANK_DUPLICATE_THRESHOLD", "0.92"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assessments (
+    content_hash TEXT NOT NULL,
+    assessment_type TEXT NOT NULL,
+    raw_text TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (content_hash, assessment_type)
+);
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    assessment_type TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    options TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    accepted TEXT NOT NULL DEFAULT '[]',
+    embedding BLOB,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_questions_type ON questions (assessment_type);
+CREATE TABLE IF NOT EXISTS assessment_questions (
+    content_hash TEXT NOT NULL,
+    assessment_type TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    question_id INTEGER NOT NULL REFERENCES questions (id),
+    PRIMARY KEY (content_hash, assessment_type, position)
+);
+"""
+
+def embeddings():
+    return BedrockEmbeddings(
+        region_name=os.getenv("AWS_REGION", "us-east-1"),
+        model_id=os.getenv("BEDROCK_EMBED_MODEL_ID", "amazon.titan-embed-text-v2:0"),
+    )
+
+def _normalize(value: Any) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip().casefold()
+
+def answer_key(q: Dict[str, Any]) -> tuple:
+    """
+    What a question is graded on: its kind and the text of the correct answer (the option
+    text for MCQs, not the letter). Only questions with the same key can be deduplicated.
+    """
+    answer = q.get("answer", "")
+    if q.get("kind") == "mcq":
+        answer = (q.get("options") or {}).get(answer, answer)
+    return q.get("kind", "open"), _normalize(answer)
+
+def dedup_text(q: Dict[str, Any]) -> str:
+    """Text embedded for the duplicate check: generic stems alone match across lessons."""
+    options = " ".join(f"{k}) {v}" for k, v in sorted((q.get("options") or {}).items()))
+    return f"{q['prompt']}\n{options}\nAnswer: {answer_key(q)[1]}".strip()
+
+def content_hash(content: str) -> str:
+    """Hash lesson content after whitespace normalisation so reformatting doesn't miss the bank."""
+    normalized = re.sub(r"\s+", " ", content or "").strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+class QuestionBank:
+    """
+    SQLite-backed store of parsed assessments.
+
+    Assessments are keyed by (content_hash, assessment_type). Their questions live in a shared
+    table and are deduplicated by embedding similarity, so a paraphrase generated for changed
+    content points at the existing question instead of adding a new row.
+    """
+
+    def __init__(self, path: str = BANK_PATH, duplicate_threshold: float = DUPLICATE_THRESHOLD):
+        self.path = path
+        self.duplicate_threshold = duplicate_threshold
+        self._write_lock = threading.Lock()
+        self._embedder = None
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            # Banks created before fill-in-the-blank support lack the accepted-answers column
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(questions)")}
+            if "accepted" not in columns:
+                conn.execute("ALTER TABLE questions ADD COLUMN accepted TEXT NOT NULL DEFAULT '[]'")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """A connection that commits (or rolls back) on exit and is then closed."""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _embed(self, texts: List[str]) -> Optional[np.ndarray]:
+        """Embed texts as unit vectors; None when embeddings are unavailable."""
+        try:
+            if self._embedder is None:
+                self._embedder = embeddings()
+            vecs = np.asarray(self._embedder.embed_documents(texts), dtype=np.float32)
+        except Exception as e:
+            print(f"[QuestionBank] Embedding failed, skipping duplicate check: {e}")
+            return None
+        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vecs / norms
+
+    @staticmethod
+    def _row_to_question(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "kind": row["kind"],
+            "prompt": row["prompt"],
+            "options": json.loads(row["options"]),
+            "answer": row["answer"],
+            "accepted": json.loads(row["accepted"]),
+        }
+
+    def lookup(self, content: str, assessment_type: str) -> Optional[Dict[str, Any]]:
+        """Return the stored assessment for unchanged content, or None."""
+        return self.get_by_hash(content_hash(content), assessment_type)
+
+    def get_by_hash(self, key: str, assessment_type: str) -> Optional[Dict[str, Any]]:
+        """Return a stored assessment by its content hash, or None."""
+        with self._connect() as conn:
+            head = conn.execute(
+                "SELECT raw_text FROM assessments WHERE content_hash = ? AND assessment_type = ?",
+                (key, assessment_type),
+            ).fetchone()
+            if not head:
+                return None
+            rows = conn.execute(
+                """
+                SELECT q.* FROM assessment_questions aq
+                JOIN questions q ON q.id = aq.question_id
+                WHERE aq.content_hash = ? AND aq.assessment_type = ?
+                ORDER BY aq.position
+                """,
+                (key, assessment_type),
+            ).fetchall()
+        return {
+            "content_hash": key,
+            "raw_text": head["raw_text"],
+            "questions": [self._row_to_question(r) for r in rows],
+        }
+
+    def save(self, content: str, assessment_type: str, questions: List[Dict[str, Any]],
+             render: Callable[[List[Dict[str, Any]]], str]) -> Dict[str, Any]:
+        """
+        Store an assessment and its questions. Each question whose embedding (prompt, options
+        and answer) is within `duplicate_threshold` cosine similarity of an existing one of the
+        same type with the same answer_key is replaced by that stored question (marked
+        `duplicate_of`). The display text is produced by
+        `render` from the final question list so it always matches what gets graded.
+        """
+        key = content_hash(content)
+        new_vecs = self._embed([dedup_text(q) for q in questions]) if questions else None
+        now = time.time()
+
+        with self._write_lock, self._connect() as conn:
+            existing = conn.execute(
+                "SELECT id, kind, options, answer, embedding FROM questions "
+                "WHERE assessment_type = ? AND embedding IS NOT NULL",
+                (assessment_type,),
+            ).fetchall()
+            bank_ids = [r["id"] for r in existing]
+            bank_keys = [answer_key({"kind": r["kind"], "options": json.loads(r["options"]), "answer": r["answer"]})
+                         for r in existing]
+            bank = (np.vstack([np.frombuffer(r["embedding"], dtype=np.float32) for r in existing])
+                    if existing else None)
+
+            conn.execute(
+                "DELETE FROM assessment_questions WHERE content_hash = ? AND assessment_type = ?",
+                (key, assessment_type),
+            )
+
+            stored = []
+            for pos, q in enumerate(questions):
+                vec = new_vecs[pos] if new_vecs is not None else None
+                match_id = None
+                if vec is not None and bank is not None and len(bank_ids):
+                    scores = bank @ vec
+                    # A similar question graded on a different answer is not a duplicate
+                    key_q = answer_key(q)
+                    for best in np.argsort(-scores):
+                        if scores[best] < self.duplicate_threshold:
+                            break
+                        if bank_keys[best] == key_q:
+                            match_id = bank_ids[best]
+                            break
+
+                if match_id is not None:
+                    qid = match_id
+                    row = conn.execute("SELECT * FROM questions WHERE id = ?", (qid,)).fetchone()
+                    entry = {**self._row_to_question(row), "duplicate_of": qid}
+                else:
+                    cur = conn.execute(
+                        "INSERT INTO questions (assessment_type, kind, prompt, options, answer, accepted, embedding, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (assessment_type, q.get("kind", "open"), q["prompt"],
+                         json.dumps(q.get("options", {}), ensure_ascii=False), q.get("answer", ""),
+                         json.dumps(q.get("accepted", []), ensure_ascii=False),
+                         vec.tobytes() if vec is not None else None, now),
+                    )
+                    qid = cur.lastrowid
+                    # Later questions in the same batch are checked against this one too
+                    if vec is not None:
+                        bank = vec[None, :] if bank is None else np.vstack([bank, vec])
+                        bank_ids.append(qid)
+                        bank_keys.append(answer_key(q))
+                    entry = {**q, "id": qid}
+
+                conn.execute(
+                    "INSERT INTO assessment_questions (content_hash, assessment_type, position, question_id) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, assessment_type, pos, qid),
+                )
+                stored.append(entry)
+
+            raw_text = render(stored)
+            conn.execute(
+                "INSERT OR REPLACE INTO assessments (content_hash, assessment_type, raw_text, created_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, assessment_type, raw_text, now),
+            )
+
+        return {"content_hash": key, "raw_text": raw_text, "questions": stored}
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            return {
+                "assessments": conn.execute("SELECT COUNT(*) FROM assessments").fetchone()[0],
+                "questions": conn.execute("SELECT COUNT(*) FROM questions").fetchone()[0],
+            }
+
+# Singleton instance
+question_bank = QuestionBank()
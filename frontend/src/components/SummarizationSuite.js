@@ -1,10 +1,13 @@
 import React, { useState } from 'react';
-import { summarizeText } from '../services/api';
+import { summarizeText, summarizeTextVariants } from '../services/api';
+
+const LENGTHS = ['short', 'medium', 'long'];
 
 const SummarizationSuite = () => {
     const [text, setText] = useState('');
     const [format_type, setFormat] = useState('bulleted list');
     const [length, setLength] = useState('medium');
+    const [allLengths, setAllLengths] = useState(false);
     const [result, setResult] = useState('');
     const [isLoading, setIsLoading] = useState(false);
 
@@ -13,6 +16,15 @@ const SummarizationSuite = () => {
         setIsLoading(true);
         setResult('Summarizing...');
         try {
+            if (allLengths) {
+                // One request reads the text once and returns a summary per length
+                const variants = LENGTHS.map((l) => ({ format_type, length: l }));
+                const response = await summarizeTextVariants(text, variants);
+                const summaries = response.data.summaries || [];
+                setResult(summaries.map((v) => `--- ${v.length} ---\n${v.summary}`).join('\n\n'));
+                return;
+            }
+
             const response = await summarizeText(text, format_type, length);
 
             // Extract summary if response.data is an object
@@ -44,11 +56,19 @@ const SummarizationSuite = () => {
                     <option value="bulleted list">Bulleted List</option>
                     <option value="paragraph">Paragraph</option>
                 </select>
-                <select value={length} onChange={(e) => setLength(e.target.value)}>
+                <select value={length} onChange={(e) => setLength(e.target.value)} disabled={allLengths}>
                     <option value="short">Short</option>
                     <option value="medium">Medium</option>
                     <option value="long">Long</option>
                 </select>
+                <label>
+                    <input
+                        type="checkbox"
+                        checked={allLengths}
+                        onChange={(e) => setAllLengths(e.target.checked)}
+                    />
+                    All lengths
+                </label>
                 <button type="submit" disabled={isLoading}>
                     {isLoading ? 'Summarizing...' : 'Summarize Text'}
                 </button>
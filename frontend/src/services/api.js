@@ -37,6 +37,11 @@ export const summarizeText = (text, format_type, length) => {
   return apiClient.post('/summarize-text', { text, format_type, length });
 };
 
+// variants: [{ format_type, length }, ...] -- all derived from one pass over the text
+export const summarizeTextVariants = (text, variants) => {
+  return apiClient.post('/summarize-text', { text, variants });
+};
+
 export const generateImage = (prompt, image_type = 'general') => {
   return multimediaClient.post('/generate-image', { prompt, image_type });
 };
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import sqlite3
+from typing import Optional, Dict, Any
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+QUEUE_DB_PATH = os.getenv("MM_QUEUE_DB", os.path.join(_BASE_DIR, "data", "jobs.db"))
+VISIBILITY_TIMEOUT = int(os.getenv("MM_QUEUE_VISIBILITY_TIMEOUT", "300"))
+MAX_ATTEMPTS = int(os.getenv("MM_QUEUE_MAX_ATTEMPTS", "3"))
+MAX_DEPTH = int(os.getenv("MM_QUEUE_MAX_DEPTH", "1000"))
+RETRY_BASE_SECONDS = float(os.getenv("MM_QUEUE_RETRY_BASE_SECONDS", "5"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    enqueued_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    claimed_at REAL,
+    claimed_by TEXT,
+    visible_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_claim ON jobs (status, available_at);
+CREATE TABLE IF NOT EXISTS dead_letter (
+    job_id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    error TEXT,
+    failed_at REAL NOT NULL
+);
+"""
+
+class QueueFull(Exception):
+    pass
+
+class JobQueue:
+    """
+    Durable SQLite job queue shared by the API process and the worker processes.
+
+    A worker claims a job atomically and must ack or nack it before its visibility timeout
+    runs out; otherwise the job becomes claimable again, so a crashed worker loses nothing.
+    Nacked jobs are retried with exponential backoff and moved to the dead_letter table
+    after `max_attempts`; so are jobs whose last allowed claim expired without an ack or nack
+    (a job that crashes or hangs its worker).
+    """
+
+    def __init__(self, path: str = QUEUE_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], max_attempts: int = MAX_ATTEMPTS) -> int:
+        """Add a job; raises QueueFull when the backlog is at MAX_DEPTH."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                depth = conn.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')").fetchone()[0]
+                if depth >= MAX_DEPTH:
+                    raise QueueFull(f"queue is full ({depth} jobs pending)")
+                cur = conn.execute(
+                    "INSERT INTO jobs (kind, payload, max_attempts, enqueued_at, available_at) VALUES (?, ?, ?, ?, ?)",
+                    (kind, json.dumps(payload), max_attempts, now, now),
+                )
+                conn.execute("COMMIT")
+                return cur.lastrowid
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, worker_id: str, visibility_timeout: int = VISIBILITY_TIMEOUT) -> Optional[Dict[str, Any]]:
+        """Claim the oldest available job (including ones whose claim expired), or None."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                exhausted = conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'running' AND visible_at <= ? AND attempts >= max_attempts",
+                    (now,),
+                ).fetchall()
+                for job in exhausted:
+                    self._dead_letter(conn, job, f"claim expired on attempt {job['attempts']} "
+                                                 "(worker crashed or timed out)", now)
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE (status = 'queued' AND available_at <= ?) "
+                    "OR (status = 'running' AND visible_at <= ?) ORDER BY available_at, id LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row:
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, claimed_at = ?, "
+                        "claimed_by = ?, visible_at = ? WHERE id = ?",
+                        (now, worker_id, now + visibility_timeout, row["id"]),
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        if not row:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["attempts"] += 1
+        return job
+
+    def ack(self, job_id: int, worker_id: str, result: Any = None) -> bool:
+        """Mark a claimed job done. Returns False if the claim was lost to another worker."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = 'done', finished_at = ?, result = ?, error = NULL "
+                "WHERE id = ? AND status = 'running' AND claimed_by = ?",
+                (time.time(), json.dumps(result), job_id, worker_id),
+            )
+            return cur.rowcount == 1
+
+    def nack(self, job_id: int, worker_id: str, error: str) -> bool:
+        """Record a failure: retry later with backoff, or dead-letter after max attempts."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT * FROM jobs WHERE id = ? AND status = 'running' AND claimed_by = ?",
+                                   (job_id, worker_id)).fetchone()
+                if row and row["attempts"] >= row["max_attempts"]:
+                    self._dead_letter(conn, row, error, now)
+                elif row:
+                    delay = RETRY_BASE_SECONDS * (2 ** (row["attempts"] - 1))
+                    conn.execute("UPDATE jobs SET status = 'queued', available_at = ?, error = ?, claimed_by = NULL, "
+                                 "visible_at = NULL WHERE id = ?", (now + delay, error, job_id))
+                conn.execute("COMMIT")
+                return row is not None
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _dead_letter(conn: sqlite3.Connection, row: sqlite3.Row, error: str, now: float) -> None:
+        """Mark a job dead and copy it to dead_letter; runs inside the caller's transaction."""
+        conn.execute("UPDATE jobs SET status = 'dead', finished_at = ?, error = ? WHERE id = ?",
+                     (now, error, row["id"]))
+        conn.execute(
+            "INSERT OR REPLACE INTO dead_letter (job_id, kind, payload, attempts, error, failed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (row["id"], row["kind"], row["payload"], row["attempts"], error, now),
+        )
+
+    def status(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if not row:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def metrics(self, window: int = 200) -> Dict[str, Any]:
+        """Queue depth by status, oldest waiting job, and wait/run latency over recent jobs."""
+        now = time.time()
+        with self._connect() as conn:
+            depth = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            oldest = conn.execute("SELECT MIN(enqueued_at) FROM jobs WHERE status = 'queued'").fetchone()[0]
+            recent = conn.execute(
+                "SELECT claimed_at - enqueued_at AS wait, finished_at - claimed_at AS run FROM jobs "
+                "WHERE status = 'done' ORDER BY finished_at DESC LIMIT ?", (window,)
+            ).fetchall()
+            dead = conn.execute("SELECT COUNT(*) FROM dead_letter").fetchone()[0]
+
+        def _pct(values, q):
+            values = sorted(values)
+            return round(values[min(len(values) - 1, int(q * len(values)))], 3) if values else None
+
+        waits = [r["wait"] for r in recent]
+        runs = [r["run"] for r in recent]
+        return {
+            "depth": {s: depth.get(s, 0) for s in ("queued", "running", "done", "dead")},
+            "oldest_queued_age_seconds": round(now - oldest, 1) if oldest else 0.0,
+            "dead_letter": dead,
+            "wait_seconds": {"p50": _pct(waits, 0.5), "p95": _pct(waits, 0.95)},
+            "run_seconds": {"p50": _pct(runs, 0.5), "p95": _pct(runs, 0.95)},
+            "max_depth": MAX_DEPTH,
+        }
+
+# Singleton instance
+job_queue = JobQueue()
@@ -1,31 +1,75 @@
-import json
 import os
+import sys
 import time
-from .services.image_service import generate_and_store_image
-from .services.analysis_service import summarize_transcript
+import signal
+import socket
+import multiprocessing
+from .job_queue import job_queue
 
-# Placeholder queue; replace with SQS/RabbitMQ client in production
-QUEUE_FILE = os.getenv("MM_QUEUE_FILE", "/tmp/mm_jobs.jsonl")
+NUM_WORKERS = int(os.getenv("MM_WORKERS", "2"))
+POLL_INTERVAL = float(os.getenv("MM_POLL_INTERVAL", "1"))
 
-def poll_jobs():
-    while True:
+def handle_job(kind, payload):
+    if kind == "image":
+        from ..services.image_service import image_service
+        result = image_service.generate_image(payload["prompt"], image_type=payload.get("image_type", "general"))
+        if not result:
+            raise RuntimeError("image generation failed")
+        filename, image_url = result
+        return {"filename": filename, "image_url": image_url}
+    elif kind == "image_upgrade":
+        # Premium render for a preview: swap it in under the preview's media id
+        import mimetypes
+        from ..services.image_service import image_service
+        from ..services.storage_service import replace_media_stream
+        result = image_service.generate_image(payload["prompt"], image_type=payload.get("image_type", "general"),
+                                              tier="premium")
+        if not result or not result[0].startswith("bedrock_"):
+            # Titan unavailable; keep the preview and let the queue retry later
+            raise RuntimeError("premium render unavailable")
+        filename, image_url = result
+        mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        with open(os.path.join(image_service.output_dir, filename), "rb") as f:
+            if not replace_media_stream(payload["media_id"], filename, mimetype, f):
+                raise ValueError(f"media {payload['media_id']} no longer exists")
+        return {"media_id": payload["media_id"], "tier": "premium", "filename": filename, "image_url": image_url}
+    raise ValueError(f"unknown job kind: {kind}")
+
+def poll_jobs(worker_id: str):
+    """Claim, run and ack jobs until SIGTERM/SIGINT; idle workers sleep POLL_INTERVAL."""
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    signal.signal(signal.SIGINT, lambda *_: stopping.append(True))
+    print(f"[worker {worker_id}] started")
+    while not stopping:
+        job = job_queue.claim(worker_id)
+        if not job:
+            time.sleep(POLL_INTERVAL)
+            continue
         try:
-            with open(QUEUE_FILE, "r+") as f:
-                lines = f.readlines()
-                f.seek(0); f.truncate()
-            for line in lines:
-                job = json.loads(line)
-                handle_job(job)
-        except FileNotFoundError:
-            pass
-        time.sleep(2)
+            result = handle_job(job["kind"], job["payload"])
+            if not job_queue.ack(job["id"], worker_id, result):
+                print(f"[worker {worker_id}] job {job['id']} finished after its claim expired")
+        except Exception as e:
+            print(f"[worker {worker_id}] job {job['id']} attempt {job['attempts']} failed: {e}")
+            job_queue.nack(job["id"], worker_id, str(e))
+    print(f"[worker {worker_id}] stopped")
 
-def handle_job(job):
-    kind = job.get("kind")
-    if kind == "image":
-        generate_and_store_image(job["prompt"])
-    elif kind == "summarize":
-        summarize_transcript(job["text"])
+def run_workers(count: int = NUM_WORKERS):
+    """Start `count` worker processes and wait for them."""
+    host = socket.gethostname()
+    procs = [multiprocessing.Process(target=poll_jobs, args=(f"{host}-{os.getpid()}-{i}",)) for i in range(count)]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.join()
 
 if __name__ == "__main__":
-    poll_jobs()
+    # python -m app.async_jobs.worker [N]
+    run_workers(int(sys.argv[1]) if len(sys.argv) > 1 else NUM_WORKERS)
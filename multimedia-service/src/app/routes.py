@@ -1,13 +1,65 @@
-from flask import Blueprint, request, jsonify, send_from_directory
+import os
+import json
+from flask import Blueprint, Response, request, jsonify, send_from_directory, send_file, stream_with_context
+from werkzeug.utils import safe_join
 from .services.image_service import image_service
+from .async_jobs.job_queue import job_queue, QueueFull
+from .services.derivatives import parse_variant, get_variant, VariantError
+from .services.flowchart import FlowchartError
 import traceback
 
 routes_bp = Blueprint('routes', __name__)
 
+VARIANT_MAX_AGE = int(os.getenv("IMAGE_VARIANT_MAX_AGE", "86400"))
+
+def send_image(base_dir: str, relpath: str):
+    """
+    Serve an image, or a cached derivative of it when ?w= (thumbnail width), ?format=
+    (png, jpeg, webp, avif, auto) or ?q= (quality) are given.
+    """
+    try:
+        variant = parse_variant(request.args, request.headers.get("Accept", ""))
+    except VariantError as e:
+        return jsonify({"error": str(e)}), 400
+    if not variant:
+        return send_from_directory(base_dir, relpath, max_age=VARIANT_MAX_AGE)
+    source = safe_join(base_dir, relpath)
+    if not source or not os.path.isfile(source):
+        return jsonify({"error": "image not found"}), 404
+    try:
+        path, mimetype = get_variant(source, image_service.variant_dir, relpath, *variant)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": f"could not render variant: {e}"}), 500
+    response = send_file(path, mimetype=mimetype, max_age=VARIANT_MAX_AGE)
+    response.headers["Vary"] = "Accept"
+    return response
+
 @routes_bp.route("/")
 def root():
     return jsonify({"message": "Multimedia Service API"})
 
+def _schedule_upgrade(filename: str, prompt: str, image_type: str) -> dict:
+    """
+    Store a preview under its own media id and queue its premium render, which replaces the
+    content under that id. Poll status_url; only /media/<id> is upgraded, so preview responses
+    carry media_url instead of the preview file's image_url.
+    """
+    import mimetypes
+    from .services.storage_service import save_media_stream
+    with open(os.path.join(image_service.output_dir, filename), "rb") as f:
+        # Not deduplicated: the upgrade rewrites this row in place, so it must not be shared
+        stored = save_media_stream(filename, mimetypes.guess_type(filename)[0] or "image/png", f, dedupe=False)
+    media_id = stored["media_id"]
+    upgrade = {"media_id": media_id, "media_url": f"/media/{media_id}", "tier": "preview"}
+    try:
+        job_id = job_queue.enqueue("image_upgrade", {"media_id": media_id, "prompt": prompt, "image_type": image_type})
+        upgrade.update({"upgrade_job_id": job_id, "status_url": f"/jobs/{job_id}", "upgrade": "queued"})
+    except QueueFull:
+        # The preview is still usable; the client can ask for a premium render later
+        upgrade["upgrade"] = "skipped"
+    return upgrade
+
 @routes_bp.route("/generate-image", methods=['POST'])
 def generate_image():
     """Generate any type of image including flowcharts."""
@@ -15,30 +67,204 @@ def generate_image():
         data = request.get_json()
         prompt = data.get('prompt')
         image_type = data.get('image_type', 'general')  # Default to general if not specified
+        spec = data.get('spec')
+
+        # Structured flowcharts are laid out and rendered locally; Titan is skipped
+        if image_type == 'flowchart' and spec is not None:
+            try:
+                chart = image_service.generate_flowchart(spec=spec)
+            except FlowchartError as e:
+                return jsonify({"error": str(e)}), 400
+            return jsonify({**chart, "message": "Flow chart generated successfully"})
 
         if not prompt:
             return jsonify({"error": "Prompt is required"}), 400
 
+        tier = data.get('tier', 'premium')
+        if tier not in ('preview', 'premium'):
+            return jsonify({"error": "tier must be 'preview' or 'premium'"}), 400
+
+        # Opt-in: answer near-identical prompts with an earlier image instead of calling Titan
+        reuse = bool(data.get('reuse_similar'))
+        embedding = None
+        if reuse:
+            threshold = data.get('similarity_threshold')
+            try:
+                threshold = float(threshold) if threshold is not None else None
+            except (TypeError, ValueError):
+                return jsonify({"error": "similarity_threshold must be a number"}), 400
+            try:
+                from .services.semantic_reuse import embed_prompt, find_reusable
+                embedding = embed_prompt(prompt)
+                match = find_reusable(prompt, image_type, embedding, tier=tier, threshold=threshold)
+                if match:
+                    return jsonify({**match, "reused": True, "message": "Reused a similar existing image"})
+            except Exception as e:
+                # Reuse is best-effort; fall through to a normal generation
+                print(f"Semantic reuse lookup failed: {e}")
+
         # The correct entry point is the wrapper function `generate_image`
         # which handles the different image types and calls the appropriate method.
-        result = image_service.generate_image(prompt, image_type=image_type)
+        result = image_service.generate_image(prompt, image_type=image_type, tier=tier)
 
         if not result:
             return jsonify({"error": "Image generation failed"}), 500
 
         filename, image_url = result
-
-        return jsonify({
+        response = {
             "image_url": image_url,
             "message": f"{'Flow chart' if image_type == 'flowchart' else 'Image'} generated successfully",
             "filename": filename
-        })
+        }
+        if tier == 'preview':
+            response.update(_schedule_upgrade(filename, prompt, image_type))
+            del response["image_url"]
+        if reuse:
+            response["reused"] = False
+            # Index premium Titan output only: fallback diagrams are not worth reusing, and a
+            # preview's media row is rewritten by its upgrade job
+            if embedding is not None and tier == 'premium' and filename.startswith("bedrock_"):
+                try:
+                    from .services.semantic_reuse import remember
+                    media_id = remember(prompt, image_type, filename, image_service.output_dir, embedding)
+                    response.update({"media_id": media_id, "media_url": f"/media/{media_id}"})
+                except Exception as e:
+                    print(f"Could not index image for reuse: {e}")
+        return jsonify(response)
     except Exception as e:
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
 
+@routes_bp.route("/generate-images", methods=['POST'])
+def generate_images():
+    """
+    Batch generation: {"items": [{"prompt", "image_type", "tier", "id"}]} or {"prompts": [...]}.
+    Streams NDJSON "result"/"error" events per item as they complete, then "done".
+    """
+    from .services.batch_images import validate_items, generate_batch
+    data = request.get_json(silent=True) or {}
+    try:
+        items = validate_items(data)
+        max_concurrency = int(data["max_concurrency"]) if data.get("max_concurrency") else None
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    def stream():
+        try:
+            for event in generate_batch(items, max_workers=max_concurrency):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            traceback.print_exc()
+            yield json.dumps({"event": "error", "error": str(e)}) + "\n"
+    return Response(stream_with_context(stream()), mimetype="application/x-ndjson")
+
+@routes_bp.route("/media-vectors/bulk", methods=['POST'])
+def bulk_media_vectors():
+    """
+    Bulk-embed {"items": [{"media_id", "content_type", "description", "metadata"}]} into
+    media_vectors. Streams NDJSON progress per batch and a final "done" with rows/sec.
+    """
+    from .services.vector_ingest import validate_item, ingest
+    data = request.get_json(silent=True) or {}
+    raw = data.get("items")
+    if not isinstance(raw, list) or not raw:
+        return jsonify({"error": "items must be a non-empty list"}), 400
+    try:
+        items = [validate_item(item, i) for i, item in enumerate(raw)]
+        batch_size = int(data.get("batch_size") or 0) or None
+        max_concurrency = int(data["max_concurrency"]) if data.get("max_concurrency") else None
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    def stream():
+        try:
+            options = {"batch_size": batch_size} if batch_size else {}
+            for event in ingest(items, max_workers=max_concurrency, **options):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            traceback.print_exc()
+            yield json.dumps({"event": "error", "error": str(e)}) + "\n"
+    return Response(stream_with_context(stream()), mimetype="application/x-ndjson")
+
+@routes_bp.route("/image-cache/stats", methods=['GET'])
+def image_cache_stats():
+    """Hit/miss counters and size of the Titan image cache."""
+    return jsonify(image_service.cache.stats())
+
+@routes_bp.route("/fallback-render/stats", methods=['GET'])
+def fallback_render_stats():
+    """Pool size, queue rejections and render timings of the PIL fallback renderer."""
+    return jsonify(image_service.fallback.stats())
+
+@routes_bp.route("/jobs", methods=['POST'])
+def enqueue_job():
+    """Queue a background job: {"kind": "image", "prompt": ..., "image_type": ...}."""
+    data = request.get_json(silent=True) or {}
+    kind = data.get("kind")
+    if kind != "image":
+        return jsonify({"error": "kind must be 'image'"}), 400
+    if not data.get("prompt"):
+        return jsonify({"error": "Prompt is required"}), 400
+    payload = {k: v for k, v in data.items() if k != "kind"}
+    try:
+        job_id = job_queue.enqueue(kind, payload)
+        return jsonify({"job_id": job_id, "status": "queued"}), 202
+    except QueueFull as e:
+        return jsonify({"error": str(e)}), 429
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@routes_bp.route("/jobs/<int:job_id>", methods=['GET'])
+def job_status(job_id):
+    job = job_queue.status(job_id)
+    if not job:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(job)
+
+@routes_bp.route("/jobs/metrics", methods=['GET'])
+def job_metrics():
+    return jsonify(job_queue.metrics())
+
+@routes_bp.route("/media", methods=['POST'])
+def upload_media():
+    """Store an upload (multipart `file` or raw body) in the content-addressed media store."""
+    from .services.storage_service import save_media_stream
+    try:
+        upload = request.files.get("file")
+        if upload:
+            filename, mimetype, stream = upload.filename, upload.mimetype, upload.stream
+        else:
+            filename = request.args.get("filename", "upload")
+            mimetype = request.mimetype or "application/octet-stream"
+            stream = request.stream
+        return jsonify(save_media_stream(filename, mimetype, stream)), 201
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+
+@routes_bp.route("/media/<int:media_id>", methods=['GET'])
+def serve_media(media_id):
+    """Stream a stored media object without loading it into memory."""
+    from .services.storage_service import get_media_info, iter_media
+    try:
+        info = get_media_info(media_id)
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"error": str(e)}), 500
+    if not info:
+        return jsonify({"error": "media not found"}), 404
+    if info["path"]:
+        # send_file streams from disk and handles Range and If-None-Match
+        return send_file(info["path"], mimetype=info["mimetype"], download_name=info["filename"],
+                         etag=info["sha256"], conditional=True, max_age=VARIANT_MAX_AGE)
+    response = Response(stream_with_context(iter_media(media_id)), mimetype=info["mimetype"])
+    response.headers["Content-Length"] = str(info["size_bytes"])
+    response.headers["Content-Disposition"] = f'inline; filename="{info["filename"]}"'
+    return response
+
 # ✅ expose generated images to frontend
 @routes_bp.route("/generated_images/<filename>")
 def serve_image(filename):
-    return send_from_directory(image_service.output_dir, filename)
+    return send_image(image_service.output_dir, filename)
@@ -0,0 +1,118 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Iterator, Optional
+from .image_service import image_service, TIERS
+
+BATCH_MAX_ITEMS = int(os.getenv("IMAGE_BATCH_MAX_ITEMS", "50"))
+BATCH_CONCURRENCY = int(os.getenv("IMAGE_BATCH_CONCURRENCY", "4"))
+TITAN_MAX_RETRIES = int(os.getenv("TITAN_MAX_RETRIES", "3"))
+MAX_IMAGES_PER_CALL = 5  # Titan v2 limit for numberOfImages
+
+def validate_items(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Normalize {"items": [{"prompt", "image_type", "tier", "id"}]} or {"prompts": [...]}
+    (with top-level image_type/tier defaults). Raises ValueError with a client-facing message.
+    """
+    raw = data.get("items")
+    if raw is None:
+        raw = [{"prompt": p} for p in data.get("prompts") or []]
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("items (or prompts) must be a non-empty list")
+    if len(raw) > BATCH_MAX_ITEMS:
+        raise ValueError(f"at most {BATCH_MAX_ITEMS} images per batch")
+    items = []
+    for i, item in enumerate(raw):
+        if isinstance(item, str):
+            item = {"prompt": item}
+        if not isinstance(item, dict) or not str(item.get("prompt") or "").strip():
+            raise ValueError(f"item {i} needs a prompt")
+        tier = item.get("tier", data.get("tier", "premium"))
+        if tier not in TIERS:
+            raise ValueError(f"item {i}: tier must be one of {', '.join(TIERS)}")
+        items.append({
+            "index": i,
+            "id": item.get("id", i),
+            "prompt": str(item["prompt"]).strip(),
+            "image_type": item.get("image_type", data.get("image_type", "general")),
+            "tier": tier,
+        })
+    return items
+
+def _groups(items: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """Identical (prompt, image_type, tier) items share one call, up to MAX_IMAGES_PER_CALL each."""
+    by_request: Dict[tuple, List[Dict[str, Any]]] = {}
+    for item in items:
+        by_request.setdefault((item["prompt"], item["image_type"], item["tier"]), []).append(item)
+    groups = []
+    for same in by_request.values():
+        for start in range(0, len(same), MAX_IMAGES_PER_CALL):
+            groups.append(same[start:start + MAX_IMAGES_PER_CALL])
+    return groups
+
+def _is_throttle(error: Exception) -> bool:
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code") in (
+        "ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException")
+
+def _run_group(group: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    first = group[0]
+    started = time.perf_counter()
+    images, source, error = None, "titan", None
+    if image_service.bedrock_runtime:
+        for attempt in range(TITAN_MAX_RETRIES + 1):
+            try:
+                images = image_service.generate_variants(first["prompt"], first["image_type"], first["tier"],
+                                                         len(group))
+                break
+            except Exception as e:
+                error = e
+                if not _is_throttle(e) or attempt == TITAN_MAX_RETRIES:
+                    break
+                time.sleep(2 ** attempt)
+    if images is None:
+        if error:
+            print(f"Bedrock batch generation failed: {error}")
+        source = "fallback"
+        images = [image_service.generate_fallback(item["prompt"], item["image_type"]) for item in group]
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+    results = []
+    for item, image in zip(group, images):
+        result = {"index": item["index"], "id": item["id"], "prompt": item["prompt"], "tier": item["tier"],
+                  "elapsed_ms": elapsed_ms, "batched_with": len(group)}
+        if image:
+            result.update({"event": "result", "filename": image[0], "image_url": image[1], "source": source})
+        else:
+            result.update({"event": "error", "error": "Image generation failed"})
+        results.append(result)
+    return results
+
+def generate_batch(items: List[Dict[str, Any]], max_workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one "result"/"error" event per item as its Titan call completes, then a "done" summary.
+    Repeated prompts are folded into numberOfImages>1 calls; calls run concurrently under the
+    Titan rate limiter shared with every other image request.
+    """
+    started = time.perf_counter()
+    groups = _groups(items)
+    workers = max(1, min(max_workers or BATCH_CONCURRENCY, BATCH_CONCURRENCY, len(groups)))
+    counts = {"result": 0, "error": 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run_group, group): group for group in groups}
+        for future in as_completed(futures):
+            try:
+                results = future.result()
+            except Exception as e:
+                results = [{"event": "error", "index": item["index"], "id": item["id"], "error": str(e)}
+                           for item in futures[future]]
+            for result in results:
+                counts[result["event"]] += 1
+                yield result
+    yield {
+        "event": "done",
+        "total": len(items),
+        "succeeded": counts["result"],
+        "failed": counts["error"],
+        "groups": len(groups),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
@@ -0,0 +1,111 @@
+import os
+import glob
+import uuid
+import hashlib
+import threading
+from typing import Optional, Tuple
+from PIL import Image, features
+
+# Widths are snapped to this list so clients cannot make us render arbitrarily many variants
+VARIANT_WIDTHS = sorted(int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "128,256,320,480,640,800,1024").split(","))
+DEFAULT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+FORMATS = {"png": "PNG", "jpeg": "JPEG", "jpg": "JPEG", "webp": "WEBP", "avif": "AVIF"}
+MIMETYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp", "AVIF": "image/avif"}
+
+_locks: dict = {}
+_locks_guard = threading.Lock()
+
+class VariantError(ValueError):
+    pass
+
+def sniff_extension(data: bytes) -> str:
+    """File extension for encoded image bytes, from their magic number."""
+    if data.startswith(b"\x89PNG"):
+        return "png"
+    if data.startswith(b"\xff\xd8"):
+        return "jpg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "png"
+
+def parse_variant(args, accept: str = "") -> Optional[Tuple[Optional[int], Optional[str], int]]:
+    """
+    (width, format, quality) from request args (?w=, ?format=, ?q=), or None when the
+    original is wanted. format=auto picks AVIF or WebP from the Accept header.
+    Raises VariantError for unsupported values.
+    """
+    w, fmt, q = args.get("w"), args.get("format"), args.get("q")
+    if fmt and fmt.lower() == "auto":
+        fmt = next((f for f in ("avif", "webp") if f"image/{f}" in (accept or "") and features.check(f)), None)
+    if not (w or fmt or q):
+        return None
+    width = None
+    if w:
+        try:
+            requested = int(w)
+        except ValueError:
+            raise VariantError("w must be an integer")
+        # Smallest configured width that is at least the requested one
+        width = next((x for x in VARIANT_WIDTHS if x >= requested), VARIANT_WIDTHS[-1])
+    if fmt:
+        fmt = FORMATS.get(fmt.lower())
+        if not fmt:
+            raise VariantError(f"format must be one of {', '.join(sorted(FORMATS))}")
+        if fmt in ("WEBP", "AVIF") and not features.check(fmt.lower()):
+            raise VariantError(f"{fmt.lower()} is not supported by this server's Pillow build")
+    try:
+        quality = max(1, min(100, int(q))) if q else DEFAULT_QUALITY
+    except ValueError:
+        raise VariantError("q must be an integer")
+    return width, fmt, quality
+
+def _variant_prefix(relpath: str) -> str:
+    return hashlib.sha1(relpath.replace("\\", "/").encode("utf-8")).hexdigest()[:20]
+
+def variant_path(variant_dir: str, relpath: str, width: Optional[int], fmt: str, quality: int) -> str:
+    return os.path.join(variant_dir, f"{_variant_prefix(relpath)}_w{width or 0}_q{quality}.{fmt.lower()}")
+
+def remove_variants(variant_dir: str, relpath: str) -> None:
+    """Delete every cached variant of an image (used when the original is evicted)."""
+    for path in glob.glob(os.path.join(variant_dir, f"{_variant_prefix(relpath)}_*")):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def get_variant(source: str, variant_dir: str, relpath: str, width: Optional[int], fmt: Optional[str],
+                quality: int) -> Tuple[str, str]:
+    """
+    Path and mimetype of the requested variant of `source`, rendering it on first request.
+    Renders are cached on disk and redone only if the original is newer.
+    """
+    if not fmt:
+        with Image.open(source) as probe:
+            fmt = probe.format if probe.format in MIMETYPES else "PNG"
+    target = variant_path(variant_dir, relpath, width, fmt, quality)
+    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+        return target, MIMETYPES[fmt]
+
+    with _locks_guard:
+        lock = _locks.setdefault(target, threading.Lock())
+    with lock:
+        # Another request may have rendered it while we waited
+        if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+            return target, MIMETYPES[fmt]
+        os.makedirs(variant_dir, exist_ok=True)
+        with Image.open(source) as img:
+            if width and img.width > width:
+                img.draft("RGB", (width, width * img.height // img.width))  # cheap JPEG downscale
+                img.thumbnail((width, max(1, width * img.height // img.width)), Image.LANCZOS)
+            else:
+                img.load()
+            if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            options = {"PNG": {"optimize": True},
+                       "JPEG": {"quality": quality, "optimize": True, "progressive": True},
+                       "WEBP": {"quality": quality, "method": 4},
+                       "AVIF": {"quality": quality}}[fmt]
+            tmp = f"{target}.{uuid.uuid4().hex}.tmp"
+            img.save(tmp, format=fmt, **options)
+        os.replace(tmp, target)
+    return target, MIMETYPES[fmt]
@@ -0,0 +1,155 @@
+import io
+import os
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Tuple
+from PIL import Image, ImageDraw, ImageFont
+from . import flowchart
+
+WIDTH, HEIGHT = 1200, 800
+FOOTER_TEXT = "Generated by Enhanced Image Service"
+
+RENDER_WORKERS = int(os.getenv("FALLBACK_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Renders allowed to wait for a worker on top of the ones running
+RENDER_QUEUE_SIZE = int(os.getenv("FALLBACK_RENDER_QUEUE_SIZE", "16"))
+RENDER_QUEUE_TIMEOUT = float(os.getenv("FALLBACK_RENDER_QUEUE_TIMEOUT", "5"))
+RENDER_TIMEOUT = float(os.getenv("FALLBACK_RENDER_TIMEOUT", "30"))
+
+class RenderQueueFull(RuntimeError):
+    pass
+
+# ---------- worker side ----------
+_font = None
+_base_canvas = None
+
+def _load_font():
+    try:
+        return ImageFont.truetype("arial.ttf", 24)
+    except IOError:
+        return ImageFont.load_default()
+
+def _init_worker():
+    """Load the font and draw the static parts (background, header band, footer) once per process."""
+    global _font, _base_canvas
+    _font = _load_font()
+    _base_canvas = Image.new("RGB", (WIDTH, HEIGHT), color="#f8f9fa")
+    draw = ImageDraw.Draw(_base_canvas)
+    draw.rectangle([0, 0, WIDTH, 80], fill="#2563eb")
+    footer_bbox = draw.textbbox((0, 0), FOOTER_TEXT, font=_font)
+    draw.text((WIDTH - (footer_bbox[2] - footer_bbox[0]) - 20, 760), FOOTER_TEXT, fill="#64748b", font=_font)
+
+def _text_width(draw: ImageDraw.ImageDraw, text: str) -> int:
+    bbox = draw.textbbox((0, 0), text, font=_font)
+    return bbox[2] - bbox[0]
+
+def render_png(prompt: str, image_type: str) -> Tuple[bytes, float, float]:
+    """Draw the fallback diagram and PNG-encode it. Returns (png_bytes, draw_ms, encode_ms)."""
+    if image_type == "flowchart":
+        # Layered layout sized to the graph instead of a fixed stack that overflows the canvas
+        chart = flowchart.render(prompt=prompt)
+        return chart["png"], chart["timings_ms"]["layout"], chart["timings_ms"]["png"]
+    if _base_canvas is None:
+        _init_worker()
+    started = time.perf_counter()
+    img = _base_canvas.copy()
+    draw = ImageDraw.Draw(img)
+
+    title_text = f"{image_type.upper()}: {prompt[:50]}{'...' if len(prompt) > 50 else ''}"
+    draw.text(((WIDTH - _text_width(draw, title_text)) // 2, 25), title_text, fill="white", font=_font)
+
+    draw.ellipse([400, 300, 800, 400], fill="#fef3c7", outline="#f59e0b", width=3)
+    draw.text((600 - _text_width(draw, prompt) // 2, 335), prompt, fill="#92400e", font=_font)
+
+    drawn = time.perf_counter()
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    encoded = time.perf_counter()
+    return buf.getvalue(), (drawn - started) * 1000, (encoded - drawn) * 1000
+
+# ---------- request side ----------
+class FallbackRenderer:
+    """
+    Runs fallback rendering in a process pool so a Bedrock outage does not serialize every
+    request on the GIL. At most `workers + queue_size` renders are admitted; further callers
+    wait up to `queue_timeout` seconds and then get RenderQueueFull.
+    """
+
+    def __init__(self, workers: int = RENDER_WORKERS, queue_size: int = RENDER_QUEUE_SIZE,
+                 queue_timeout: float = RENDER_QUEUE_TIMEOUT):
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self.metrics = {"renders": 0, "failures": 0, "rejected": 0, "in_flight": 0,
+                        "draw_ms_total": 0.0, "encode_ms_total": 0.0, "wall_ms_total": 0.0, "wall_ms_max": 0.0}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+            return self._pool
+
+    def _reset_pool(self) -> None:
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def render(self, prompt: str, image_type: str) -> bytes:
+        """PNG bytes of the fallback diagram for `prompt`."""
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._metrics_lock:
+                self.metrics["rejected"] += 1
+            raise RenderQueueFull("fallback renderer is saturated")
+        started = time.perf_counter()
+        with self._metrics_lock:
+            self.metrics["in_flight"] += 1
+        try:
+            try:
+                data, draw_ms, encode_ms = self._executor().submit(render_png, prompt, image_type).result(RENDER_TIMEOUT)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed); start a fresh pool for the next caller
+                self._reset_pool()
+                raise
+            wall_ms = (time.perf_counter() - started) * 1000
+            with self._metrics_lock:
+                self.metrics["renders"] += 1
+                self.metrics["draw_ms_total"] += draw_ms
+                self.metrics["encode_ms_total"] += encode_ms
+                self.metrics["wall_ms_total"] += wall_ms
+                self.metrics["wall_ms_max"] = max(self.metrics["wall_ms_max"], wall_ms)
+            print(f"Fallback render: draw {draw_ms:.1f}ms, encode {encode_ms:.1f}ms, total {wall_ms:.1f}ms")
+            return data
+        except Exception:
+            with self._metrics_lock:
+                self.metrics["failures"] += 1
+            raise
+        finally:
+            with self._metrics_lock:
+                self.metrics["in_flight"] -= 1
+            self._slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._metrics_lock:
+            m = dict(self.metrics)
+        n = m["renders"]
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": m["in_flight"],
+            "renders": n,
+            "failures": m["failures"],
+            "rejected": m["rejected"],
+            "avg_draw_ms": round(m["draw_ms_total"] / n, 2) if n else 0.0,
+            "avg_encode_ms": round(m["encode_ms_total"] / n, 2) if n else 0.0,
+            "avg_total_ms": round(m["wall_ms_total"] / n, 2) if n else 0.0,
+            "max_total_ms": round(m["wall_ms_max"], 2),
+        }
+
+    def shutdown(self) -> None:
+        self._reset_pool()
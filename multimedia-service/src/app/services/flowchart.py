@@ -0,0 +1,423 @@
+import io
+import os
+import time
+import textwrap
+from xml.sax.saxutils import escape
+from typing import Dict, Any, List, Optional, Tuple
+from PIL import Image, ImageDraw, ImageFont
+
+FLOWCHART_MAX_NODES = int(os.getenv("FLOWCHART_MAX_NODES", "200"))
+PNG_SCALE = float(os.getenv("FLOWCHART_PNG_SCALE", "2"))
+# Large charts are rasterized at a lower scale to keep the bitmap within this many pixels
+PNG_MAX_PIXELS = int(os.getenv("FLOWCHART_PNG_MAX_PIXELS", str(16_000_000)))
+
+SHAPES = ("process", "decision", "start", "end")
+FONT_SIZE = 14
+CHAR_WIDTH = 8          # rough average glyph width at FONT_SIZE, used for sizing before rendering
+LINE_HEIGHT = 18
+WRAP_CHARS = 22
+PADDING = 14
+MIN_WIDTH = 120
+NODE_GAP = 40           # between nodes in the same layer
+RANK_GAP = 60           # between layers
+MARGIN = 30
+DUMMY_SIZE = 16
+SWEEPS = 8
+
+STYLE = {
+    "process": {"fill": "#eff6ff", "stroke": "#3b82f6"},
+    "decision": {"fill": "#fef3c7", "stroke": "#f59e0b"},
+    "start": {"fill": "#dcfce7", "stroke": "#16a34a"},
+    "end": {"fill": "#fee2e2", "stroke": "#dc2626"},
+}
+EDGE_COLOR = "#6b7280"
+TEXT_COLOR = "#1f2937"
+
+class FlowchartError(ValueError):
+    pass
+
+def _guess_shape(label: str, index: int, count: int) -> str:
+    if "?" in label or "decide" in label.lower():
+        return "decision"
+    if index == 0 and count > 1:
+        return "start"
+    if index == count - 1 and count > 1:
+        return "end"
+    return "process"
+
+def spec_from_prompt(prompt: str) -> Dict[str, Any]:
+    """A linear flowchart spec from a comma-separated list of steps."""
+    steps = [s.strip() for s in prompt.split(",") if s.strip()] if "," in prompt \
+        else ["Start", "Process", "Decision", "End"]
+    nodes = [{"id": f"n{i}", "label": s, "shape": _guess_shape(s, i, len(steps))} for i, s in enumerate(steps)]
+    edges = [{"from": f"n{i}", "to": f"n{i + 1}"} for i in range(len(steps) - 1)]
+    return {"nodes": nodes, "edges": edges}
+
+def parse_spec(spec: Dict[str, Any]) -> Tuple[Dict[str, Dict[str, Any]], List[Dict[str, Any]], str]:
+    """
+    Validate {"nodes": [{"id", "label", "shape"}], "edges": [{"from", "to", "label"}], "direction"}.
+    Returns (nodes by id in spec order, edges, direction). Raises FlowchartError.
+    """
+    if not isinstance(spec, dict) or not isinstance(spec.get("nodes"), list) or not spec["nodes"]:
+        raise FlowchartError("spec must contain a non-empty 'nodes' list")
+    if len(spec["nodes"]) > FLOWCHART_MAX_NODES:
+        raise FlowchartError(f"at most {FLOWCHART_MAX_NODES} nodes are supported")
+    direction = str(spec.get("direction", "TB")).upper()
+    if direction not in ("TB", "LR"):
+        raise FlowchartError("direction must be 'TB' or 'LR'")
+
+    nodes: Dict[str, Dict[str, Any]] = {}
+    for i, node in enumerate(spec["nodes"]):
+        if isinstance(node, str):
+            node = {"id": node}
+        if not isinstance(node, dict) or node.get("id") in (None, ""):
+            raise FlowchartError(f"node {i} needs an 'id'")
+        node_id = str(node["id"])
+        if node_id in nodes:
+            raise FlowchartError(f"duplicate node id '{node_id}'")
+        label = str(node.get("label", node_id))
+        shape = node.get("shape") or _guess_shape(label, -1, 0)
+        if shape not in SHAPES:
+            raise FlowchartError(f"node '{node_id}': shape must be one of {', '.join(SHAPES)}")
+        nodes[node_id] = {"label": label, "shape": shape}
+
+    edges = []
+    for i, edge in enumerate(spec.get("edges") or []):
+        if not isinstance(edge, dict):
+            raise FlowchartError(f"edge {i} must be an object")
+        src, dst = str(edge.get("from", "")), str(edge.get("to", ""))
+        if src not in nodes or dst not in nodes:
+            raise FlowchartError(f"edge {i} references an unknown node")
+        edges.append({"from": src, "to": dst, "label": str(edge.get("label") or "")})
+    return nodes, edges, direction
+
+# ---------- layout ----------
+
+def _node_box(label: str, shape: str) -> Tuple[List[str], float, float]:
+    lines = textwrap.wrap(label, WRAP_CHARS) or [""]
+    width = max(MIN_WIDTH, max(len(l) for l in lines) * CHAR_WIDTH + 2 * PADDING)
+    height = len(lines) * LINE_HEIGHT + 2 * PADDING
+    if shape == "decision":
+        # The diamond's inscribed rectangle must hold the text
+        width, height = width * 1.5, height * 1.6
+    return lines, width, height
+
+def _break_cycles(order: List[str], succ: Dict[str, List[str]]) -> set:
+    """Edges (u, v) that close a cycle in a DFS from the nodes in spec order."""
+    back, state = set(), {}
+    for root in order:
+        if root in state:
+            continue
+        stack = [(root, iter(succ[root]))]
+        state[root] = "open"
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                state[node] = "done"
+                stack.pop()
+            elif state.get(child) == "open":
+                back.add((node, child))
+            elif child not in state:
+                state[child] = "open"
+                stack.append((child, iter(succ[child])))
+    return back
+
+def _crossings(upper: List[str], lower: List[str], links: List[Tuple[str, str]]) -> int:
+    up = {n: i for i, n in enumerate(upper)}
+    low = {n: i for i, n in enumerate(lower)}
+    pairs = sorted((up[a], low[b]) for a, b in links if a in up and b in low)
+    count = 0
+    for i in range(len(pairs)):
+        for j in range(i + 1, len(pairs)):
+            if pairs[i][0] < pairs[j][0] and pairs[i][1] > pairs[j][1]:
+                count += 1
+    return count
+
+def layout(nodes: Dict[str, Dict[str, Any]], edges: List[Dict[str, Any]], direction: str = "TB") -> Dict[str, Any]:
+    """
+    Layered (Sugiyama-style) layout: break cycles, assign longest-path layers, route long
+    edges through dummy nodes, reduce crossings with barycenter sweeps, then place nodes.
+    Returns positioned boxes and edge polylines in a canvas of (width, height).
+    """
+    order = list(nodes)
+    succ: Dict[str, List[str]] = {n: [] for n in order}
+    for e in edges:
+        if e["from"] != e["to"]:
+            succ[e["from"]].append(e["to"])
+    back = _break_cycles(order, succ)
+
+    # Acyclic working edges (back edges reversed), self-loops dropped
+    dag = []
+    for e in edges:
+        if e["from"] == e["to"]:
+            continue
+        reverse = (e["from"], e["to"]) in back
+        dag.append((e["to"], e["from"], e, reverse) if reverse else (e["from"], e["to"], e, reverse))
+
+    preds: Dict[str, List[str]] = {n: [] for n in order}
+    out: Dict[str, List[str]] = {n: [] for n in order}
+    for u, v, _, _ in dag:
+        out[u].append(v)
+        preds[v].append(u)
+    layer: Dict[str, int] = {}
+    indegree = {n: len(preds[n]) for n in order}
+    ready = [n for n in order if indegree[n] == 0]
+    while ready:
+        node = ready.pop(0)
+        layer[node] = max((layer[p] + 1 for p in preds[node]), default=0)
+        for child in out[node]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                ready.append(child)
+
+    # Box sizes along (cross axis, main axis); LR swaps them
+    size: Dict[str, Tuple[float, float]] = {}
+    text: Dict[str, List[str]] = {}
+    for n in order:
+        lines, w, h = _node_box(nodes[n]["label"], nodes[n]["shape"])
+        text[n] = lines
+        size[n] = (w, h) if direction == "TB" else (h, w)
+
+    layers: List[List[str]] = [[] for _ in range(max(layer.values()) + 1)]
+    for n in order:
+        layers[layer[n]].append(n)
+    routes = []  # (chain of layout nodes from upper to lower layer, edge, reversed)
+    links: List[Tuple[str, str]] = []
+    dummy_count = 0
+    for u, v, e, reverse in dag:
+        chain = [u]
+        for l in range(layer[u] + 1, layer[v]):
+            dummy = f"__dummy{dummy_count}"
+            dummy_count += 1
+            layer[dummy] = l
+            size[dummy] = (DUMMY_SIZE, DUMMY_SIZE)
+            layers[l].append(dummy)
+            chain.append(dummy)
+        chain.append(v)
+        links.extend(zip(chain, chain[1:]))
+        routes.append((chain, e, reverse))
+
+    up_links: Dict[str, List[str]] = {n: [] for n in layer}
+    down_links: Dict[str, List[str]] = {n: [] for n in layer}
+    for a, b in links:
+        down_links[a].append(b)
+        up_links[b].append(a)
+
+    def total_crossings(ls):
+        return sum(_crossings(ls[i], ls[i + 1], links) for i in range(len(ls) - 1))
+
+    def reorder(layer_nodes, neighbours, reference):
+        pos = {n: i for i, n in enumerate(reference)}
+        def key(item):
+            i, n = item
+            ranks = [pos[m] for m in neighbours[n] if m in pos]
+            return sum(ranks) / len(ranks) if ranks else i
+        return [n for _, n in sorted(enumerate(layer_nodes), key=key)]
+
+    best, best_crossings = [list(l) for l in layers], total_crossings(layers)
+    for sweep in range(SWEEPS):
+        if best_crossings == 0:
+            break
+        if sweep % 2 == 0:
+            for i in range(1, len(layers)):
+                layers[i] = reorder(layers[i], up_links, layers[i - 1])
+        else:
+            for i in range(len(layers) - 2, -1, -1):
+                layers[i] = reorder(layers[i], down_links, layers[i + 1])
+        crossings = total_crossings(layers)
+        if crossings < best_crossings:
+            best, best_crossings = [list(l) for l in layers], crossings
+    layers = best
+
+    # Cross-axis placement: pack each layer, then pull nodes toward their neighbours' mean
+    cross: Dict[str, float] = {}
+    for l in layers:
+        x = 0.0
+        for n in l:
+            cross[n] = x + size[n][0] / 2
+            x += size[n][0] + NODE_GAP
+
+    def place(layer_nodes, neighbours):
+        wanted = []
+        for n in layer_nodes:
+            adj = [cross[m] for m in neighbours[n]]
+            wanted.append(sum(adj) / len(adj) if adj else cross[n])
+        placed = []
+        for i, n in enumerate(layer_nodes):
+            x = wanted[i]
+            if i:
+                prev = layer_nodes[i - 1]
+                x = max(x, placed[-1] + size[prev][0] / 2 + NODE_GAP + size[n][0] / 2)
+            placed.append(x)
+        # Shift the layer back so it is centred on what its nodes wanted
+        shift = (sum(wanted) - sum(placed)) / len(placed)
+        for n, x in zip(layer_nodes, placed):
+            cross[n] = x + shift
+
+    for _ in range(4):
+        for i in range(1, len(layers)):
+            place(layers[i], up_links)
+        for i in range(len(layers) - 2, -1, -1):
+            place(layers[i], down_links)
+
+    low = min(cross[n] - size[n][0] / 2 for n in cross)
+    for n in cross:
+        cross[n] += MARGIN - low
+    main: Dict[str, float] = {}
+    offset = MARGIN
+    for l in layers:
+        depth = max(size[n][1] for n in l)
+        for n in l:
+            main[n] = offset + depth / 2
+        offset += depth + RANK_GAP
+    cross_extent = max(cross[n] + size[n][0] / 2 for n in cross) + MARGIN
+    main_extent = offset - RANK_GAP + MARGIN
+
+    def point(c, m):
+        return (c, m) if direction == "TB" else (m, c)
+
+    boxes = []
+    for n in order:
+        x, y = point(cross[n], main[n])
+        w, h = size[n] if direction == "TB" else (size[n][1], size[n][0])
+        boxes.append({"id": n, "label": nodes[n]["label"], "lines": text[n], "shape": nodes[n]["shape"],
+                      "x": x, "y": y, "width": w, "height": h})
+
+    paths = []
+    for chain, e, reverse in routes:
+        first, last = chain[0], chain[-1]
+        pts = [point(cross[first], main[first] + size[first][1] / 2)]
+        pts += [point(cross[d], main[d]) for d in chain[1:-1]]
+        pts.append(point(cross[last], main[last] - size[last][1] / 2))
+        if reverse:
+            pts.reverse()
+        paths.append({"from": e["from"], "to": e["to"], "label": e["label"], "points": pts})
+
+    width, height = point(cross_extent, main_extent)
+    return {"boxes": boxes, "edges": paths, "width": width, "height": height, "crossings": best_crossings}
+
+# ---------- rendering ----------
+
+def _shape_points(box: Dict[str, Any]) -> List[Tuple[float, float]]:
+    x, y, hw, hh = box["x"], box["y"], box["width"] / 2, box["height"] / 2
+    return [(x, y - hh), (x + hw, y), (x, y + hh), (x - hw, y)]
+
+def _arrow_head(points: List[Tuple[float, float]], length: float = 10, spread: float = 5):
+    (x1, y1), (x2, y2) = points[-2], points[-1]
+    dx, dy = x2 - x1, y2 - y1
+    norm = (dx * dx + dy * dy) ** 0.5 or 1.0
+    ux, uy = dx / norm, dy / norm
+    bx, by = x2 - ux * length, y2 - uy * length
+    return [(x2, y2), (bx - uy * spread, by + ux * spread), (bx + uy * spread, by - ux * spread)]
+
+def _label_point(points: List[Tuple[float, float]]) -> Tuple[float, float]:
+    mid = len(points) // 2
+    (x1, y1), (x2, y2) = points[mid - 1], points[mid]
+    return (x1 + x2) / 2 + 6, (y1 + y2) / 2
+
+def to_svg(chart: Dict[str, Any]) -> str:
+    fmt = lambda pts: " ".join(f"{x:.1f},{y:.1f}" for x, y in pts)
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{chart["width"]:.0f}" height="{chart["height"]:.0f}" '
+        f'viewBox="0 0 {chart["width"]:.0f} {chart["height"]:.0f}" '
+        f'font-family="Helvetica, Arial, sans-serif" font-size="{FONT_SIZE}">',
+        '<rect width="100%" height="100%" fill="#ffffff"/>',
+    ]
+    for edge in chart["edges"]:
+        parts.append(f'<polyline points="{fmt(edge["points"])}" fill="none" stroke="{EDGE_COLOR}" stroke-width="2"/>')
+        parts.append(f'<polygon points="{fmt(_arrow_head(edge["points"]))}" fill="{EDGE_COLOR}"/>')
+        if edge["label"]:
+            lx, ly = _label_point(edge["points"])
+            parts.append(f'<text x="{lx:.1f}" y="{ly:.1f}" fill="{EDGE_COLOR}" font-size="12">{escape(edge["label"])}</text>')
+    for box in chart["boxes"]:
+        style = STYLE[box["shape"]]
+        paint = f'fill="{style["fill"]}" stroke="{style["stroke"]}" stroke-width="2"'
+        x0, y0 = box["x"] - box["width"] / 2, box["y"] - box["height"] / 2
+        if box["shape"] == "decision":
+            parts.append(f'<polygon points="{fmt(_shape_points(box))}" {paint}/>')
+        else:
+            rx = box["height"] / 2 if box["shape"] in ("start", "end") else 6
+            parts.append(f'<rect x="{x0:.1f}" y="{y0:.1f}" width="{box["width"]:.1f}" height="{box["height"]:.1f}" '
+                         f'rx="{rx:.1f}" {paint}/>')
+        top = box["y"] - (len(box["lines"]) - 1) * LINE_HEIGHT / 2
+        parts.append(f'<text text-anchor="middle" dominant-baseline="central" fill="{TEXT_COLOR}">')
+        for i, line in enumerate(box["lines"]):
+            parts.append(f'<tspan x="{box["x"]:.1f}" y="{top + i * LINE_HEIGHT:.1f}">{escape(line)}</tspan>')
+        parts.append("</text>")
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+_fonts: Dict[int, Any] = {}
+
+def _font(size: int):
+    if size not in _fonts:
+        for name in ("DejaVuSans.ttf", "arial.ttf"):
+            try:
+                _fonts[size] = ImageFont.truetype(name, size)
+                break
+            except IOError:
+                continue
+        else:
+            try:
+                _fonts[size] = ImageFont.load_default(size)
+            except TypeError:  # Pillow < 10.1 has no sized default font
+                _fonts[size] = ImageFont.load_default()
+    return _fonts[size]
+
+def to_png(chart: Dict[str, Any], scale: float = PNG_SCALE) -> bytes:
+    scale = min(scale, (PNG_MAX_PIXELS / (chart["width"] * chart["height"])) ** 0.5)
+    s = lambda pts: [(x * scale, y * scale) for x, y in pts]
+    img = Image.new("RGB", (int(chart["width"] * scale), int(chart["height"] * scale)), "#ffffff")
+    draw = ImageDraw.Draw(img)
+    font, small = _font(int(FONT_SIZE * scale)), _font(int(12 * scale))
+    line = max(1, int(2 * scale))
+    for edge in chart["edges"]:
+        draw.line(s(edge["points"]), fill=EDGE_COLOR, width=line, joint="curve")
+        draw.polygon(s(_arrow_head(edge["points"])), fill=EDGE_COLOR)
+        if edge["label"]:
+            lx, ly = _label_point(edge["points"])
+            draw.text((lx * scale, ly * scale), edge["label"], fill=EDGE_COLOR, font=small, anchor="lm")
+    for box in chart["boxes"]:
+        style = STYLE[box["shape"]]
+        if box["shape"] == "decision":
+            draw.polygon(s(_shape_points(box)), fill=style["fill"], outline=style["stroke"], width=line)
+        else:
+            rect = s([(box["x"] - box["width"] / 2, box["y"] - box["height"] / 2),
+                      (box["x"] + box["width"] / 2, box["y"] + box["height"] / 2)])
+            radius = box["height"] / 2 if box["shape"] in ("start", "end") else 6
+            draw.rounded_rectangle(rect, radius=radius * scale, fill=style["fill"], outline=style["stroke"], width=line)
+        top = box["y"] - (len(box["lines"]) - 1) * LINE_HEIGHT / 2
+        for i, text in enumerate(box["lines"]):
+            draw.text((box["x"] * scale, (top + i * LINE_HEIGHT) * scale), text, fill=TEXT_COLOR, font=font, anchor="mm")
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+def render(spec: Optional[Dict[str, Any]] = None, prompt: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Lay out and render a flowchart from a structured spec (or a comma-separated prompt).
+    Returns {"svg", "png", "width", "height", "nodes", "edges", "crossings", "timings_ms"}.
+    """
+    started = time.perf_counter()
+    nodes, edges, direction = parse_spec(spec if spec is not None else spec_from_prompt(prompt or ""))
+    chart = layout(nodes, edges, direction)
+    laid_out = time.perf_counter()
+    svg = to_svg(chart)
+    svg_done = time.perf_counter()
+    png = to_png(chart)
+    png_done = time.perf_counter()
+    return {
+        "svg": svg,
+        "png": png,
+        "width": round(chart["width"]),
+        "height": round(chart["height"]),
+        "nodes": len(nodes),
+        "edges": len(edges),
+        "crossings": chart["crossings"],
+        "timings_ms": {
+            "layout": round((laid_out - started) * 1000, 2),
+            "svg": round((svg_done - laid_out) * 1000, 2),
+            "png": round((png_done - svg_done) * 1000, 2),
+        },
+    }
@@ -0,0 +1,111 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Optional, Dict, Any, Callable
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+IMAGE_CACHE_DB_PATH = os.getenv("IMAGE_CACHE_DB_PATH", os.path.join(_BASE_DIR, "data", "image_cache.db"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_cache (
+    key TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_image_cache_access ON image_cache (last_access);
+"""
+
+def payload_key(model_id: str, payload: Dict[str, Any]) -> str:
+    """SHA-256 over the model id and the canonical JSON request body."""
+    canonical = json.dumps({"model": model_id, "payload": payload}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class ImageCache:
+    """
+    Content-addressed cache of generated images, keyed on the full Titan request.
+
+    Titan is deterministic for a fixed seed, so an identical payload can be answered with
+    the file saved last time. Cached files live in the image output directory; when their
+    total size exceeds `max_bytes` the least recently used ones are deleted.
+    """
+
+    def __init__(self, image_dir: str, path: str = IMAGE_CACHE_DB_PATH, max_bytes: int = IMAGE_CACHE_MAX_BYTES,
+                 on_evict: Optional[Callable[[str], None]] = None):
+        self.image_dir = image_dir
+        self.on_evict = on_evict
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "stale": 0}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        """Filename of the cached image for `key`, or None on a miss."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT filename FROM image_cache WHERE key = ?", (key,)).fetchone()
+            if row and not os.path.exists(os.path.join(self.image_dir, row["filename"])):
+                # File removed outside the cache; forget it and regenerate
+                conn.execute("DELETE FROM image_cache WHERE key = ?", (key,))
+                self.metrics["stale"] += 1
+                row = None
+            if not row:
+                self.metrics["misses"] += 1
+                return None
+            conn.execute("UPDATE image_cache SET last_access = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+            self.metrics["hits"] += 1
+            return row["filename"]
+
+    def put(self, key: str, filename: str) -> None:
+        """Record a freshly saved image and evict least recently used files over the size bound."""
+        size = os.path.getsize(os.path.join(self.image_dir, filename))
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO image_cache (key, filename, size_bytes, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, filename, size, now, now),
+            )
+            self.metrics["stores"] += 1
+            total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM image_cache").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for row in conn.execute("SELECT key, filename, size_bytes FROM image_cache "
+                                    "WHERE key != ? ORDER BY last_access", (key,)).fetchall():
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.image_dir, row["filename"]))
+                except FileNotFoundError:
+                    pass
+                if self.on_evict:
+                    self.on_evict(row["filename"])
+                conn.execute("DELETE FROM image_cache WHERE key = ?", (row["key"],))
+                total -= row["size_bytes"]
+                self.metrics["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT COUNT(*) AS entries, COALESCE(SUM(size_bytes), 0) AS bytes FROM image_cache").fetchone()
+        lookups = self.metrics["hits"] + self.metrics["misses"]
+        return {
+            **self.metrics,
+            "hit_rate": round(self.metrics["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": row["entries"],
+            "bytes": row["bytes"],
+            "max_bytes": self.max_bytes,
+        }
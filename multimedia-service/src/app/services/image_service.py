@@ -1,9 +1,40 @@
 import os
+import time
 import uuid
-from typing import Optional, Tuple
-from PIL import Image, ImageDraw, ImageFont
+import threading
+from typing import Optional, Tuple, Dict, Any, List
 import base64
-import io
+from .image_cache import ImageCache, payload_key
+from .derivatives import sniff_extension, remove_variants
+from .fallback_renderer import FallbackRenderer
+from . import flowchart
+
+TITAN_MODEL_ID = 'amazon.titan-image-generator-v2:0'
+# "preview" is the fast tier returned first; "premium" is rendered in the background and swapped in
+TIERS = {
+    "preview": {"quality": "standard", "size": int(os.getenv("IMAGE_PREVIEW_SIZE", "512"))},
+    "premium": {"quality": "premium", "size": 1024},
+}
+TITAN_RATE_PER_MINUTE = float(os.getenv("TITAN_RATE_PER_MINUTE", "60"))
+
+class RateLimiter:
+    """Blocking limiter spacing calls evenly at `per_minute`."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+# Every Titan call in this process goes through _invoke_titan, which waits on this limiter
+titan_limiter = RateLimiter(TITAN_RATE_PER_MINUTE)
  
 try:
     import boto3
@@ -18,10 +49,9 @@ class EnhancedImageService:
         base_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
         self.output_dir = os.path.join(base_dir, "static", "images")
         os.makedirs(self.output_dir, exist_ok=True)
-        try:
-            self.font = ImageFont.truetype("arial.ttf", 24)
-        except IOError:
-            self.font = ImageFont.load_default()
+        self.variant_dir = os.getenv("IMAGE_VARIANT_DIR", os.path.join(os.path.dirname(base_dir), "data", "image_variants"))
+        self.cache = ImageCache(self.output_dir, on_evict=lambda name: remove_variants(self.variant_dir, name))
+        self.fallback = FallbackRenderer()
         self.bedrock_runtime = None
         if AWS_AVAILABLE:
             self._initialize_bedrock_client()
@@ -45,12 +75,38 @@ class EnhancedImageService:
             print(f"Error initializing Bedrock client: {e}")
             self.bedrock_runtime = None
  
-    def _save_image(self, img: Image.Image, prefix: str) -> Tuple[str, str]:
-        filename = f"{prefix}_{uuid.uuid4().hex[:8]}.png"
+    def _save_bytes(self, data: bytes, prefix: str) -> Tuple[str, str]:
+        """Write already-encoded image bytes as-is (no decode/re-encode)."""
+        filename = f"{prefix}_{uuid.uuid4().hex[:8]}.{sniff_extension(data)}"
         image_path = os.path.join(self.output_dir, filename)
-        img.save(image_path)
+        tmp_path = f"{image_path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, image_path)
         return filename, f"/static/images/{filename}"
  
+    def generate_flowchart(self, spec: Optional[Dict[str, Any]] = None, prompt: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Render a flowchart locally (no Titan call) from a nodes/edges spec or a comma-separated
+        prompt. Saves the PNG and SVG side by side. Raises flowchart.FlowchartError on a bad spec.
+        """
+        chart = flowchart.render(spec=spec, prompt=prompt)
+        filename, image_url = self._save_bytes(chart["png"], "flowchart")
+        svg_filename = f"{os.path.splitext(filename)[0]}.svg"
+        svg_path = os.path.join(self.output_dir, svg_filename)
+        with open(f"{svg_path}.tmp", "w", encoding="utf-8") as f:
+            f.write(chart["svg"])
+        os.replace(f"{svg_path}.tmp", svg_path)
+        print(f"Flowchart rendered: {chart['nodes']} nodes, {chart['edges']} edges, {chart['timings_ms']}")
+        return {
+            "filename": filename,
+            "image_url": image_url,
+            "svg_url": f"/static/images/{svg_filename}",
+            "width": chart["width"],
+            "height": chart["height"],
+            "timings_ms": chart["timings_ms"],
+        }
+
     def _create_titan_prompt(self, prompt: str, image_type: str) -> str:
         """Create a concise prompt for Titan that stays within character limits."""
         base_style = "Style: professional, clean, minimalist."
@@ -64,106 +120,87 @@ class EnhancedImageService:
                 return f"Professional visualization of {prompt}. {base_style}"
             return f"Professional image showing: {prompt}. {base_style}"
  
-    def generate_image(self, prompt: str, image_type: str = "general") -> Optional[Tuple[str, str]]:
-        """Generate an image using AWS Bedrock Titan Image Generator v2."""
+    def _titan_payload(self, prompt: str, image_type: str, tier: str, count: int = 1) -> Dict[str, Any]:
+        settings = TIERS[tier]
+        return {
+            "taskType": "TEXT_IMAGE",
+            "textToImageParams": {
+                "text": self._create_titan_prompt(prompt, image_type)[:512],
+                "negativeText": "blurry, low quality, distorted, text artifacts"
+            },
+            "imageGenerationConfig": {
+                "numberOfImages": count,
+                "quality": settings["quality"],
+                "height": settings["size"],
+                "width": settings["size"],
+                "cfgScale": 8.5,
+                "seed": 42
+            }
+        }
+
+    def _invoke_titan(self, payload: Dict[str, Any]) -> List[bytes]:
+        """Decoded images from one Titan call (empty if Titan returned none), rate limited."""
+        titan_limiter.acquire()
+        response = self.bedrock_runtime.invoke_model(
+            body=json.dumps(payload),
+            modelId=TITAN_MODEL_ID,
+            contentType='application/json',
+            accept='application/json'
+        )
+        response_body = json.loads(response['body'].read())
+        return [base64.b64decode(data) for data in response_body.get('images') or []]
+
+    def _titan_prefix(self, image_type: str, tier: str) -> str:
+        prefix = "bedrock_flowchart" if image_type == "flowchart" else "bedrock_generated"
+        return prefix + "_preview" if tier == "preview" else prefix
+
+    def generate_variants(self, prompt: str, image_type: str = "general", tier: str = "premium",
+                          count: int = 1) -> List[Tuple[str, str]]:
+        """
+        `count` (1-5) distinct Titan images for one prompt from a single numberOfImages=count call,
+        each cached under its own key. Raises if Bedrock is unavailable or fails.
+        """
+        if not self.bedrock_runtime:
+            raise RuntimeError("Bedrock client not configured")
+        payload = self._titan_payload(prompt, image_type, tier, count)
+        base_key = payload_key(TITAN_MODEL_ID, payload)
+        # Single images keep the plain payload key so they share entries with generate_image
+        keys = [base_key] if count == 1 else [f"{base_key}:{i}" for i in range(count)]
+        cached = [self.cache.get(key) for key in keys]
+        if all(cached):
+            print(f"Image cache hit for: {prompt} (x{count})")
+            return [(name, f"/static/images/{name}") for name in cached]
+
+        print(f"Generating with Titan: {prompt} (x{count})")
+        images = self._invoke_titan(payload)
+        if len(images) < count:
+            raise RuntimeError(f"Titan returned {len(images)} of {count} images")
+        saved = []
+        for key, data in zip(keys, images):
+            entry = self._save_bytes(data, self._titan_prefix(image_type, tier))
+            self.cache.put(key, entry[0])
+            saved.append(entry)
+        return saved
+
+    def generate_fallback(self, prompt: str, image_type: str = "general") -> Optional[Tuple[str, str]]:
+        """Basic PIL diagram, drawn and encoded in the renderer's process pool."""
+        try:
+            prefix = "fallback_flowchart" if image_type == "flowchart" else "fallback_general"
+            return self._save_bytes(self.fallback.render(prompt, image_type), prefix)
+        except Exception as e:
+            print(f"Fallback generation failed: {e}")
+            return None
+
+    def generate_image(self, prompt: str, image_type: str = "general", tier: str = "premium") -> Optional[Tuple[str, str]]:
+        """Generate an image using AWS Bedrock Titan Image Generator v2 at the given tier."""
         if self.bedrock_runtime:
             try:
-                titan_prompt = self._create_titan_prompt(prompt, image_type)
-               
-                payload = {
-                    "taskType": "TEXT_IMAGE",
-                    "textToImageParams": {
-                        "text": titan_prompt[:512],
-                        "negativeText": "blurry, low quality, distorted, text artifacts"
-                    },
-                    "imageGenerationConfig": {
-                        "numberOfImages": 1,
-                        "quality": "premium",
-                        "height": 1024,
-                        "width": 1024,
-                        "cfgScale": 8.5,
-                        "seed": 42
-                    }
-                }
-               
-                print(f"Generating with Titan: {titan_prompt}")
-                response = self.bedrock_runtime.invoke_model(
-                    body=json.dumps(payload),
-                    modelId='amazon.titan-image-generator-v2:0',
-                    contentType='application/json',
-                    accept='application/json'
-                )
-               
-                response_body = json.loads(response['body'].read())
-                if 'images' in response_body and response_body['images']:
-                    base64_data = response_body['images'][0]
-                    image_bytes = base64.b64decode(base64_data)
-                    image_stream = io.BytesIO(image_bytes)
-                    img = Image.open(image_stream)
-                    prefix = "bedrock_flowchart" if image_type == "flowchart" else "bedrock_generated"
-                    return self._save_image(img, prefix)
+                return self.generate_variants(prompt, image_type, tier)[0]
             except Exception as e:
                 print(f"Bedrock generation failed: {e}")
  
         # Fallback to basic PIL diagrams
-        try:
-            img = Image.new("RGB", (1200, 800), color="#f8f9fa")
-            draw = ImageDraw.Draw(img)
-           
-            title_text = f"{image_type.upper()}: {prompt[:50]}{'...' if len(prompt) > 50 else ''}"
-            draw.rectangle([0, 0, 1200, 80], fill="#2563eb")
-            title_bbox = draw.textbbox((0, 0), title_text, font=self.font)
-            title_width = title_bbox[2] - title_bbox[0]
-            title_x = (1200 - title_width) // 2
-            draw.text((title_x, 25), title_text, fill="white", font=self.font)
- 
-            if image_type == "flowchart":
-                steps = prompt.split(",") if "," in prompt else ["Start", "Process", "Decision", "End"]
-                y_pos = 150
-                prev_x, prev_y = None, None
-               
-                for i, step in enumerate(steps):
-                    text = step.strip()
-                    is_decision = "?" in text or "decide" in text.lower()
-                    x1, y1 = 300, y_pos
-                    x2, y2 = 500, y_pos + 70
-                   
-                    if is_decision:
-                        points = [(x1 + 100, y1), (x2, y1 + 35), (x1 + 100, y2), (x1, y1 + 35)]
-                        draw.polygon(points, fill="#fef3c7", outline="#f59e0b", width=2)
-                    else:
-                        draw.rectangle([x1, y1, x2, y2], fill="#eff6ff", outline="#3b82f6", width=2)
-                   
-                    text_bbox = draw.textbbox((0, 0), text, font=self.font)
-                    text_width = text_bbox[2] - text_bbox[0]
-                    text_x = x1 + (x2 - x1 - text_width) // 2
-                    text_y = y1 + 20
-                    draw.text((text_x, text_y), text, fill="#1f2937", font=self.font)
-                   
-                    if prev_x is not None:
-                        draw.line([prev_x + 100, prev_y + 70, x1 + 100, y1], fill="#6b7280", width=2)
-                        draw.polygon([x1 + 95, y1, x1 + 105, y1, x1 + 100, y1 + 5], fill="#6b7280")
-                   
-                    prev_x, prev_y = x1, y1
-                    y_pos += 120
-            else:
-                draw.ellipse([400, 300, 800, 400], fill="#fef3c7", outline="#f59e0b", width=3)
-                text_bbox = draw.textbbox((0, 0), prompt, font=self.font)
-                text_width = text_bbox[2] - text_bbox[0]
-                text_x = 600 - text_width // 2
-                draw.text((text_x, 335), prompt, fill="#92400e", font=self.font)
- 
-            footer_text = "Generated by Enhanced Image Service"
-            footer_bbox = draw.textbbox((0, 0), footer_text, font=self.font)
-            footer_width = footer_bbox[2] - footer_bbox[0]
-            footer_x = 1200 - footer_width - 20
-            draw.text((footer_x, 760), footer_text, fill="#64748b", font=self.font)
- 
-            prefix = "fallback_flowchart" if image_type == "flowchart" else "fallback_general"
-            return self._save_image(img, prefix)
-        except Exception as e:
-            print(f"Fallback generation failed: {e}")
-            return None
+        return self.generate_fallback(prompt, image_type)
  
 # Singleton instance
 image_service = EnhancedImageService()
@@ -0,0 +1,68 @@
+import os
+import json
+import mimetypes
+from typing import Optional, Dict, Any, List
+from ..db import get_db
+from .vector_db import vector_service, MediaVectorStore
+from .storage_service import save_media_stream, get_media_info
+
+REUSE_THRESHOLD = float(os.getenv("IMAGE_REUSE_THRESHOLD", "0.9"))
+# Nearest neighbours to inspect; candidates of another image_type are skipped
+REUSE_CANDIDATES = int(os.getenv("IMAGE_REUSE_CANDIDATES", "5"))
+
+def embed_prompt(prompt: str) -> List[float]:
+    return vector_service.embedding_model.embed_query(prompt)
+
+def _tier(meta: Dict[str, Any]) -> str:
+    # Entries indexed before the tier was recorded: previews are named bedrock_*_preview_*
+    return meta.get("tier") or ("preview" if "_preview_" in (meta.get("filename") or "") else "premium")
+
+def find_reusable(prompt: str, image_type: str, embedding: List[float], tier: str = "premium",
+                  threshold: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """
+    Closest previously generated image of the same image_type with similarity >= threshold.
+    Premium requests only match premium images; previews may be answered with either. Matches
+    are returned as a /media/<id> URL, which the image cache's LRU eviction does not affect.
+    """
+    threshold = REUSE_THRESHOLD if threshold is None else threshold
+    for db in get_db():
+        candidates = vector_service.find_similar_media(db, prompt, content_type="image",
+                                                       limit=REUSE_CANDIDATES, query_vector=embedding)
+    for candidate in candidates:
+        if candidate["similarity"] < threshold:
+            break
+        try:
+            meta = json.loads(candidate["metadata"] or "{}")
+        except ValueError:
+            meta = {}
+        if meta.get("image_type", "general") != image_type:
+            continue
+        if tier == "premium" and _tier(meta) != "premium":
+            continue
+        info = get_media_info(candidate["media_id"])
+        if not info or not info["path"]:
+            continue
+        return {
+            "media_id": candidate["media_id"],
+            "media_url": f"/media/{candidate['media_id']}",
+            "tier": _tier(meta),
+            "matched_prompt": candidate["description"],
+            "similarity": round(candidate["similarity"], 4),
+        }
+    return None
+
+def remember(prompt: str, image_type: str, filename: str, output_dir: str, embedding: List[float],
+             tier: str = "premium") -> int:
+    """
+    Index a generated image under its prompt so later near-identical prompts can reuse it.
+    The image is copied into the media store; identical bytes already indexed are left as they are.
+    """
+    with open(os.path.join(output_dir, filename), "rb") as f:
+        media_id = save_media_stream(filename, mimetypes.guess_type(filename)[0] or "image/png", f)["media_id"]
+    metadata = json.dumps({"image_type": image_type, "filename": filename, "tier": tier})
+    for db in get_db():
+        exists = db.query(MediaVectorStore.id).filter(
+            MediaVectorStore.media_id == media_id, MediaVectorStore.content_type == "image").first()
+        if not exists:
+            vector_service.create_vector(db, media_id, "image", prompt, metadata, embedding=embedding)
+    return media_id
@@ -1,40 +1,162 @@
-from typing import Optional, Tuple
-from sqlalchemy.orm import Session
-from ..db import get_db
-from .vector_db import MediaObject, Session
+import io
+import os
+import uuid
+import hashlib
+import threading
+from typing import Optional, Tuple, BinaryIO, Iterator, Dict, Any
+from sqlalchemy import text
+from ..db import get_db, engine
+from .vector_db import MediaObject
 
-def save_media(filename: str, mimetype: str, data: bytes) -> int:
-    """Save media file to database and return media_id."""
-    size_bytes = len(data)
-    
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+MEDIA_STORAGE_DIR = os.getenv("MEDIA_STORAGE_DIR", os.path.join(_BASE_DIR, "data", "media"))
+CHUNK_SIZE = int(os.getenv("MEDIA_CHUNK_SIZE", str(1024 * 1024)))
+
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+def _ensure_schema() -> None:
+    """Bring older media_objects tables up to date (nullable data, sha256 column and index)."""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE media_objects ADD COLUMN IF NOT EXISTS sha256 VARCHAR(64)"))
+            conn.execute(text("ALTER TABLE media_objects ALTER COLUMN data DROP NOT NULL"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_media_objects_sha256 ON media_objects (sha256)"))
+        _schema_ready = True
+
+def blob_path(sha256: str) -> str:
+    """Blobs are fanned out by hash prefix: <root>/ab/cd/abcd...."""
+    return os.path.join(MEDIA_STORAGE_DIR, sha256[:2], sha256[2:4], sha256)
+
+def write_blob(stream: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Tuple[str, int, bool]:
+    """
+    Copy `stream` into the content-addressed store chunk by chunk, hashing as it goes.
+    Returns (sha256, size_bytes, deduplicated); an existing blob with the same hash is kept.
+    """
+    os.makedirs(MEDIA_STORAGE_DIR, exist_ok=True)
+    tmp = os.path.join(MEDIA_STORAGE_DIR, f".upload-{uuid.uuid4().hex}")
+    digest, size = hashlib.sha256(), 0
+    try:
+        with open(tmp, "wb") as out:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        sha = digest.hexdigest()
+        target = blob_path(sha)
+        if os.path.exists(target):
+            return sha, size, True
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(tmp, target)
+        return sha, size, False
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def save_media_stream(filename: str, mimetype: str, stream: BinaryIO, dedupe: bool = True) -> Dict[str, Any]:
+    """
+    Store media from a file-like object with bounded memory. Identical content is stored
+    once and maps to the same MediaObject; with dedupe=False the blob is still shared but
+    a new MediaObject is always created, so it can later be replaced without affecting
+    anyone else. Returns {"media_id", "sha256", "size_bytes", "deduplicated"}.
+    """
+    _ensure_schema()
+    sha, size, _ = write_blob(stream)
     for db in get_db():
         try:
-            media = MediaObject(
-                filename=filename,
-                mimetype=mimetype,
-                size_bytes=size_bytes,
-                data=data
-            )
+            existing = db.query(MediaObject).filter(MediaObject.sha256 == sha).first() if dedupe else None
+            if existing:
+                return {"media_id": existing.id, "sha256": sha, "size_bytes": size, "deduplicated": True}
+            media = MediaObject(filename=filename, mimetype=mimetype, size_bytes=size, sha256=sha, data=None)
             db.add(media)
             db.commit()
             db.refresh(media)
-            return media.id
+            return {"media_id": media.id, "sha256": sha, "size_bytes": size, "deduplicated": False}
         except Exception as e:
             db.rollback()
             raise Exception(f"Failed to save media: {str(e)}")
 
-def fetch_media(media_id: int) -> Optional[Tuple[str, str, int, bytes]]:
-    """Fetch media file from database."""
+def replace_media_stream(media_id: int, filename: str, mimetype: str, stream: BinaryIO) -> Optional[Dict[str, Any]]:
+    """
+    Point an existing MediaObject at new content (e.g. a premium render replacing its preview).
+    The id stays the same; the sha256 (and so the ETag) changes. Returns None if the id is unknown.
+    Only use this on rows saved with dedupe=False: a deduplicated row may be shared by other callers.
+    """
+    _ensure_schema()
+    sha, size, _ = write_blob(stream)
     for db in get_db():
-        media = db.query(MediaObject)\
+        try:
+            media = db.query(MediaObject).filter(MediaObject.id == media_id).first()
+            if not media:
+                return None
+            media.filename, media.mimetype, media.size_bytes = filename, mimetype, size
+            media.sha256, media.data = sha, None
+            db.commit()
+            return {"media_id": media_id, "sha256": sha, "size_bytes": size}
+        except Exception as e:
+            db.rollback()
+            raise Exception(f"Failed to replace media: {str(e)}")
+
+def save_media(filename: str, mimetype: str, data: bytes) -> int:
+    """Save media file and return media_id."""
+    return save_media_stream(filename, mimetype, io.BytesIO(data))["media_id"]
+
+def get_media_info(media_id: int) -> Optional[Dict[str, Any]]:
+    """Metadata for a media object, including its blob path when it lives in the store."""
+    _ensure_schema()
+    for db in get_db():
+        row = db.query(MediaObject.id, MediaObject.filename, MediaObject.mimetype,
+                       MediaObject.size_bytes, MediaObject.sha256)\
             .filter(MediaObject.id == media_id)\
             .first()
-        
-        if media:
-            return (
-                media.filename,
-                media.mimetype,
-                media.size_bytes,
-                media.data
-            )
+        if not row:
+            return None
+        path = blob_path(row.sha256) if row.sha256 else None
+        return {
+            "media_id": row.id,
+            "filename": row.filename,
+            "mimetype": row.mimetype,
+            "size_bytes": row.size_bytes,
+            "sha256": row.sha256,
+            "path": path if path and os.path.exists(path) else None,
+        }
+
+def iter_media(media_id: int, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Stream a media object's bytes in chunks, from the blob store or (legacy rows) the data column."""
+    info = get_media_info(media_id)
+    if not info:
+        return
+    if info["path"]:
+        with open(info["path"], "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+    # Legacy BYTEA rows: read slices server-side instead of loading the whole blob
+    for db in get_db():
+        offset = 1
+        while True:
+            chunk = db.execute(
+                text("SELECT substring(data FROM :offset FOR :length) FROM media_objects WHERE id = :id"),
+                {"offset": offset, "length": chunk_size, "id": media_id},
+            ).scalar()
+            if not chunk:
+                return
+            yield bytes(chunk)
+            offset += len(chunk)
+
+def fetch_media(media_id: int) -> Optional[Tuple[str, str, int, bytes]]:
+    """Fetch a whole media file into memory; prefer iter_media for anything large."""
+    info = get_media_info(media_id)
+    if not info:
         return None
+    return info["filename"], info["mimetype"], info["size_bytes"], b"".join(iter_media(media_id))
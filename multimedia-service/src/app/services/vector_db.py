@@ -1,12 +1,30 @@
+import os
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, func, Index, text
-from sqlalchemy.dialects.postgresql import ARRAY, BYTEA
+from sqlalchemy.dialects.postgresql import BYTEA
 from sqlalchemy.orm import relationship, Session
 from sqlalchemy.ext.hybrid import hybrid_property
+from pgvector.sqlalchemy import Vector
 from ..db import Base, engine, get_db
 from langchain_aws import BedrockEmbeddings
 
+# Titan text embeddings v2 default to 1024 dimensions
+EMBEDDING_DIM = int(os.getenv("MEDIA_EMBEDDING_DIM", "1024"))
+# Candidate list size for HNSW scans; higher is more accurate and slower
+HNSW_EF_SEARCH = int(os.getenv("MEDIA_HNSW_EF_SEARCH", "40"))
+# One partial HNSW index per content type so filtered searches stay on an index
+CONTENT_TYPES = ("image", "audio", "video")
+
+def _hnsw_index(name: str, content_type: Optional[str] = None) -> Index:
+    return Index(
+        name, 'embedding',
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'},
+        postgresql_where=text(f"content_type = '{content_type}'") if content_type else None,
+    )
+
 class MediaVectorStore(Base):
     """Model for media objects with vector embeddings."""
     __tablename__ = 'media_vectors'
@@ -15,7 +33,7 @@ class MediaVectorStore(Base):
     media_id = Column(Integer, ForeignKey('media_objects.id', ondelete='CASCADE'), nullable=False)
     content_type = Column(String(50), nullable=False)  # 'image', 'audio', 'video'
     description = Column(String, nullable=True)
-    embedding = Column(ARRAY(Float), nullable=False)
+    embedding = Column(Vector(EMBEDDING_DIM), nullable=False)
     meta_data = Column(String, nullable=True)  # JSON string for additional metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), 
@@ -23,9 +41,13 @@ class MediaVectorStore(Base):
                        onupdate=func.now(),
                        nullable=False)
     
-    # Add basic index for the embedding column
+    # Cosine HNSW over all rows, plus per-content-type partial indexes for filtered queries
     __table_args__ = (
-        Index('idx_embedding', 'embedding'),
+        _hnsw_index('idx_media_vectors_embedding_hnsw'),
+        *(_hnsw_index(f'idx_media_vectors_embedding_hnsw_{ct}', ct) for ct in CONTENT_TYPES),
+        Index('idx_media_vectors_content_type', 'content_type'),
+        # One vector per media object and content type; bulk ingest upserts against it
+        Index('uq_media_vectors_media_content_type', 'media_id', 'content_type', unique=True),
     )
     
     # Relationship to media objects
@@ -51,7 +73,8 @@ class MediaObject(Base):
     filename = Column(String, nullable=False)
     mimetype = Column(String, nullable=False)
     size_bytes = Column(Integer, nullable=False)
-    data = Column(BYTEA, nullable=False)
+    sha256 = Column(String(64), nullable=True, index=True)  # content address in the media store
+    data = Column(BYTEA, nullable=True)  # only set on rows stored before the media store
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
 def get_embeddings():
@@ -68,10 +91,12 @@ class VectorService:
         self.embedding_model = get_embeddings()
     
     def create_vector(self, db: Session, media_id: int, content_type: str, 
-                     description: str, metadata: Optional[str] = None) -> Dict[str, Any]:
-        """Create a new vector embedding for media."""
+                     description: str, metadata: Optional[str] = None,
+                     embedding: Optional[List[float]] = None) -> Dict[str, Any]:
+        """Create a new vector embedding for media (pass `embedding` if already computed)."""
         # Generate embedding from description
-        embedding = self.embedding_model.embed_query(description)
+        if embedding is None:
+            embedding = self.embedding_model.embed_query(description)
         
         vector = MediaVectorStore(
             media_id=media_id,
@@ -88,27 +113,31 @@ class VectorService:
     
     def find_similar_media(self, db: Session, query_text: str, 
                           content_type: Optional[str] = None, 
-                          limit: int = 5) -> List[Dict[str, Any]]:
-        """Find similar media using vector similarity."""
+                          limit: int = 5, query_vector: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Find similar media using vector similarity (pass `query_vector` if already computed)."""
         # Generate query embedding
-        query_vector = self.embedding_model.embed_query(query_text)
+        if query_vector is None:
+            query_vector = self.embedding_model.embed_query(query_text)
         
-        # Use the built-in vector operators for similarity search
-        similarity_query = text("""
+        # Cosine distance with the content_type literal in the WHERE clause so the planner can
+        # use the matching partial HNSW index; ORDER BY the bare distance is what the index serves
+        where = "WHERE mv.content_type = :content_type" if content_type else ""
+        similarity_query = text(f"""
             SELECT 
                 mv.*,
-                1 - (mv.embedding <-> :query_vector::vector) as similarity
+                1 - (mv.embedding <=> CAST(:query_vector AS vector)) as similarity
             FROM media_vectors mv
-            WHERE (:content_type IS NULL OR mv.content_type = :content_type)
-            ORDER BY mv.embedding <-> :query_vector::vector
+            {where}
+            ORDER BY mv.embedding <=> CAST(:query_vector AS vector)
             LIMIT :limit
         """)
         
-        # Execute the query with parameters
+        # ef_search must cover the requested limit or HNSW returns fewer rows
+        db.execute(text(f"SET LOCAL hnsw.ef_search = {max(HNSW_EF_SEARCH, int(limit))}"))
         results = db.execute(
             similarity_query,
             {
-                "query_vector": query_vector,
+                "query_vector": str(list(query_vector)),
                 "content_type": content_type,
                 "limit": limit
             }
@@ -156,5 +185,7 @@ class VectorService:
 # Create service instance
 vector_service = VectorService()
 
-# Create tables
+# Create tables (the vector type needs the extension first)
+with engine.begin() as conn:
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
 Base.metadata.create_all(engine)
\ No newline at end of file
@@ -0,0 +1,178 @@
+"""
+Bulk ingestion of media descriptions into media_vectors.
+
+    python -m app.services.vector_ingest items.jsonl [--batch-size 500]
+
+Each JSONL line is {"media_id", "content_type", "description", "metadata"}. Re-running the
+same input resumes: (media_id, content_type) pairs that already have a vector are skipped.
+Items whose media_id has no media_objects row are reported as unknown and never written.
+Concurrent runs rely on the unique (media_id, content_type) index that vector_migration builds.
+"""
+import io
+import os
+import csv
+import sys
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Iterable, Iterator, Optional
+from sqlalchemy import text
+from ..db import engine
+from .vector_db import vector_service
+
+INGEST_BATCH_SIZE = int(os.getenv("VECTOR_INGEST_BATCH_SIZE", "500"))
+EMBED_CHUNK_SIZE = int(os.getenv("VECTOR_EMBED_CHUNK_SIZE", "16"))
+EMBED_CONCURRENCY = int(os.getenv("VECTOR_EMBED_CONCURRENCY", "8"))
+
+def validate_item(item: Any, index: int) -> Dict[str, Any]:
+    """Normalize one record; raises ValueError with a client-facing message."""
+    if not isinstance(item, dict):
+        raise ValueError(f"item {index} must be an object")
+    try:
+        media_id = int(item["media_id"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"item {index} needs an integer media_id")
+    description = str(item.get("description") or "").strip()
+    if not description:
+        raise ValueError(f"item {index} needs a description")
+    metadata = item.get("metadata")
+    return {
+        "media_id": media_id,
+        "content_type": str(item.get("content_type") or "image"),
+        "description": description,
+        "metadata": metadata if metadata is None or isinstance(metadata, str) else json.dumps(metadata),
+    }
+
+def _batches(items: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# Unknown media ids listed per progress event; the count covers the rest
+UNKNOWN_IDS_REPORTED = 20
+
+def _existing(conn, batch: List[Dict[str, Any]]) -> set:
+    rows = conn.execute(text(
+        "SELECT media_id, content_type FROM media_vectors WHERE media_id = ANY(:ids)"
+    ), {"ids": list({item["media_id"] for item in batch})}).fetchall()
+    return {(row.media_id, row.content_type) for row in rows}
+
+def _known_media(conn, batch: List[Dict[str, Any]]) -> set:
+    """Media ids that exist; a single unknown id would otherwise fail the whole COPY on its FK."""
+    return set(conn.execute(text(
+        "SELECT id FROM media_objects WHERE id = ANY(:ids)"
+    ), {"ids": list({item["media_id"] for item in batch})}).scalars().all())
+
+def _embed(texts: List[str], pool: ThreadPoolExecutor) -> List[List[float]]:
+    """Embed in chunks of EMBED_CHUNK_SIZE, at most EMBED_CONCURRENCY chunks in flight."""
+    chunks = [texts[i:i + EMBED_CHUNK_SIZE] for i in range(0, len(texts), EMBED_CHUNK_SIZE)]
+    vectors = []
+    for chunk_vectors in pool.map(vector_service.embedding_model.embed_documents, chunks):
+        vectors.extend(chunk_vectors)
+    return vectors
+
+def _copy_rows(rows: List[Dict[str, Any]], vectors: List[List[float]]) -> int:
+    """
+    COPY a batch into a temp table, then move it into media_vectors in the same transaction,
+    skipping pairs a concurrent run inserted meanwhile. Returns the number of rows inserted.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row, vector in zip(rows, vectors):
+        writer.writerow([row["media_id"], row["content_type"], row["description"],
+                         "[" + ",".join(repr(float(v)) for v in vector) + "]",
+                         row["metadata"] if row["metadata"] is not None else r"\N"])
+    buf.seek(0)
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            cur.execute(
+                "CREATE TEMP TABLE media_vectors_ingest (media_id integer, content_type varchar(50), "
+                "description text, embedding vector, meta_data text) ON COMMIT DROP"
+            )
+            cur.copy_expert(
+                "COPY media_vectors_ingest (media_id, content_type, description, embedding, meta_data) "
+                "FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buf,
+            )
+            cur.execute(
+                "INSERT INTO media_vectors (media_id, content_type, description, embedding, meta_data) "
+                "SELECT media_id, content_type, description, embedding, meta_data FROM media_vectors_ingest "
+                "ON CONFLICT (media_id, content_type) DO NOTHING"
+            )
+            inserted = cur.rowcount
+        raw.commit()
+        return inserted
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+
+def ingest(items: Iterable[Dict[str, Any]], batch_size: int = INGEST_BATCH_SIZE,
+           max_workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Embed and store validated items batch by batch. Yields a "progress" event per batch and
+    a final "done" event with totals and rows/sec. A failing batch is reported and skipped;
+    re-running picks it up again.
+    """
+    started = time.perf_counter()
+    totals = {"inserted": 0, "skipped": 0, "unknown_media": 0, "failed": 0}
+    workers = max(1, min(max_workers or EMBED_CONCURRENCY, EMBED_CONCURRENCY))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for number, batch in enumerate(_batches(items, batch_size), 1):
+            todo, unknown = [], []
+            try:
+                with engine.connect() as conn:
+                    done = _existing(conn, batch)
+                    known = _known_media(conn, batch)
+                seen = set(done)
+                for item in batch:
+                    key = (item["media_id"], item["content_type"])
+                    if item["media_id"] not in known:
+                        unknown.append(item["media_id"])
+                    elif key not in seen:
+                        seen.add(key)
+                        todo.append(item)
+                totals["unknown_media"] += len(unknown)
+                totals["skipped"] += len(batch) - len(todo) - len(unknown)
+                if todo:
+                    inserted = _copy_rows(todo, _embed([item["description"] for item in todo], pool))
+                    totals["inserted"] += inserted
+                    totals["skipped"] += len(todo) - inserted
+                error = None
+            except Exception as e:
+                # Only the rows that were about to be written failed; skipped/unknown ones are counted already
+                totals["failed"] += len(todo) if todo else len(batch)
+                error = str(e)
+                print(f"[vector_ingest] batch {number} failed: {e}")
+            elapsed = time.perf_counter() - started
+            event = {"event": "progress", "batch": number, **totals,
+                     "rows_per_sec": round(totals["inserted"] / elapsed, 1) if elapsed else 0.0}
+            if unknown:
+                event["unknown_media_ids"] = sorted(set(unknown))[:UNKNOWN_IDS_REPORTED]
+            if error:
+                event["error"] = error
+            yield event
+    elapsed = time.perf_counter() - started
+    yield {"event": "done", **totals, "elapsed_s": round(elapsed, 2),
+           "rows_per_sec": round(totals["inserted"] / elapsed, 1) if elapsed else 0.0}
+
+def _read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                yield validate_item(json.loads(line), number)
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python -m app.services.vector_ingest items.jsonl [--batch-size N]")
+        sys.exit(2)
+    size = int(sys.argv[sys.argv.index("--batch-size") + 1]) if "--batch-size" in sys.argv else INGEST_BATCH_SIZE
+    for event in ingest(_read_jsonl(sys.argv[1]), batch_size=size):
+        print(json.dumps(event))
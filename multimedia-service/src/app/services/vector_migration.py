@@ -0,0 +1,91 @@
+"""
+One-off migration of media_vectors from ARRAY(Float) + btree to pgvector vector(n) + HNSW,
+plus the unique (media_id, content_type) index used by bulk ingest.
+
+    python -m app.services.vector_migration [--drop-mismatched]
+
+Safe to re-run: each step checks the current state first. Does not import vector_db, whose
+import creates tables and an embeddings client.
+"""
+import os
+import sys
+import time
+from sqlalchemy import text
+from ..db import engine
+
+EMBEDDING_DIM = int(os.getenv("MEDIA_EMBEDDING_DIM", "1024"))
+CONTENT_TYPES = ("image", "audio", "video")
+
+def _column_type(conn) -> str:
+    return conn.execute(text("""
+        SELECT udt_name FROM information_schema.columns
+        WHERE table_name = 'media_vectors' AND column_name = 'embedding'
+    """)).scalar() or ""
+
+def migrate_media_vectors(drop_mismatched: bool = False) -> None:
+    started = time.time()
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        column_type = _column_type(conn)
+        if not column_type:
+            print("media_vectors does not exist yet; it will be created with the vector column on startup")
+            return
+        if column_type != "vector":
+            mismatched = conn.execute(text(
+                "SELECT COUNT(*) FROM media_vectors WHERE cardinality(embedding) <> :dim"
+            ), {"dim": EMBEDDING_DIM}).scalar()
+            if mismatched:
+                if not drop_mismatched:
+                    raise RuntimeError(
+                        f"{mismatched} rows have embeddings that are not {EMBEDDING_DIM}-dimensional; "
+                        "re-embed them or re-run with --drop-mismatched"
+                    )
+                conn.execute(text("DELETE FROM media_vectors WHERE cardinality(embedding) <> :dim"),
+                             {"dim": EMBEDDING_DIM})
+                print(f"Deleted {mismatched} rows with mismatched dimensions")
+            print(f"Converting media_vectors.embedding from {column_type} to vector({EMBEDDING_DIM})...")
+            conn.execute(text("DROP INDEX IF EXISTS idx_embedding"))
+            conn.execute(text(
+                f"ALTER TABLE media_vectors ALTER COLUMN embedding TYPE vector({EMBEDDING_DIM}) "
+                f"USING embedding::real[]::vector({EMBEDDING_DIM})"
+            ))
+        conn.execute(text("DROP INDEX IF EXISTS idx_embedding"))
+        # Keep the oldest vector per (media_id, content_type) so the unique index can be built
+        duplicates = conn.execute(text("""
+            DELETE FROM media_vectors mv USING media_vectors older
+            WHERE mv.media_id = older.media_id AND mv.content_type = older.content_type AND mv.id > older.id
+        """)).rowcount
+        if duplicates:
+            print(f"Deleted {duplicates} duplicate (media_id, content_type) vectors")
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # An interrupted concurrent build leaves an INVALID index that IF NOT EXISTS would keep
+        invalid = conn.execute(text("""
+            SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+            WHERE i.indrelid = 'media_vectors'::regclass AND NOT i.indisvalid
+        """)).scalars().all()
+        for name in invalid:
+            print(f"Dropping invalid index {name}")
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"'))
+        statements = [
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_media_vectors_content_type ON media_vectors (content_type)",
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS uq_media_vectors_media_content_type "
+            "ON media_vectors (media_id, content_type)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_media_vectors_embedding_hnsw ON media_vectors "
+            "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)",
+        ]
+        statements += [
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_media_vectors_embedding_hnsw_{ct} ON media_vectors "
+            f"USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64) "
+            f"WHERE content_type = '{ct}'"
+            for ct in CONTENT_TYPES
+        ]
+        for statement in statements:
+            print(statement.split(" ON ")[0].replace("UNIQUE ", "").replace("CREATE INDEX CONCURRENTLY IF NOT EXISTS ", "Building "))
+            conn.execute(text(statement))
+        conn.execute(text("ANALYZE media_vectors"))
+    print(f"media_vectors migration finished in {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    migrate_media_vectors(drop_mismatched="--drop-mismatched" in sys.argv[1:])
@@ -1,7 +1,7 @@
 import os
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
-from app.routes import routes_bp
+from app.routes import routes_bp, send_image
 
 # Create Flask app
 app = Flask(__name__, static_folder='static')
@@ -20,7 +20,7 @@ app.register_blueprint(routes_bp)
 # Add a route to serve static images from the correct directory
 @app.route('/static/images/<path:filename>')
 def serve_static_images(filename):
-    return send_from_directory(os.path.join(app.root_path, 'static', 'images'), filename)
+    return send_image(os.path.join(app.root_path, 'static', 'images'), filename)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8001, debug=True)
\ No newline at end of file
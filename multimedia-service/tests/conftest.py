@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+# Keep the module-level queue singleton out of the repo's data directory
+os.environ.setdefault("MM_QUEUE_DB", os.path.join(tempfile.mkdtemp(), "jobs.db"))
@@ -0,0 +1,16 @@
+from app.async_jobs.job_queue import JobQueue
+
+def test_expired_claims_are_dead_lettered_after_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+    job_id = queue.enqueue("image", {"prompt": "poison"}, max_attempts=2)
+
+    # The worker crashes each time: it never acks or nacks, and the claim expires at once
+    for attempt in (1, 2):
+        job = queue.claim("worker-1", visibility_timeout=0)
+        assert job["id"] == job_id and job["attempts"] == attempt
+
+    assert queue.claim("worker-1", visibility_timeout=0) is None
+    status = queue.status(job_id)
+    assert status["status"] == "dead"
+    assert status["attempts"] == 2
+    assert queue.metrics()["dead_letter"] == 1
@@ -62,7 +62,7 @@ def get_user_weaknesses(user_id):
 
 @bp.route("/weakness/similar", methods=["POST"])
 def find_similar_weaknesses():
-    """Find similar weaknesses using vector similarity."""
+    """Find similar weaknesses using vector similarity (optionally only one user's, via user_id)."""
     data = request.get_json(silent=True) or {}
     query_text = data.get("query_text")
     limit = data.get("limit", 5)
@@ -71,7 +71,7 @@ def find_similar_weaknesses():
         return jsonify({"error": "query_text is required"}), 400
     
     try:
-        similar = vector_store_pg.find_similar_weaknesses(query_text, limit)
+        similar = vector_store_pg.find_similar_weaknesses(query_text, limit, user_id=data.get("user_id"))
         return jsonify(similar), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -1,10 +1,15 @@
+import os
 from datetime import datetime
 from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, func, Index, create_engine
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship, Session
 from sqlalchemy.ext.hybrid import hybrid_property
+from pgvector.sqlalchemy import Vector
 from .database import Base
 
+# Titan text embeddings v2 default to 1024 dimensions
+EMBEDDING_DIM = int(os.getenv("WEAKNESS_EMBEDDING_DIM", "1024"))
+
 class UserWeakness(Base):
     """Model for user weaknesses with vector embeddings."""
     __tablename__ = 'user_weakness'
@@ -12,18 +17,18 @@ class UserWeakness(Base):
     id = Column(Integer, primary_key=True)
     user_id = Column(String(255), nullable=False, index=True)
     weakness_text = Column(String, nullable=False)
-    embedding = Column(ARRAY(Float), nullable=False)
+    embedding = Column(Vector(EMBEDDING_DIM), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), 
                        server_default=func.now(),
                        onupdate=func.now(),
                        nullable=False)
     
-    # Add vector similarity index using raw SQL (will be created in migration)
+    # Cosine HNSW for global searches; user-scoped searches scan the user's rows via the user_id index
     __table_args__ = (
-        Index('vector_l2_idx', 'embedding', postgresql_using='ivfflat',
-              postgresql_with={'lists': '100'},
-              postgresql_ops={'embedding': 'vector_l2_ops'}),
+        Index('user_weakness_embedding_hnsw_idx', 'embedding', postgresql_using='hnsw',
+              postgresql_with={'m': 16, 'ef_construction': 64},
+              postgresql_ops={'embedding': 'vector_cosine_ops'}),
     )
     
     @hybrid_property
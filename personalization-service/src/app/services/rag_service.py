@@ -1,8 +1,9 @@
 import os
+import json
 from typing import List, Dict, Any, Optional
 from langchain.chains import RetrievalQA
 from langchain_aws import ChatBedrockConverse
-from .vector_store_pg import get_store, save_user_weakness, find_similar_weaknesses  # pgvector-backed store
+from . import vector_store_pg  # pgvector-backed store
 
 # -------------------------
 # LLM initializer
@@ -52,44 +53,8 @@ def analyze_topic_weaknesses(topic: str, user_weaknesses: List[Dict[str, Any]])
 def find_relevant_weaknesses(topic: str, user_id: str) -> List[Dict[str, Any]]:
     """Find weaknesses relevant to the current topic using vector similarity."""
     try:
-        # Get user's specific weaknesses first
-        store = get_store()
-        retriever = store.as_retriever(
-            search_kwargs={
-                "k": 3,
-                "filter": {"metadata": {"user_id": user_id}},
-                "fetch_k": 10  # Fetch more candidates for better matching
-            }
-        )
-        
-        # Search with the topic as query
-        user_results = retriever.get_relevant_documents(topic)
-        print(f"[DEBUG] Found {len(user_results)} user-specific weaknesses for user {user_id}")
-        
-        # Find similar weaknesses across all users
-        topic_related = find_similar_weaknesses(topic, limit=3)
-        print(f"[DEBUG] Found {len(topic_related)} topic-related weaknesses")
-        
-        # Combine and deduplicate results
-        all_weaknesses = {}
-        
-        # Add topic-related weaknesses
-        for w in topic_related:
-            all_weaknesses[w["id"]] = w
-        
-        # Add user-specific weaknesses
-        for doc in user_results:
-            doc_id = doc.metadata.get("id")
-            if doc_id and doc_id not in all_weaknesses:
-                all_weaknesses[doc_id] = {
-                    "id": doc_id,
-                    "weakness_text": doc.page_content,
-                    "user_id": doc.metadata.get("user_id", user_id),
-                    "similarity": doc.metadata.get("similarity", 0.0)
-                }
-        
-        results = list(all_weaknesses.values())
-        print(f"[DEBUG] Combined {len(results)} unique relevant weaknesses")
+        results = vector_store_pg.find_relevant_weaknesses(topic, user_id, user_limit=3, global_limit=3)
+        print(f"[DEBUG] Combined {len(results)} unique relevant weaknesses for user {user_id}")
         return results
         
     except Exception as e:
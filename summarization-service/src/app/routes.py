@@ -1,5 +1,6 @@
 from flask import Blueprint, request, jsonify
 from .services import summarizer_service
+from .services.session_service import session_store
 
 bp = Blueprint("summarization_service", __name__)
 
@@ -9,12 +10,117 @@ def summarize_text():
     text = data.get("text")
     format_type = data.get("format_type", "bulleted list")
     length = data.get("length", "medium")
+    chunk_tokens = data.get("chunk_tokens")
+    max_concurrency = data.get("max_concurrency")
+    # "extractive": true uses the default budget; "extractive_tokens" sets it explicitly
+    extractive_tokens = data.get("extractive_tokens")
+    if extractive_tokens is None and data.get("extractive"):
+        extractive_tokens = summarizer_service.EXTRACTIVE_TOKENS
 
     if not text:
         return jsonify({"error": "text is required"}), 400
+    try:
+        chunk_tokens = int(chunk_tokens) if chunk_tokens is not None else None
+        max_concurrency = int(max_concurrency) if max_concurrency is not None else None
+        extractive_tokens = int(extractive_tokens) if extractive_tokens is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "chunk_tokens, max_concurrency and extractive_tokens must be integers"}), 400
+
+    # Several (format_type, length) variants of the same text in one request
+    variants = data.get("variants")
+    if variants is not None:
+        if not isinstance(variants, list) or not variants or not all(isinstance(v, dict) for v in variants):
+            return jsonify({"error": "variants must be a non-empty list of objects"}), 400
+        if len(variants) > summarizer_service.MAX_VARIANTS:
+            return jsonify({"error": f"at most {summarizer_service.MAX_VARIANTS} variants per request"}), 400
+        variants = [
+            {"format_type": v.get("format_type", format_type), "length": v.get("length", length)}
+            for v in variants
+        ]
 
     try:
-        summary = summarizer_service.summarize_text_custom(text, format_type, length)
-        return jsonify({"summary": summary}), 200
+        if variants:
+            result = summarizer_service.summarize_variants(
+                text, variants,
+                extractive_tokens=extractive_tokens, chunk_tokens=chunk_tokens, max_workers=max_concurrency
+            )
+        else:
+            result = summarizer_service.summarize_text_pipeline(
+                text, format_type, length,
+                extractive_tokens=extractive_tokens, chunk_tokens=chunk_tokens, max_workers=max_concurrency
+            )
+        return jsonify(result), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+# -------------------------
+# Incremental (session) summarization for append-only text
+# -------------------------
+@bp.route("/summarize-session", methods=["POST"])
+def create_summary_session():
+    """
+    Start a session for a growing text (e.g. a live transcript).
+    Expects JSON: { "chunk_tokens": 3000, "text": "optional initial text" }
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        chunk_tokens = int(data["chunk_tokens"]) if data.get("chunk_tokens") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "chunk_tokens must be an integer"}), 400
+    try:
+        session = session_store.create(chunk_tokens)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 503
+    if data.get("text"):
+        with session.lock:
+            session.append(data["text"])
+    return jsonify({"session_id": session.id, "chunk_tokens": session.chunk_tokens}), 201
+
+@bp.route("/summarize-session/<session_id>/append", methods=["POST"])
+def append_summary_session(session_id):
+    """Append text to a session. Expects JSON: { "text": "..." }"""
+    data = request.get_json(silent=True) or {}
+    text = data.get("text")
+    if not text:
+        return jsonify({"error": "text is required"}), 400
+    session = session_store.get(session_id)
+    if not session:
+        return jsonify({"error": "session not found"}), 404
+    with session.lock:
+        session.append(text)
+        return jsonify({
+            "session_id": session.id,
+            "total_tokens": session.total_tokens,
+            "sealed_chunks": len(session.sealed_chunks),
+        }), 200
+
+@bp.route("/summarize-session/<session_id>/refresh", methods=["POST"])
+def refresh_summary_session(session_id):
+    """
+    Summarize only what changed since the last refresh and reduce over cached partials.
+    Expects JSON: { "format_type": "bulleted list", "length": "medium", "max_concurrency": 4 }
+    """
+    data = request.get_json(silent=True) or {}
+    session = session_store.get(session_id)
+    if not session:
+        return jsonify({"error": "session not found"}), 404
+    try:
+        max_workers = int(data.get("max_concurrency") or summarizer_service.MAP_CONCURRENCY)
+    except (TypeError, ValueError):
+        return jsonify({"error": "max_concurrency must be an integer"}), 400
+    max_workers = max(1, min(max_workers, summarizer_service.MAP_CONCURRENCY))
+
+    try:
+        with session.lock:
+            result = session.refresh(
+                data.get("format_type", "bulleted list"), data.get("length", "medium"), max_workers
+            )
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route("/summarize-session/<session_id>", methods=["DELETE"])
+def delete_summary_session(session_id):
+    if session_store.delete(session_id):
+        return "", 204
+    return jsonify({"error": "session not found"}), 404
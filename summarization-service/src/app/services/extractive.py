@@ -0,0 +1,112 @@
+import re
+import math
+from collections import Counter
+from typing import List, Tuple, Dict, Any
+import numpy as np
+
+# Above this many sentences the dense S x S TextRank graph gets expensive; rank by
+# similarity to the document centroid instead.
+TEXTRANK_MAX_SENTENCES = 1500
+MAX_FEATURES = 2048
+REDUNDANCY_THRESHOLD = 0.8
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])|\n{2,}|\n(?=\s*[-*•]|\s*\d+[.)]\s)")
+_WORD = re.compile(r"[^\W\d_]{2,}", re.UNICODE)
+_STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she should
+so some such than that the their theirs them themselves then there these they this those through to
+too under until up very was we were what when where which while who whom why will with would you your
+yours yourself yourselves okay ok yeah yes um uh like gonna well right also really
+""".split())
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English prose)."""
+    return (len(text or "") + 3) // 4
+
+def split_sentences(text: str) -> List[str]:
+    """Rule-based sentence segmentation; paragraph breaks and list items also end a sentence."""
+    parts = (s.strip() for s in _SENTENCE_SPLIT.split(text or ""))
+    return [re.sub(r"\s+", " ", s) for s in parts if s]
+
+def tfidf_matrix(sentences: List[str], max_features: int = MAX_FEATURES) -> np.ndarray:
+    """L2-normalized TF-IDF rows (sublinear tf) over the most frequent non-stopword terms."""
+    docs = [[w for w in _WORD.findall(s.lower()) if w not in _STOPWORDS] for s in sentences]
+    df = Counter(w for d in docs for w in set(d))
+    vocab = {w: i for i, (w, _) in enumerate(df.most_common(max_features))}
+    X = np.zeros((len(sentences), len(vocab)), dtype=np.float32)
+    for row, words in enumerate(docs):
+        for w, c in Counter(words).items():
+            col = vocab.get(w)
+            if col is not None:
+                X[row, col] = 1.0 + math.log(c)
+    n = len(sentences)
+    idf = np.array([math.log((1 + n) / (1 + df[w])) + 1.0 for w in vocab], dtype=np.float32)
+    X *= idf
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return X / norms
+
+def textrank_scores(X: np.ndarray, damping: float = 0.85, iterations: int = 50, tol: float = 1e-6) -> np.ndarray:
+    """PageRank over the cosine-similarity graph of sentence vectors."""
+    n = X.shape[0]
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    sim = X @ X.T
+    np.fill_diagonal(sim, 0.0)
+    sim[sim < 0] = 0.0
+    out = sim.sum(axis=1, keepdims=True)
+    # Dangling sentences (no shared terms) spread their rank uniformly
+    trans = np.where(out > 0, sim / np.where(out > 0, out, 1.0), 1.0 / n)
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (trans.T @ scores)
+        if np.abs(updated - scores).sum() < tol:
+            return updated
+        scores = updated
+    return scores
+
+def centroid_scores(X: np.ndarray) -> np.ndarray:
+    """Cosine similarity of each sentence to the document centroid."""
+    centroid = X.mean(axis=0)
+    norm = np.linalg.norm(centroid)
+    return X @ (centroid / norm) if norm else np.zeros(X.shape[0], dtype=np.float32)
+
+def compress(text: str, token_budget: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    Keep the most central sentences, in original order, up to `token_budget` estimated tokens.
+    Near-duplicate sentences (cosine > REDUNDANCY_THRESHOLD to one already kept) are skipped,
+    which is where most of the savings on repetitive transcripts come from.
+    """
+    original_tokens = estimate_tokens(text)
+    sentences = split_sentences(text)
+    if original_tokens <= token_budget or len(sentences) < 2:
+        return text, {"sentences": len(sentences), "kept_sentences": len(sentences), "method": "none"}
+
+    X = tfidf_matrix(sentences)
+    method = "textrank" if len(sentences) <= TEXTRANK_MAX_SENTENCES else "centroid"
+    scores = textrank_scores(X) if method == "textrank" else centroid_scores(X)
+
+    kept, used = [], 0
+    for idx in np.argsort(-scores, kind="stable"):
+        cost = estimate_tokens(sentences[idx]) + 1
+        if used + cost > token_budget:
+            continue
+        if kept and float(np.max(X[kept] @ X[idx])) > REDUNDANCY_THRESHOLD:
+            continue
+        kept.append(int(idx))
+        used += cost
+
+    if not kept:
+        # Every sentence is over budget (e.g. long unpunctuated paragraphs): keep the top-ranked
+        # one cut to the budget at a word boundary rather than returning nothing
+        top = sentences[int(np.argmax(scores))]
+        limit = max(1, token_budget) * 4
+        cut = top[:limit].rsplit(" ", 1)[0] if len(top) > limit else top
+        return cut or top[:limit], {"sentences": len(sentences), "kept_sentences": 1,
+                                    "method": method, "truncated": True}
+
+    condensed = " ".join(sentences[i] for i in sorted(kept))
+    return condensed, {"sentences": len(sentences), "kept_sentences": len(kept), "method": method}
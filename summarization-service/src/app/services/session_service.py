@@ -0,0 +1,139 @@
+import os
+import time
+import uuid
+import hashlib
+import threading
+from typing import Dict, Any, List, Optional
+from . import summarizer_service
+from .extractive import estimate_tokens
+
+SESSION_TTL_SECONDS = int(os.getenv("SUMMARY_SESSION_TTL_SECONDS", "7200"))
+MAX_SESSIONS = int(os.getenv("SUMMARY_MAX_SESSIONS", "500"))
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+def _offset_after(text: str, nonspace: int) -> int:
+    """Index in `text` just past its first `nonspace` non-whitespace characters."""
+    seen = 0
+    for i, ch in enumerate(text):
+        if seen == nonspace:
+            return i
+        if not ch.isspace():
+            seen += 1
+    return len(text)
+
+class SummarySession:
+    """
+    Append-only text with cached per-chunk summaries.
+
+    Text is split into sealed chunks (full, never re-summarized) and an open tail that
+    is still growing. A refresh maps only newly sealed chunks plus the tail (if it changed)
+    and re-runs the reduce over the cached partials.
+    """
+
+    def __init__(self, chunk_tokens: int):
+        self.id = uuid.uuid4().hex
+        self.chunk_tokens = chunk_tokens
+        self.lock = threading.Lock()
+        self.created_at = self.touched_at = time.time()
+        self.total_tokens = 0
+        self.sealed_chunks: List[str] = []
+        self.sealed_partials: List[str] = []
+        self.tail = ""
+        self.tail_partial: Optional[tuple] = None  # (digest, summary)
+        self.last_reduce: Optional[tuple] = None   # (digest, summary)
+
+    def append(self, text: str) -> None:
+        """Add text and seal every chunk that can no longer change."""
+        self.tail += text
+        self.total_tokens += estimate_tokens(text)
+        if estimate_tokens(self.tail) <= self.chunk_tokens:
+            return
+        chunks = summarizer_service.chunk_text(self.tail, self.chunk_tokens)
+        if len(chunks) < 2:
+            return
+        self.sealed_chunks.extend(chunks[:-1])
+        # chunk_text only rewrites whitespace, so skip as many non-space characters as were
+        # sealed and keep the raw remainder; later appends then join the text as sent
+        self.tail = self.tail[_offset_after(self.tail, sum(len("".join(c.split())) for c in chunks[:-1])):]
+
+    def refresh(self, format_type: str, length: str, max_workers: int) -> Dict[str, Any]:
+        started = time.perf_counter()
+        new_chunks = self.sealed_chunks[len(self.sealed_partials):]
+        self.sealed_partials.extend(summarizer_service.map_summaries(
+            new_chunks, max_workers, start_index=len(self.sealed_partials), growing=True
+        ))
+
+        tail_summarized = False
+        partials = list(self.sealed_partials)
+        if self.tail.strip():
+            tail_key = _digest(self.tail)
+            if not self.tail_partial or self.tail_partial[0] != tail_key:
+                summary = summarizer_service.map_summaries(
+                    [self.tail], 1, start_index=len(self.sealed_chunks), growing=True
+                )[0]
+                self.tail_partial = (tail_key, summary)
+                tail_summarized = True
+            partials.append(self.tail_partial[1])
+        map_ms = round((time.perf_counter() - started) * 1000, 1)
+
+        started = time.perf_counter()
+        reduce_key = _digest(format_type, length, *partials)
+        reused = bool(self.last_reduce and self.last_reduce[0] == reduce_key)
+        if not reused:
+            summary = (summarizer_service.reduce_partials(
+                partials, format_type, length, self.chunk_tokens, max_workers
+            ) if partials else "")
+            self.last_reduce = (reduce_key, summary)
+
+        return {
+            "session_id": self.id,
+            "summary": self.last_reduce[1],
+            "stats": {
+                "total_tokens": self.total_tokens,
+                "sealed_chunks": len(self.sealed_chunks),
+                "new_chunks_summarized": len(new_chunks) + int(tail_summarized),
+                "cached_chunks_reused": len(partials) - len(new_chunks) - int(tail_summarized),
+                "reduce_reused": reused,
+                "timings": {"map_ms": map_ms, "reduce_ms": round((time.perf_counter() - started) * 1000, 1)},
+            },
+        }
+
+class SummarySessionStore:
+    """In-process session registry with idle expiry; sessions are pinned to one worker."""
+
+    def __init__(self, ttl_seconds: int = SESSION_TTL_SECONDS, max_sessions: int = MAX_SESSIONS):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: Dict[str, SummarySession] = {}
+        self._lock = threading.Lock()
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        for sid in [sid for sid, s in self._sessions.items() if s.touched_at < cutoff]:
+            del self._sessions[sid]
+
+    def create(self, chunk_tokens: Optional[int] = None) -> SummarySession:
+        with self._lock:
+            self._expire()
+            if len(self._sessions) >= self.max_sessions:
+                raise RuntimeError("too many active summarization sessions")
+            session = SummarySession(max(256, chunk_tokens or summarizer_service.CHUNK_TOKENS))
+            self._sessions[session.id] = session
+            return session
+
+    def get(self, session_id: str) -> Optional[SummarySession]:
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session:
+                session.touched_at = time.time()
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+# Singleton instance
+session_store = SummarySessionStore()
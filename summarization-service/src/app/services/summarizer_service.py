@@ -1,16 +1,35 @@
 import os
+import re
+import time
+from typing import List, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
 from langchain_aws import ChatBedrockConverse
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
+from .extractive import compress, estimate_tokens
 
-def _llm(temperature=0.3, max_tokens=2048):
+# Map-reduce configuration. Inputs estimated above SUMMARY_SINGLE_PASS_TOKENS are split into
+# chunks of at most SUMMARY_CHUNK_TOKENS, summarized concurrently on the faster map model,
+# and the partial summaries are reduced on the main model.
+SINGLE_PASS_TOKENS = int(os.getenv("SUMMARY_SINGLE_PASS_TOKENS", "6000"))
+CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))
+MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4"))
+MAP_MODEL_ID = os.getenv("SUMMARY_MAP_MODEL_ID", "anthropic.claude-3-haiku-20240307-v1:0")
+MAX_COLLAPSE_ROUNDS = 3
+# Default token budget for the optional extractive pre-compression stage
+EXTRACTIVE_TOKENS = int(os.getenv("SUMMARY_EXTRACTIVE_TOKENS", "3000"))
+# Multi-variant requests: inputs below this size are used directly as the shared intermediate
+VARIANT_NOTES_MIN_TOKENS = int(os.getenv("SUMMARY_VARIANT_NOTES_MIN_TOKENS", "1500"))
+MAX_VARIANTS = 6
+
+def _llm(temperature=0.3, max_tokens=2048, model_id: str = None):
     """
     Use Bedrock Converse via LangChain for robust summarization.
     Pass temperature and max_tokens directly (not via model_kwargs)
     """
     return ChatBedrockConverse(
         region_name=os.getenv("AWS_REGION", "us-east-1"),
-        model_id=os.getenv(
+        model_id=model_id or os.getenv(
             "BEDROCK_MODEL_ID",
             "anthropic.claude-3-5-sonnet-20240620-v1:0"
         ),
@@ -19,29 +38,233 @@ def _llm(temperature=0.3, max_tokens=2048):
         # remove model_kwargs entirely
     )
 
-def summarize_text_custom(text: str, format_type: str, length: str) -> str:
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def _split_oversized(piece: str, max_tokens: int) -> List[str]:
+    """Break a paragraph that exceeds the budget into sentences, then words if still too long."""
+    parts = []
+    for sentence in _SENTENCE_END.split(piece):
+        if estimate_tokens(sentence) <= max_tokens:
+            parts.append(sentence)
+            continue
+        words, step = sentence.split(), max(1, max_tokens * 4 // 6)
+        parts.extend(" ".join(words[i:i + step]) for i in range(0, len(words), step))
+    return parts
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS) -> List[str]:
     """
-    Summarize text with user-controlled format and length.
-    length in {"short","medium","long"}
-    format_type examples: "bulleted list", "paragraph"
+    Greedily pack paragraphs (falling back to sentences) into chunks of at most
+    `max_tokens` estimated tokens, keeping the original order.
+    """
+    pieces = []
+    for para in re.split(r"\n\s*\n", text or ""):
+        para = para.strip()
+        if not para:
+            continue
+        pieces.extend([para] if estimate_tokens(para) <= max_tokens else _split_oversized(para, max_tokens))
+
+    chunks, current, size = [], [], 0
+    for piece in pieces:
+        cost = estimate_tokens(piece) + 1
+        if current and size + cost > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += cost
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+def _map_chunk(chunk: str, index: int, total: Optional[int]) -> str:
+    position = f"part {index + 1} of {total}" if total else f"part {index + 1}"
+    prompt = (
+        f"You are summarizing {position} of a longer document.\n"
+        "Write a dense summary of this part that keeps every key point, decision, name, "
+        "number and action item. Do not add an introduction or conclusion.\n\n"
+        f"Text:\n---\n{chunk}\n---\n"
+        "Respond with only the summary."
+    )
+    return _llm(temperature=0.2, max_tokens=1024, model_id=MAP_MODEL_ID).invoke(prompt).content
+
+def map_summaries(chunks: List[str], max_workers: int = MAP_CONCURRENCY,
+                  start_index: int = 0, growing: bool = False) -> List[str]:
+    """
+    Summarize chunks concurrently; results keep chunk order. `start_index` and `growing`
+    only affect how parts are labelled in the prompt ("part 3" vs "part 3 of 7").
     """
+    if not chunks:
+        return []
+    total = None if growing else len(chunks)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        return list(pool.map(
+            lambda args: _map_chunk(args[1], start_index + args[0], total), enumerate(chunks)
+        ))
+
+def _final_summary(text: str, format_type: str, length: str, from_partials: bool = False) -> str:
     length_map = {
         "short": "one concise paragraph",
         "medium": "a bulleted list of 3-5 key points",
         "long": "a detailed summary with an introduction, key findings, and a conclusion"
     }
     desc = length_map.get(length, length_map["medium"])
+    source_note = (
+        "The input consists of consecutive section summaries of one longer document; "
+        "treat them as a single text.\n\n" if from_partials else ""
+    )
 
     template = (
         "You are a professional summarizer.\n\n"
+        "{source_note}"
         "Summarize the input text into a {format_type} with {desc}.\n\n"
         "Text:\n---\n{text}\n---\n"
         "Respond with only the summary."
     )
     prompt = PromptTemplate(
-        input_variables=["text", "format_type", "desc"],
+        input_variables=["text", "format_type", "desc", "source_note"],
         template=template
     )
     chain = LLMChain(llm=_llm(), prompt=prompt)
-    resp = chain.invoke({"text": text, "format_type": format_type, "desc": desc})
+    resp = chain.invoke({"text": text, "format_type": format_type, "desc": desc, "source_note": source_note})
     return resp["text"]
+
+def _ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+def collapse_partials(partials: List[str], chunk_tokens: int = CHUNK_TOKENS,
+                      max_workers: int = MAP_CONCURRENCY) -> str:
+    """Join ordered partial summaries, re-mapping them while they are too long for one pass."""
+    combined = "\n\n".join(partials)
+    for _ in range(MAX_COLLAPSE_ROUNDS):
+        if estimate_tokens(combined) <= SINGLE_PASS_TOKENS or len(partials) <= 1:
+            break
+        partials = map_summaries(chunk_text(combined, chunk_tokens), max_workers)
+        combined = "\n\n".join(partials)
+    return combined
+
+def reduce_partials(partials: List[str], format_type: str, length: str,
+                    chunk_tokens: int = CHUNK_TOKENS, max_workers: int = MAP_CONCURRENCY) -> str:
+    """Reduce ordered partial summaries into the requested format."""
+    combined = collapse_partials(partials, chunk_tokens, max_workers)
+    return _final_summary(combined, format_type, length, from_partials=True)
+
+def summarize_text_pipeline(text: str, format_type: str, length: str,
+                            extractive_tokens: Optional[int] = None,
+                            chunk_tokens: Optional[int] = None,
+                            max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Summarize text and report what each stage did.
+
+    Stages: optional local extractive pre-compression (when `extractive_tokens` is set,
+    only the condensed text reaches the LLM), then a single pass for short inputs or
+    map-reduce for long ones. Returns {"summary": str, "stats": {...}} with token counts,
+    compression ratio and per-stage timings in milliseconds.
+    """
+    timings = {}
+    original_tokens = estimate_tokens(text)
+    extractive = None
+
+    if extractive_tokens:
+        started = time.perf_counter()
+        text, extractive = compress(text, max(256, extractive_tokens))
+        timings["extractive_ms"] = _ms(started)
+    llm_input_tokens = estimate_tokens(text)
+
+    if llm_input_tokens <= SINGLE_PASS_TOKENS:
+        started = time.perf_counter()
+        summary = _final_summary(text, format_type, length)
+        timings["summarize_ms"] = _ms(started)
+        chunks = 1
+    else:
+        chunk_tokens = max(256, chunk_tokens or CHUNK_TOKENS)
+        max_workers = max(1, min(max_workers or MAP_CONCURRENCY, MAP_CONCURRENCY))
+        started = time.perf_counter()
+        pieces = chunk_text(text, chunk_tokens)
+        chunks = len(pieces)
+        partials = map_summaries(pieces, max_workers)
+        timings["map_ms"] = _ms(started)
+
+        started = time.perf_counter()
+        summary = reduce_partials(partials, format_type, length, chunk_tokens, max_workers)
+        timings["reduce_ms"] = _ms(started)
+
+    stats = {
+        "original_tokens": original_tokens,
+        "llm_input_tokens": llm_input_tokens,
+        "compression_ratio": round(llm_input_tokens / original_tokens, 4) if original_tokens else 1.0,
+        "chunks": chunks,
+        "timings": timings,
+    }
+    if extractive:
+        stats["extractive"] = extractive
+    return {"summary": summary, "stats": stats}
+
+def summarize_text_custom(text: str, format_type: str, length: str,
+                          chunk_tokens: Optional[int] = None,
+                          max_workers: Optional[int] = None) -> str:
+    """
+    Summarize text with user-controlled format and length.
+    length in {"short","medium","long"}
+    format_type examples: "bulleted list", "paragraph"
+
+    Short inputs go to the main model in a single pass. Long inputs are map-reduced:
+    chunked, summarized in parallel on the map model, and reduced with the requested
+    format and length (collapsing the partials again if they are still too long).
+    """
+    return summarize_text_pipeline(
+        text, format_type, length, chunk_tokens=chunk_tokens, max_workers=max_workers
+    )["summary"]
+
+def summarize_variants(text: str, variants: List[Dict[str, str]],
+                       extractive_tokens: Optional[int] = None,
+                       chunk_tokens: Optional[int] = None,
+                       max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Produce several (format_type, length) summaries of one text from a single read.
+
+    The source is condensed once into a shared intermediate (the text itself when it is
+    small, otherwise map-stage notes) and every variant is derived from that intermediate
+    concurrently, so the full input is only sent to the LLM once.
+    """
+    timings = {}
+    chunk_tokens = max(256, chunk_tokens or CHUNK_TOKENS)
+    max_workers = max(1, min(max_workers or MAP_CONCURRENCY, MAP_CONCURRENCY))
+    original_tokens = estimate_tokens(text)
+    extractive = None
+
+    if extractive_tokens:
+        started = time.perf_counter()
+        text, extractive = compress(text, max(256, extractive_tokens))
+        timings["extractive_ms"] = _ms(started)
+    llm_input_tokens = estimate_tokens(text)
+
+    started = time.perf_counter()
+    if llm_input_tokens <= VARIANT_NOTES_MIN_TOKENS:
+        intermediate, from_partials, chunks = text, False, 0
+    else:
+        pieces = chunk_text(text, chunk_tokens)
+        intermediate = collapse_partials(map_summaries(pieces, max_workers), chunk_tokens, max_workers)
+        from_partials, chunks = True, len(pieces)
+    timings["condense_ms"] = _ms(started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(variants)))) as pool:
+        outputs = list(pool.map(
+            lambda v: _final_summary(intermediate, v["format_type"], v["length"], from_partials=from_partials),
+            variants
+        ))
+    timings["variants_ms"] = _ms(started)
+
+    stats = {
+        "original_tokens": original_tokens,
+        "llm_input_tokens": llm_input_tokens,
+        "intermediate_tokens": estimate_tokens(intermediate),
+        "compression_ratio": round(llm_input_tokens / original_tokens, 4) if original_tokens else 1.0,
+        "chunks": chunks,
+        "timings": timings,
+    }
+    if extractive:
+        stats["extractive"] = extractive
+    return {
+        "summaries": [{**v, "summary": out} for v, out in zip(variants, outputs)],
+        "stats": stats,
+    }
@@ -0,0 +1,23 @@
+from app.services.session_service import SummarySession
+
+def _nonspace(text):
+    return "".join(text.split())
+
+def test_append_keeps_text_identical_after_seal():
+    session = SummarySession(chunk_tokens=20)
+    parts = [
+        "alpha beta gamma delta epsilon. " * 3 + "\n\n",
+        "Second paragraph with a few words.\n\n",
+        "delta epsilon.",
+        " Zeta starts here.",
+        "\n\nAnother paragraph.  ",
+    ]
+    sent = ""
+    for part in parts:
+        session.append(part)
+        sent += part
+        # The open tail is the raw unsealed remainder, whitespace included
+        assert sent.endswith(session.tail)
+        assert _nonspace("".join(session.sealed_chunks) + session.tail) == _nonspace(sent)
+    assert session.sealed_chunks
+    assert "delta epsilon. Zeta starts here." in session.tail
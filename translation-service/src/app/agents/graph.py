@@ -1,8 +1,10 @@
-import os
-import json
 from typing import TypedDict
 from langgraph.graph import StateGraph, END
-from langchain_aws import ChatBedrockConverse
+from langchain_core.runnables import RunnableConfig
+from app.services.localization_service import translate_document, repair_segments
+from app.services.qa_checks import check_segments
+from app.services.segmenter import reassemble
+from app.services.translation_memory import translation_memory, glossary_version
 
 class State(TypedDict):
     text: str
@@ -14,56 +16,77 @@ class State(TypedDict):
     qa_notes: str
     final: str
     errors: list[str]
+    stats: dict
+    segments: list
+    qa_issues: list
 
-def _llm(temp=0.2, max_tokens=2048):
-    return ChatBedrockConverse(
-        region_name=os.getenv("AWS_REGION", "us-east-1"),
-        model_id=os.getenv("BEDROCK_MODEL_ID", "anthropic.claude-3-haiku-20240307-v1:0"),
-        model_kwargs={"temperature": temp, "max_tokens": max_tokens}
-    )
-
-def translate(state: State):
-    glossary_str = json.dumps(state.get("glossary", {}), ensure_ascii=False) if state.get("glossary") else ""
-    glossary_note = f"Enforce glossary terms exactly: {glossary_str}" if glossary_str else ""
-    loc_note = f"Adapt for {state['target_language']} locale (currencies, dates, idioms)." if state.get("localize") else ""
-    style = state.get("style") or "neutral"
-
-    prompt = (
-        f"You are a professional translator.\n"
-        f"Target language: {state['target_language']}\n"
-        f"Style: {style}\n"
-        f"{loc_note}\n{glossary_note}\n\n"
-        f"Translate the following text. Respond with only the translation:\n---\n{state['text']}\n---"
+def translate(state: State, config: RunnableConfig = None):
+    """
+    Translate through the segment pipeline so translation-memory hits skip the LLM.
+    Multi-language requests pass a shared `prepared` document and `executor` via config.
+    """
+    shared = (config or {}).get("configurable", {})
+    result = translate_document(
+        state["text"],
+        state["target_language"],
+        state.get("glossary") or {},
+        bool(state.get("localize")),
+        state.get("style") or "neutral",
+        prepared=shared.get("prepared"),
+        executor=shared.get("executor"),
     )
-    draft = _llm().invoke(prompt).content
-    return {"draft": draft}
+    return {"draft": result["text"], "segments": result["segments"], "stats": result["stats"]}
 
 def qa_check(state: State):
     """
-    Perform a quick QA check: ensure glossary terms used, tone/style consistency,
-    and that no untranslated fragments remain. Return notes and optionally a patch.
+    Deterministic QA (glossary terms, placeholders/code/links, numbers, untranslated source
+    text) over every translated segment. The LLM is only called when something fails, and
+    only for the failing segments; a fix is kept only if it leaves fewer problems.
     """
-    draft = state["draft"] or ""
+    segments = state.get("segments") or []
     glossary = state.get("glossary") or {}
-    checks = [
-        "All required glossary terms present and correctly applied.",
-        "No untranslated phrases or source-language artifacts remain.",
-        "Style and tone match the requested style."
-    ]
-    qa_prompt = (
-        "Quality-check the translation against these criteria:\n"
-        f"- {checks}\n- {checks}\n- {checks[1]}\n\n"
-        f"Glossary (if any): {json.dumps(glossary, ensure_ascii=False)}\n\n"
-        "If issues exist, propose a corrected version; otherwise reply 'OK'.\n\n"
-        f"Translation to check:\n---\n{draft}\n---"
-    )
-    notes = _llm(temp=0.1).invoke(qa_prompt).content
-    if notes.strip().lower().startswith("ok"):
-        return {"qa_notes": "OK"}
-    # Apply patch heuristically: when the model returns a corrected version, prefer it
-    # Simple heuristic: if notes contains a block with 'Corrected' or looks like a translation, use it
-    corrected = notes
-    return {"qa_notes": notes, "final": corrected}
+    localize = bool(state.get("localize"))
+    failures = check_segments(segments, glossary, localize)
+    stats = {**(state.get("stats") or {}), "qa_flagged": len(failures), "qa_llm_called": bool(failures)}
+    if not failures:
+        return {"qa_notes": "OK", "qa_issues": [], "stats": stats}
+
+    fixes = {}
+    try:
+        fixes = repair_segments(failures, state["target_language"], glossary, localize, state.get("style") or "neutral")
+    except Exception as e:
+        print(f"QA repair failed: {e}")
+    candidate = [dict(s) for s in segments]
+    for index, text in fixes.items():
+        candidate[index]["output"] = text
+    rechecked = {f["index"]: f for f in check_segments(candidate, glossary, localize)}
+
+    patched, remaining, accepted, clean = [dict(s) for s in segments], [], [], []
+    for f in failures:
+        after = rechecked.get(f["index"])
+        if f["index"] in fixes and (after is None or len(after["issues"]) < len(f["issues"])):
+            patched[f["index"]]["output"] = fixes[f["index"]]
+            accepted.append((f["source"], fixes[f["index"]]))
+            if after:
+                remaining.append(after)
+            else:
+                clean.append((f["source"], fixes[f["index"]]))
+        else:
+            remaining.append(f)
+    if clean:
+        # Fixes that still have issues are used for this document but not cached
+        version = glossary_version(glossary, localize, state.get("style") or "neutral")
+        translation_memory.store(clean, state["target_language"], version)
+
+    stats["qa_patched"] = len(accepted)
+    notes = "; ".join(f"segment {f['index']}: {', '.join(f['issues'])}" for f in remaining)
+    return {
+        "qa_notes": notes or f"Fixed {len(accepted)} segment(s)",
+        "qa_issues": remaining,
+        "segments": patched,
+        "final": reassemble(patched),
+        "stats": stats,
+    }
 
 def finalize(state: State):
     if state.get("final"):
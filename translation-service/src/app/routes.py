@@ -1,10 +1,35 @@
-from flask import Blueprint, request, jsonify
+import os
+import json
+import queue
+import threading
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from .services import localization_service
+from .services.bulk_jobs import bulk_jobs
 from .agents.graph import build_graph
 
 bp = Blueprint("translation_service", __name__)
 graph = build_graph()
 
+MAX_TARGET_LANGUAGES = int(os.getenv("MAX_TARGET_LANGUAGES", "20"))
+
+def _target_languages(data: dict):
+    """Validated `target_languages` list, or None for a single-language request."""
+    langs = data.get("target_languages")
+    if langs is None:
+        return None
+    if not isinstance(langs, list) or not langs or not all(isinstance(l, str) and l.strip() for l in langs):
+        raise ValueError("target_languages must be a non-empty list of language names")
+    langs = list(dict.fromkeys(l.strip() for l in langs))
+    if len(langs) > MAX_TARGET_LANGUAGES:
+        raise ValueError(f"at most {MAX_TARGET_LANGUAGES} target_languages per request")
+    return langs
+
+def _ndjson(events):
+    def generate():
+        for event in events:
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
 @bp.route("/localize-text", methods=["POST"])
 def localize_text_route():
     data = request.get_json(silent=True) or {}
@@ -13,8 +38,20 @@ def localize_text_route():
     glossary = data.get("glossary")
     localize = data.get("localize", False)
 
-    if not text or not target_language:
-        return jsonify({"error": "text and target_language are required"}), 400
+    try:
+        target_languages = _target_languages(data)
+        max_concurrency = int(data.get("max_concurrency") or 0) or None
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    if not text or not (target_language or target_languages):
+        return jsonify({"error": "text and target_language (or target_languages) are required"}), 400
+
+    if target_languages:
+        # One NDJSON line per language as it finishes
+        return _ndjson(localization_service.translate_many(
+            text, target_languages, max_workers=max_concurrency,
+            glossary=glossary, localize=bool(localize), style=data.get("style", "neutral")
+        ))
 
     try:
         # The localize_text service function now returns a simple string.
@@ -29,8 +66,9 @@ def localize_text_route():
         traceback.print_exc()
         return jsonify({"error": "An internal server error occurred"}), 500
 
-@bp.route("/localize-text-agent", methods=["POST"])
-def localize_text_agent():
+@bp.route("/localize-text-stream", methods=["POST"])
+def localize_text_stream():
+    """Same as /localize-text, streaming NDJSON progress events per segment and a final "done" event."""
     data = request.get_json(silent=True) or {}
     text = data.get("text")
     target_language = data.get("target_language")
@@ -41,6 +79,46 @@ def localize_text_agent():
     if not text or not target_language:
         return jsonify({"error": "text and target_language are required"}), 400
 
+    events = queue.Queue()
+
+    def work():
+        try:
+            result = localization_service.translate_document(
+                text, target_language, glossary, bool(localize), style, on_event=events.put
+            )
+            events.put({"event": "done", "localized_text": result["text"], "stats": result["stats"]})
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            events.put({"event": "error", "error": str(e)})
+
+    def generate():
+        threading.Thread(target=work, daemon=True).start()
+        while True:
+            event = events.get()
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+            if event["event"] in ("done", "error"):
+                break
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@bp.route("/localize-text-agent", methods=["POST"])
+def localize_text_agent():
+    data = request.get_json(silent=True) or {}
+    text = data.get("text")
+    target_language = data.get("target_language")
+    glossary = data.get("glossary")
+    localize = data.get("localize", False)
+    style = data.get("style", "neutral")
+
+    try:
+        target_languages = _target_languages(data)
+        max_concurrency = int(data.get("max_concurrency") or 0) or None
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    if not text or not (target_language or target_languages):
+        return jsonify({"error": "text and target_language (or target_languages) are required"}), 400
+
     init = {
         "text": text,
         "target_language": target_language,
@@ -50,16 +128,77 @@ def localize_text_agent():
         "draft": "",
         "qa_notes": "",
         "final": "",
-        "errors": []
+        "errors": [],
+        "stats": {},
+        "segments": [],
+        "qa_issues": []
     }
+
+    if target_languages:
+        def run(lang, prepared, executor):
+            result = graph.invoke(
+                {**init, "target_language": lang},
+                config={"configurable": {"prepared": prepared, "executor": executor}},
+            )
+            return {
+                "localized_text": result.get("final") or result.get("draft", ""),
+                "qa_notes": result.get("qa_notes", ""),
+                "qa_issues": result.get("qa_issues", []),
+                "errors": result.get("errors", []),
+                "stats": result.get("stats", {})
+            }
+        return _ndjson(localization_service.translate_many(
+            text, target_languages, run=run, max_workers=max_concurrency
+        ))
+
     try:
         result = graph.invoke(init)
         return jsonify({
             "localized_text": result.get("final") or result.get("draft", ""),
             "qa_notes": result.get("qa_notes", ""),
-            "errors": result.get("errors", [])
+            "qa_issues": result.get("qa_issues", []),
+            "errors": result.get("errors", []),
+            "stats": result.get("stats", {})
         }), 200
     except Exception as e:
         import traceback
         traceback.print_exc()
-        return jsonify({"error": "An internal server error occurred"}), 500
\ No newline at end of file
+        return jsonify({"error": "An internal server error occurred"}), 500
+
+@bp.route("/bulk-jobs", methods=["POST"])
+def create_bulk_job():
+    """Create and start a bulk localization job from a manifest of documents and locales."""
+    data = request.get_json(silent=True) or {}
+    try:
+        job_id = bulk_jobs.create(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        bulk_jobs.start(job_id)
+        return jsonify(bulk_jobs.status(job_id)), 202
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({"error": "An internal server error occurred"}), 500
+
+@bp.route("/bulk-jobs/<job_id>", methods=["GET"])
+def bulk_job_status(job_id):
+    status = bulk_jobs.status(job_id)
+    if not status:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(status), 200
+
+@bp.route("/bulk-jobs/<job_id>/resume", methods=["POST"])
+def resume_bulk_job(job_id):
+    """Resume a stopped, cancelled or crashed job; finished tasks are not redone."""
+    if not bulk_jobs.status(job_id):
+        return jsonify({"error": "job not found"}), 404
+    if not bulk_jobs.start(job_id):
+        return jsonify({"error": "job is already running"}), 409
+    return jsonify(bulk_jobs.status(job_id)), 202
+
+@bp.route("/bulk-jobs/<job_id>/cancel", methods=["POST"])
+def cancel_bulk_job(job_id):
+    if not bulk_jobs.cancel(job_id):
+        return jsonify({"error": "job is not running"}), 409
+    return jsonify(bulk_jobs.status(job_id)), 202
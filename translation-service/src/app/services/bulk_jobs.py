@@ -0,0 +1,360 @@
+import os
+import sys
+import json
+import time
+import uuid
+import hashlib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from .localization_service import prepare_document, translate_document
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+BULK_DB_PATH = os.getenv("BULK_JOBS_DB_PATH", os.path.join(_BASE_DIR, "data", "bulk_jobs.db"))
+BULK_OUTPUT_ROOT = os.getenv("BULK_OUTPUT_ROOT", os.path.join(_BASE_DIR, "data", "bulk_output"))
+# Documents given by "path" are read relative to this directory and may not leave it
+BULK_SOURCE_ROOT = os.getenv("BULK_SOURCE_ROOT", os.path.join(_BASE_DIR, "data", "bulk_source"))
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "4"))
+BULK_MAX_ATTEMPTS = int(os.getenv("BULK_MAX_ATTEMPTS", "3"))
+# Default documents per minute per locale; manifests can override per locale or with "*"
+BULK_RATE_PER_MINUTE = float(os.getenv("BULK_RATE_PER_MINUTE", "60"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bulk_jobs (
+    id TEXT PRIMARY KEY,
+    manifest TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    run_started_at REAL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS bulk_tasks (
+    job_id TEXT NOT NULL REFERENCES bulk_jobs (id),
+    doc_id TEXT NOT NULL,
+    locale TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    output_path TEXT,
+    chars INTEGER NOT NULL DEFAULT 0,
+    source_hash TEXT,
+    finished_at REAL,
+    PRIMARY KEY (job_id, doc_id, locale)
+);
+CREATE INDEX IF NOT EXISTS idx_bulk_tasks_status ON bulk_tasks (job_id, status);
+"""
+
+class RateLimiter:
+    """Blocking limiter spacing calls evenly at `per_minute` per key."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def _within(root: str, *parts: str) -> str:
+    """Join `parts` onto `root` and resolve symlinks; raises ValueError if the result leaves root."""
+    base = os.path.realpath(root)
+    path = os.path.realpath(os.path.join(base, *parts))
+    if os.path.commonpath([base, path]) != base:
+        raise ValueError(f"path leaves the allowed directory: {os.path.join(*parts)!r}")
+    return path
+
+def _check_locale(locale: str) -> None:
+    """Locales name an output folder, so they must be a single plain path component."""
+    if "/" in locale or "\\" in locale or "\0" in locale or ".." in locale or locale.startswith("."):
+        raise ValueError(f"invalid locale: {locale!r}")
+
+def _safe_relpath(doc_id: str) -> str:
+    """Output path for a document id; ids may contain folders but never escape the job directory."""
+    parts = [p for p in doc_id.replace("\\", "/").split("/") if p not in ("", ".")]
+    if not parts or ".." in parts:
+        raise ValueError(f"invalid document id: {doc_id!r}")
+    return os.path.join(*parts)
+
+def validate_manifest(manifest: dict) -> dict:
+    """
+    Check and normalize a manifest:
+    {"documents": [{"id", "text" | "path"}], "locales": [...], "glossary", "localize", "style",
+     "rate_limits": {"fr": 30, "*": 60}, "concurrency"}
+    Paths are relative to BULK_SOURCE_ROOT and output always goes under BULK_OUTPUT_ROOT/<job id>,
+    so "source_dir" and "output_dir" are refused. Raises ValueError with a client-facing message.
+    """
+    for key in ("source_dir", "output_dir"):
+        if key in manifest:
+            raise ValueError(f"{key} is not accepted; paths are fixed by the server")
+    docs = manifest.get("documents")
+    locales = manifest.get("locales")
+    if not isinstance(docs, list) or not docs:
+        raise ValueError("documents must be a non-empty list")
+    if not isinstance(locales, list) or not locales or not all(isinstance(l, str) and l.strip() for l in locales):
+        raise ValueError("locales must be a non-empty list of language names")
+    for locale in locales:
+        _check_locale(locale.strip())
+    seen = set()
+    for doc in docs:
+        if not isinstance(doc, dict) or not isinstance(doc.get("id"), str):
+            raise ValueError("every document needs a string id")
+        if not isinstance(doc.get("text"), str) and not isinstance(doc.get("path"), str):
+            raise ValueError(f"document {doc['id']!r} needs text or path")
+        if not isinstance(doc.get("text"), str):
+            if os.path.isabs(doc["path"]):
+                raise ValueError(f"document {doc['id']!r}: path must be relative to the source root")
+            _within(BULK_SOURCE_ROOT, doc["path"])
+        _safe_relpath(doc["id"])
+        if doc["id"] in seen:
+            raise ValueError(f"duplicate document id: {doc['id']!r}")
+        seen.add(doc["id"])
+    rate_limits = manifest.get("rate_limits") or {}
+    if not isinstance(rate_limits, dict) or not all(isinstance(v, (int, float)) for v in rate_limits.values()):
+        raise ValueError("rate_limits must map locales to documents per minute")
+    return {**manifest, "locales": list(dict.fromkeys(l.strip() for l in locales))}
+
+def _read_source(doc: dict) -> str:
+    if isinstance(doc.get("text"), str):
+        return doc["text"]
+    # Checked again at read time: a symlink may have been swapped in since the job was created
+    with open(_within(BULK_SOURCE_ROOT, doc["path"]), "r", encoding="utf-8") as f:
+        return f.read()
+
+def _write_atomic(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+class BulkJobRunner:
+    """
+    Persistent bulk localization jobs.
+
+    Each (document, locale) pair is a task row that is checkpointed as soon as its output
+    file is written, so a restarted job only processes what is not done yet. Documents run
+    `concurrency` at a time; each document is prepared once and its locales are translated
+    in turn, each locale throttled by its own rate limiter.
+    """
+
+    def __init__(self, path: str = BULK_DB_PATH, output_root: str = BULK_OUTPUT_ROOT):
+        self.path = path
+        self.output_root = output_root
+        self._lock = threading.Lock()
+        self._running: Dict[str, threading.Event] = {}  # job id -> cancel flag
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def create(self, manifest: dict) -> str:
+        manifest = validate_manifest(manifest)
+        job_id = uuid.uuid4().hex
+        output_dir = os.path.join(self.output_root, job_id)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO bulk_jobs (id, manifest, output_dir, status, created_at) VALUES (?, ?, ?, 'pending', ?)",
+                (job_id, json.dumps(manifest, ensure_ascii=False), output_dir, time.time()),
+            )
+            conn.executemany(
+                "INSERT INTO bulk_tasks (job_id, doc_id, locale) VALUES (?, ?, ?)",
+                [(job_id, doc["id"], locale) for doc in manifest["documents"] for locale in manifest["locales"]],
+            )
+        return job_id
+
+    def start(self, job_id: str, background: bool = True) -> bool:
+        """
+        Run (or resume) a job. Tasks left running by a crash and failed tasks are retried;
+        finished ones are never redone. Returns False if the job is unknown or already running.
+        """
+        with self._lock:
+            if job_id in self._running:
+                return False
+            with self._connect() as conn:
+                if not conn.execute("SELECT 1 FROM bulk_jobs WHERE id = ?", (job_id,)).fetchone():
+                    return False
+                conn.execute("UPDATE bulk_tasks SET status = 'pending', attempts = 0 "
+                             "WHERE job_id = ? AND status IN ('running', 'failed')", (job_id,))
+                conn.execute("UPDATE bulk_jobs SET status = 'running', run_started_at = ?, finished_at = NULL "
+                             "WHERE id = ?", (time.time(), job_id))
+            self._running[job_id] = threading.Event()
+        if background:
+            threading.Thread(target=self._run, args=(job_id,), daemon=True).start()
+        else:
+            self._run(job_id)
+        return True
+
+    def cancel(self, job_id: str) -> bool:
+        """Stop after the documents currently in flight; the job can be resumed later."""
+        flag = self._running.get(job_id)
+        if flag:
+            flag.set()
+        return flag is not None
+
+    def _run(self, job_id: str) -> None:
+        cancel = self._running[job_id]
+        status = "failed"
+        try:
+            with self._connect() as conn:
+                job = conn.execute("SELECT manifest FROM bulk_jobs WHERE id = ?", (job_id,)).fetchone()
+                rows = conn.execute("SELECT doc_id, locale FROM bulk_tasks WHERE job_id = ? AND status = 'pending'",
+                                    (job_id,)).fetchall()
+            manifest, output_dir = json.loads(job["manifest"]), os.path.join(self.output_root, job_id)
+            pending: Dict[str, List[str]] = {}
+            for r in rows:
+                pending.setdefault(r["doc_id"], []).append(r["locale"])
+            docs = [d for d in manifest["documents"] if d["id"] in pending]
+
+            rates = manifest.get("rate_limits") or {}
+            limiters = {l: RateLimiter(float(rates.get(l, rates.get("*", BULK_RATE_PER_MINUTE))))
+                        for l in manifest["locales"]}
+            workers = max(1, min(int(manifest.get("concurrency") or BULK_CONCURRENCY), BULK_CONCURRENCY))
+            print(f"[bulk] job {job_id}: {sum(len(v) for v in pending.values())} tasks over {len(docs)} documents")
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for fut in [pool.submit(self._run_document, job_id, manifest, output_dir, doc,
+                                        pending[doc["id"]], limiters, cancel) for doc in docs]:
+                    fut.result()
+            status = "cancelled" if cancel.is_set() else (
+                "completed_with_errors" if self.status(job_id)["tasks"]["failed"] else "completed")
+        except Exception as e:
+            print(f"[bulk] job {job_id} crashed: {e}")
+        finally:
+            with self._connect() as conn:
+                conn.execute("UPDATE bulk_jobs SET status = ?, finished_at = ? WHERE id = ?",
+                             (status, time.time(), job_id))
+            with self._lock:
+                self._running.pop(job_id, None)
+            print(f"[bulk] job {job_id} {status}")
+
+    def _run_document(self, job_id: str, manifest: dict, output_dir: str, doc: dict,
+                      locales: List[str], limiters: Dict[str, RateLimiter], cancel: threading.Event) -> None:
+        if cancel.is_set():
+            return
+        try:
+            text = _read_source(doc)
+            prepared = prepare_document(text)
+        except Exception as e:
+            self._finish(job_id, doc["id"], locales, "failed", error=f"cannot read source: {e}")
+            return
+        source_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        relpath = _safe_relpath(doc["id"])
+
+        for locale in locales:
+            try:
+                _check_locale(locale)
+                out_path = _within(output_dir, locale, relpath)
+            except ValueError as e:
+                self._finish(job_id, doc["id"], [locale], "failed", error=str(e))
+                continue
+            for attempt in range(1, BULK_MAX_ATTEMPTS + 1):
+                if cancel.is_set():
+                    return
+                self._finish(job_id, doc["id"], [locale], "running", attempt=attempt)
+                limiters[locale].acquire()
+                try:
+                    result = translate_document(
+                        text, locale, manifest.get("glossary") or {}, bool(manifest.get("localize")),
+                        manifest.get("style") or "neutral", prepared=prepared,
+                    )
+                    _write_atomic(out_path, result["text"])
+                    self._finish(job_id, doc["id"], [locale], "done", output_path=out_path,
+                                 chars=len(text), source_hash=source_hash)
+                    break
+                except Exception as e:
+                    print(f"[bulk] {doc['id']} -> {locale} attempt {attempt} failed: {e}")
+                    if attempt == BULK_MAX_ATTEMPTS:
+                        self._finish(job_id, doc["id"], [locale], "failed", error=str(e))
+                    else:
+                        time.sleep(2 ** attempt)
+
+    def _finish(self, job_id: str, doc_id: str, locales: List[str], status: str, error: Optional[str] = None,
+                output_path: Optional[str] = None, chars: int = 0, source_hash: Optional[str] = None,
+                attempt: Optional[int] = None) -> None:
+        """Checkpoint task rows."""
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE bulk_tasks SET status = ?, error = ?, output_path = COALESCE(?, output_path), "
+                "chars = ?, source_hash = COALESCE(?, source_hash), attempts = COALESCE(?, attempts), "
+                "finished_at = ? WHERE job_id = ? AND doc_id = ? AND locale = ?",
+                [(status, error, output_path, chars, source_hash, attempt,
+                  time.time() if status in ("done", "failed") else None, job_id, doc_id, locale)
+                 for locale in locales],
+            )
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Progress, throughput over the current run and an ETA for the remaining tasks."""
+        with self._connect() as conn:
+            job = conn.execute("SELECT * FROM bulk_jobs WHERE id = ?", (job_id,)).fetchone()
+            if not job:
+                return None
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM bulk_tasks WHERE job_id = ? GROUP BY status",
+                                       (job_id,)).fetchall())
+            run = conn.execute(
+                "SELECT COUNT(*) AS n, COALESCE(SUM(chars), 0) AS chars FROM bulk_tasks "
+                "WHERE job_id = ? AND status = 'done' AND finished_at >= ?",
+                (job_id, job["run_started_at"] or 0),
+            ).fetchone()
+            by_locale = conn.execute(
+                "SELECT locale, SUM(status = 'done') AS done, COUNT(*) AS total FROM bulk_tasks "
+                "WHERE job_id = ? GROUP BY locale", (job_id,)
+            ).fetchall()
+            failures = conn.execute(
+                "SELECT doc_id, locale, error FROM bulk_tasks WHERE job_id = ? AND status = 'failed' LIMIT 20",
+                (job_id,)
+            ).fetchall()
+
+        tasks = {k: counts.get(k, 0) for k in ("pending", "running", "done", "failed")}
+        tasks["total"] = sum(counts.values())
+        end = job["finished_at"] or time.time()
+        elapsed = max(0.0, end - job["run_started_at"]) if job["run_started_at"] else 0.0
+        rate = run["n"] / elapsed if elapsed and run["n"] else 0.0
+        remaining = tasks["pending"] + tasks["running"]
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "active": job_id in self._running,
+            "output_dir": os.path.join(self.output_root, job_id),
+            "tasks": tasks,
+            "locales": {r["locale"]: {"done": r["done"], "total": r["total"]} for r in by_locale},
+            "throughput": {
+                "elapsed_seconds": round(elapsed, 1),
+                "tasks_per_minute": round(rate * 60, 2),
+                "chars_per_second": round(run["chars"] / elapsed, 1) if elapsed else 0.0,
+            },
+            "eta_seconds": round(remaining / rate, 1) if rate and job_id in self._running else None,
+            "failures": [dict(r) for r in failures],
+        }
+
+# Singleton instance
+bulk_jobs = BulkJobRunner()
+
+if __name__ == "__main__":
+    # python -m app.services.bulk_jobs manifest.json   |   python -m app.services.bulk_jobs --resume JOB_ID
+    if len(sys.argv) == 3 and sys.argv[1] == "--resume":
+        job_id = sys.argv[2]
+    elif len(sys.argv) == 2:
+        with open(sys.argv[1], "r", encoding="utf-8") as f:
+            job_id = bulk_jobs.create(json.load(f))
+    else:
+        sys.exit("usage: python -m app.services.bulk_jobs MANIFEST.json | --resume JOB_ID")
+    print(f"[bulk] job id: {job_id}")
+    if not bulk_jobs.start(job_id):
+        sys.exit(f"unknown job: {job_id}")
+    while bulk_jobs.status(job_id)["active"]:
+        time.sleep(5)
+        s = bulk_jobs.status(job_id)
+        print(f"[bulk] {s['tasks']['done']}/{s['tasks']['total']} done, {s['tasks']['failed']} failed, "
+              f"{s['throughput']['tasks_per_minute']} tasks/min, eta {s['eta_seconds']}s")
+    print(json.dumps(bulk_jobs.status(job_id), indent=2))
@@ -0,0 +1,193 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Optional
+
+# Character-trigram naive Bayes over small built-in profiles of frequent words (plus some
+# training-content vocabulary). Function words dominate real text, so these are enough to
+# separate the Latin-script languages we translate into; other scripts are identified from
+# their Unicode block directly.
+MIN_LETTERS = 20
+MIN_MARGIN = 0.2  # average log-likelihood gap per trigram between best and runner-up
+# Every profile shares the same floor for unseen trigrams so small profiles are not favoured
+UNSEEN_LOG_PROB = math.log(1e-4)
+
+_SEED_TEXT = {
+    "en": "the of and to in is that it for was on are as with be at by this have from or one had not but what "
+          "all were when we there can an your which their said if do will each about how up out them then she "
+          "many some so these would other into has more her two like him see time could no make than first been "
+          "its who now people my made over did down only way find use may water long little very after words "
+          "called just where most know get through back much before go good new write our used me man too any "
+          "day same right look think also around another came come work three must because does part even place "
+          "well such here take why help put different away again off went old number great tell say small every "
+          "found still between name should home big give air line set own under read last never us left end "
+          "learning training course module lesson students should understand example data information process "
+          "system",
+    "fr": "le de un être et à il avoir ne je son que se qui ce dans en du elle au pour pas vous par sur faire plus "
+          "dire me on mon lui nous comme mais pouvoir avec tout y aller voir en bien où sans tu ou leur homme si "
+          "deux mari moi vouloir te femme venir quand grand celui notre devoir là jour prendre même votre tout "
+          "rien petit encore aussi quelque dont tout mer trouver donner temps ça peu même falloir sous parler "
+          "alors main chose ton mettre vie savoir yeux passer autre après regarder toujours puis jamais cela "
+          "aimer non heure croire cent monde donc enfant fois seul autre entre vers chez demander jeune jusque "
+          "très moment rester répondre tête père fille mille premier car entendre ni bon trois cœur ainsi est "
+          "les des une sont cette ces avez peut doit nouveaux utilisez cliquez fichier paramètres "
+          "apprentissage formation cours module leçon les étudiants doivent comprendre exemple données "
+          "information processus système",
+    "de": "der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als auch es an werden aus "
+          "er hat dass sie nach wird bei einer um am sind noch wie einem über einen so zum war haben nur oder aber "
+          "vor zur bis mehr durch man sein wurde sei ins hatte kann gegen vom können schon wenn habe seine ihre "
+          "dann unter wir soll ich eines jahr zwei jahre diese dieser wieder keine seiner worden ihr zwischen "
+          "immer millionen was sagte gibt alle diesem seit muss wurden beim doch jedoch sowie ihren damit geht "
+          "neue uns kein ihrer hier sehr weil neuen wo heute ohne ersten mich etwa sondern zeit selbst dieses "
+          "klicken sie datei einstellungen öffnen schließen größe müssen würde über für möglich "
+          "lernen schulung kurs modul lektion die studierenden sollten verstehen beispiel daten informationen "
+          "prozess system",
+    "es": "el la de que y a en un ser se no haber por con su para como estar tener le lo todo pero más hacer o "
+          "poder decir este ir otro ese la si me ya ver porque dar cuando él muy sin vez mucho saber qué sobre mi "
+          "alguno mismo yo también hasta año dos querer entre así primero desde grande eso ni nos llegar pasar "
+          "tiempo ella sí día uno bien poco deber entonces poner cosa tanto hombre parecer nuestro tan donde "
+          "ahora parte después vida quedar siempre creer hablar llevar dejar nada cada seguir menos nuevo "
+          "encontrar algo solo los las del una es son está están puede haga clic archivo configuración años "
+          "señor niño información también según "
+          "hoy ahora todavía aún nunca siempre cada todos todas trabajo empresa equipo proyecto reunión "
+          "próxima próximo persona personas pueden necesita debe van vamos estamos estaba antes otra otros "
+          "mejor mayor nueva gracias favor aquí allí cliente clientes atención contraseña página informe "
+          "usuario usuarios enviar recibir cuenta registro seguridad empresas gestión equipos objetivo "
+          "objetivos "
+          "aprendizaje formación curso módulo lección los estudiantes deben comprender ejemplo datos "
+          "información proceso sistema",
+    "it": "il di che e la a per un in è non una sono si con mi ma le ti lo ho come ci io da questo cosa se ha del "
+          "bene più tu della no qui mio solo al sei te ne gli cosa hai fatto tutto era suo molto lei sì anche "
+          "quando chi perché dei ora siamo alla nel sua mia lui stato così niente fare essere dove abbiamo "
+          "tutti detto voglio ancora prima posso nella sto mai sempre allora grazie oh cui quello può vuoi "
+          "delle siete questa dire loro poi volta andare dal devo sia fa vero qualcosa tempo questi casa "
+          "degli ecco quella nostro altro fare clicca sulle impostazioni file aprire città perché già però "
+          "apprendimento formazione corso modulo lezione gli studenti devono capire esempio dati informazioni "
+          "processo sistema",
+    "pt": "o de a que e do da em um para é com não uma os no se na por mais as dos como mas foi ao ele das tem à "
+          "seu sua ou ser quando muito há nos já está eu também só pelo pela até isso ela entre era depois sem "
+          "mesmo aos ter seus quem nas me esse eles estão você tinha foram essa num nem suas meu às minha têm "
+          "numa pelos elas havia seja qual será nós tenho lhe deles essas esses pelas este fosse dele tu te "
+          "vocês vos lhes meus minhas teu tua nosso nossa isto aquilo clique arquivo configurações então "
+          "coração ação informação não são também "
+          "hoje agora ainda onde porque sempre nunca cada todos todas tudo nada coisa vez dia ano anos "
+          "trabalho empresa equipe projeto reunião próxima próximo pessoa pessoas fazer pode podem precisa "
+          "deve vai vão vamos estamos estava antes sobre outro outra outros pouco melhor maior novo nova "
+          "obrigado favor assim aqui lá cliente clientes atendimento senha página relatório usuário usuários "
+          "enviar receber conta cadastro segurança empresas gestão equipes objetivo objetivos "
+          "aprendizagem aprendizado treinamento curso módulo lição os alunos devem entender exemplo dados "
+          "informações processo sistema",
+    "nl": "de van een het en in is dat op te zijn met voor niet aan er om ook als bij of door maar uit dan over "
+          "nog worden wordt was tot naar kan al deze die hij ze werd wel zo heeft meer hebben jaar zou dit we "
+          "geen moet onder twee na ik veel waar tegen zich haar u hun andere tussen nu kunnen zal alle mensen "
+          "hier gaan omdat eerste tijd waren komen onze goed gaat zeer moeten klik bestand instellingen openen "
+          "sluiten grootte gebruiken nieuwe werken "
+          "leren training cursus module les de studenten moeten begrijpen voorbeeld gegevens informatie proces "
+          "systeem",
+    "pl": "i w nie na się z do to że jest o jak ale co tak za po od czy jego już tylko był jej może przez są "
+          "mnie dla jako ten sobie jeszcze być tym gdy bardzo będzie ich ma ze też nawet było kiedy mi no go "
+          "tego lub tu by tej więc jednak gdzie który która które ja pan aby nic nas przed teraz bo wszystko "
+          "można jednak między został jeśli jestem kliknij plik ustawienia otwórz zamknij rozmiar używać "
+          "nowy pracy przypadku "
+          "uczenie szkolenie kurs moduł lekcja studenci powinni zrozumieć przykład dane informacje proces "
+          "system",
+    "sv": "och i att det som en på är av för med till den har de inte om ett han men var jag sig från vi så kan "
+          "man när år säger hon under också efter eller nu sin där vid mot ska skulle kommer ut får finns vara "
+          "hade alla andra mycket än här då sedan över bara in blir upp även vad få två vill ha många hur mer "
+          "går sina utan vara klicka fil inställningar öppna stäng storlek använda nya arbete "
+          "lärande utbildning kurs modul lektion eleverna bör förstå exempel data information process system",
+    "tr": "bir ve bu da de için ile çok ne daha gibi ama o ben sen var mı değil olarak en kadar sonra her şey "
+          "büyük yeni olan oldu diye ki önce göre yıl ancak bile nasıl neden iki şimdi artık üzerinde içinde "
+          "olduğu onun bunu şu zaman çünkü sadece hem ya tüm hiç kendi biz siz onlar ilk aynı tıklayın dosya "
+          "ayarlar açın kapatın boyut kullanın yeni çalışma "
+          "öğrenme eğitim kurs modül ders öğrenciler anlamalıdır örnek veri bilgi süreç sistem",
+}
+
+# Scripts that identify a language on their own (checked before trigram scoring)
+_SCRIPTS = [
+    ("ja", re.compile(r"[぀-ヿ]")),
+    ("ko", re.compile(r"[가-힯]")),
+    ("zh", re.compile(r"[一-鿿]")),
+    ("ar", re.compile(r"[؀-ۿ]")),
+    ("he", re.compile(r"[֐-׿]")),
+    ("hi", re.compile(r"[ऀ-ॿ]")),
+    ("th", re.compile(r"[฀-๿]")),
+    ("el", re.compile(r"[Ͱ-Ͽ]")),
+    ("uk", re.compile(r"[іїєґІЇЄҐ]")),
+    ("ru", re.compile(r"[Ѐ-ӿ]")),
+]
+
+_NAMES = {
+    "english": "en", "french": "fr", "german": "de", "spanish": "es", "italian": "it", "portuguese": "pt",
+    "dutch": "nl", "polish": "pl", "swedish": "sv", "turkish": "tr", "japanese": "ja", "korean": "ko",
+    "chinese": "zh", "mandarin": "zh", "arabic": "ar", "hebrew": "he", "hindi": "hi", "thai": "th",
+    "greek": "el", "ukrainian": "uk", "russian": "ru",
+    "français": "fr", "deutsch": "de", "español": "es", "italiano": "it", "português": "pt",
+    "nederlands": "nl", "polski": "pl", "svenska": "sv", "türkçe": "tr",
+    "brazilian portuguese": "pt", "european portuguese": "pt", "português brasileiro": "pt",
+    "simplified chinese": "zh", "traditional chinese": "zh", "cantonese": "zh", "flemish": "nl",
+    "castilian": "es",
+    "中文": "zh", "简体中文": "zh", "繁體中文": "zh", "日本語": "ja", "한국어": "ko", "русский": "ru",
+    "українська": "uk", "العربية": "ar", "עברית": "he", "हिन्दी": "hi", "ไทย": "th", "ελληνικά": "el",
+}
+_WORD = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+def _trigrams(text: str) -> Counter:
+    grams = Counter()
+    for word in _WORD.findall(text.lower()):
+        padded = f" {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def _build_profiles() -> Dict[str, Dict[str, float]]:
+    profiles = {}
+    for lang, seed in _SEED_TEXT.items():
+        counts = _trigrams(seed)
+        total = sum(counts.values())
+        profiles[lang] = {g: max(math.log(c / total), UNSEEN_LOG_PROB) for g, c in counts.items()}
+    return profiles
+
+_PROFILES = _build_profiles()
+
+def language_code(name: Optional[str]) -> Optional[str]:
+    """
+    Map a language name or locale ("French", "fr", "fr-FR", "pt_BR", "zh-Hans", "Brazilian
+    Portuguese", "Chinese (Simplified)") to a code we can detect; regional and script
+    variants map to their base language.
+    """
+    if not name:
+        return None
+    key = unicodedata.normalize("NFC", name.strip().lower())
+    if key in _NAMES:
+        return _NAMES[key]
+    words = [w for w in re.split(r"[-_\s(),]+", key) if w]
+    if not words:
+        return None
+    if words[0] in _PROFILES or words[0] in dict(_SCRIPTS):
+        return words[0]
+    # "Latin American Spanish", "Portuguese (Brazil)": the first word naming a language wins
+    return next((_NAMES[w] for w in words if _NAMES.get(w)), None)
+
+def detect(text: str) -> Optional[str]:
+    """
+    Language code for `text`, or None when it is too short or the evidence is ambiguous.
+    Callers should treat None as "unknown" and translate as usual.
+    """
+    letters = sum(1 for ch in text if ch.isalpha())
+    if letters < MIN_LETTERS:
+        return None
+    for lang, pattern in _SCRIPTS:
+        if len(pattern.findall(text)) >= letters * 0.3:
+            return lang
+    grams = _trigrams(text)
+    n = sum(grams.values())
+    if not n:
+        return None
+    scores = sorted(
+        ((sum(c * profile.get(g, UNSEEN_LOG_PROB) for g, c in grams.items()) / n, lang)
+         for lang, profile in _PROFILES.items()),
+        reverse=True,
+    )
+    (best, lang), (second, _) = scores[0], scores[1]
+    return lang if best - second >= MIN_MARGIN else None
@@ -1,38 +1,44 @@
 import os
+import re
 import json
 import boto3
+import threading
+from typing import List, Dict, Tuple, Optional, Any, Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from botocore.config import Config
+from .segmenter import segment_text, reassemble, normalize_segment, protect, restore, estimate_tokens
+from .translation_memory import translation_memory, glossary_version
+from .language_id import detect, language_code
+from .qa_checks import passing_pairs
 
-def get_bedrock_client():
-    """Get a direct Bedrock client"""
-    config = Config(region_name=os.getenv("AWS_REGION", "us-east-1"))
-    return boto3.client('bedrock-runtime', config=config)
+# Pending segments are packed into batches of at most BATCH_TOKENS source tokens (so each
+# reply fits comfortably in max_tokens) and batches are translated CONCURRENCY at a time.
+BATCH_TOKENS = int(os.getenv("TRANSLATION_BATCH_TOKENS", "1500"))
+BATCH_MAX_SEGMENTS = int(os.getenv("TRANSLATION_BATCH_MAX_SEGMENTS", "40"))
+CONCURRENCY = int(os.getenv("TRANSLATION_CONCURRENCY", "4"))
 
-def localize_text(text: str, target_language: str, glossary: dict | None = None, localize: bool = False) -> str:
+_client = None
+_client_lock = threading.Lock()
+
+def get_bedrock_client():
     """
-    Translates and localizes a given text using direct Bedrock API.
+    Get the shared Bedrock client. Clients are thread-safe but creating them on the default
+    session is not, so one client is built under a lock and reused by every batch worker.
     """
-    client = get_bedrock_client()
-    
-    # Handle optional glossary and localization instructions
-    glossary_data = glossary if glossary else {}
-    localization_instruction_text = (
-        "Adapt currencies, dates, idioms, and cultural references." if localize else ""
-    )
-    
-    # Create the prompt
-    prompt = (
-        f"Translate the text into {target_language}.\n\n"
-        f"Instructions: {localization_instruction_text}\n"
-        f"Glossary: {glossary_data}\n\n"
-        f"Text:\n---\n{text}\n---"
-    )
-    
-    # Prepare the request body for Claude
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                config = Config(region_name=os.getenv("AWS_REGION", "us-east-1"))
+                _client = boto3.client('bedrock-runtime', config=config)
+    return _client
+
+def _invoke(client, prompt: str, max_tokens: int = 2048, temperature: float = 0.2) -> str:
+    """Send a single-turn prompt to Claude on Bedrock and return the text reply."""
     body = {
         "anthropic_version": "bedrock-2023-05-31",
-        "max_tokens": 2048,
-        "temperature": 0.2,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
         "messages": [
             {
                 "role": "user",
@@ -40,17 +46,302 @@ def localize_text(text: str, target_language: str, glossary: dict | None = None,
             }
         ]
     }
-    
     try:
-        # Make the API call
         response = client.invoke_model(
             modelId=os.getenv("BEDROCK_MODEL_ID", "anthropic.claude-3-haiku-20240307-v1:0"),
             body=json.dumps(body)
         )
-        
-        # Parse the response
         response_body = json.loads(response['body'].read())
         return response_body['content'][0]['text']
-        
     except Exception as e:
-        raise Exception(f"Bedrock API call failed: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Bedrock API call failed: {str(e)}")
+
+def _instructions(target_language: str, glossary: Optional[dict], localize: bool, style: str) -> str:
+    glossary_note = (
+        f"Enforce glossary terms exactly: {json.dumps(glossary, ensure_ascii=False)}" if glossary else ""
+    )
+    loc_note = (
+        f"Adapt for {target_language} locale (currencies, dates, idioms, cultural references)." if localize else ""
+    )
+    return (
+        f"You are a professional translator.\n"
+        f"Target language: {target_language}\n"
+        f"Style: {style or 'neutral'}\n"
+        f"{loc_note}\n{glossary_note}\n"
+    )
+
+def translate_segments(segments: List[str], target_language: str, glossary: Optional[dict] = None,
+                       localize: bool = False, style: str = "neutral",
+                       hints: Optional[Dict[int, List[Tuple[str, str, float]]]] = None) -> List[str]:
+    """
+    Translate independent segments in one call. `hints` maps a segment index to fuzzy
+    translation-memory matches (source, translation, score) the model may reuse.
+    Segments the model drops from its JSON reply are retried one at a time.
+    """
+    if not segments:
+        return []
+    client = get_bedrock_client()
+    hints = hints or {}
+    payload = []
+    for i, text in enumerate(segments):
+        item = {"id": i, "text": text}
+        if hints.get(i):
+            item["tm"] = [{"source": s, "translation": t} for s, t, _ in hints[i]]
+        payload.append(item)
+
+    prompt = (
+        f"{_instructions(target_language, glossary, localize, style)}\n"
+        "Translate the \"text\" of every segment below. Keep markup and numbers unchanged and copy "
+        "every ⟦n⟧ token exactly as it appears.\n"
+        "Some segments carry \"tm\": translations of similar segments from our translation memory; "
+        "reuse their wording where it fits.\n"
+        "Respond with ONLY a JSON array of {\"id\": <id>, \"text\": \"<translation>\"} objects, one per segment.\n\n"
+        f"Segments:\n{json.dumps(payload, ensure_ascii=False)}"
+    )
+    # Translations are roughly as long as their source; leave headroom for JSON overhead
+    max_tokens = min(4096, 256 + sum(len(s) for s in segments) // 2)
+    reply = _invoke(client, prompt, max_tokens=max_tokens)
+
+    results: Dict[int, str] = {}
+    match = re.search(r"\[.*\]", reply, re.S)
+    if match:
+        try:
+            for item in json.loads(match.group(0)):
+                if isinstance(item, dict) and isinstance(item.get("id"), int) and isinstance(item.get("text"), str):
+                    results[item["id"]] = item["text"]
+        except json.JSONDecodeError:
+            pass
+
+    for i, text in enumerate(segments):
+        if i not in results:
+            results[i] = _invoke(
+                client,
+                f"{_instructions(target_language, glossary, localize, style)}\n"
+                f"Translate the following text. Respond with only the translation:\n---\n{text}\n---"
+            ).strip()
+    return [results[i] for i in range(len(segments))]
+
+def repair_segments(failures: List[Dict[str, Any]], target_language: str, glossary: Optional[dict] = None,
+                    localize: bool = False, style: str = "neutral") -> Dict[int, str]:
+    """
+    Ask the model to fix only the segments that failed deterministic QA.
+    `failures` are qa_checks.check_segments items; returns {segment index: corrected text}
+    for the segments the model answered (anything else in the reply is ignored).
+    """
+    if not failures:
+        return {}
+    payload = [{"id": f["index"], "source": f["source"], "translation": f["translation"], "issues": f["issues"]}
+               for f in failures]
+    prompt = (
+        f"{_instructions(target_language, glossary, localize, style)}\n"
+        "Each item below is a source segment, its current translation and the problems an automatic "
+        "check found. Correct each translation so the problems are fixed, changing as little as possible. "
+        "Keep code, URLs, placeholders and numbers exactly as in the source.\n"
+        "Respond with ONLY a JSON array of {\"id\": <id>, \"text\": \"<corrected translation>\"} objects.\n\n"
+        f"Items:\n{json.dumps(payload, ensure_ascii=False)}"
+    )
+    max_tokens = min(4096, 256 + sum(len(f["translation"]) for f in failures) // 2)
+    reply = _invoke(get_bedrock_client(), prompt, max_tokens=max_tokens, temperature=0.1)
+    ids = {f["index"] for f in failures}
+    fixes: Dict[int, str] = {}
+    match = re.search(r"\[.*\]", reply, re.S)
+    if match:
+        try:
+            for item in json.loads(match.group(0)):
+                if isinstance(item, dict) and item.get("id") in ids and isinstance(item.get("text"), str):
+                    fixes[item["id"]] = item["text"].strip()
+        except json.JSONDecodeError:
+            pass
+    return fixes
+
+def _batches(items: List[str], max_tokens: int, max_segments: int) -> List[List[int]]:
+    """Greedily pack item indexes into batches bounded by estimated tokens and count."""
+    batches, current, size = [], [], 0
+    for i, text in enumerate(items):
+        cost = estimate_tokens(text)
+        if current and (size + cost > max_tokens or len(current) >= max_segments):
+            batches.append(current)
+            current, size = [], 0
+        current.append(i)
+        size += cost
+    if current:
+        batches.append(current)
+    return batches
+
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n|```|~~~")
+
+def _paragraph_languages(segments: List[Dict[str, Any]], todo: List[int]) -> List[Optional[str]]:
+    """Detected language of the paragraph each translatable segment belongs to (None if unsure)."""
+    paragraph, owner, texts = 0, [], {}
+    for s in segments:
+        if s["translate"]:
+            owner.append(paragraph)
+            texts.setdefault(paragraph, []).append(protect(s["text"])[0])
+        elif _PARAGRAPH_BREAK.search(s["text"]):
+            paragraph += 1
+    detected = {p: detect(" ".join(parts)) for p, parts in texts.items()}
+    return [detected[p] for p in owner]
+
+def prepare_document(text: str) -> Dict[str, Any]:
+    """
+    Source-side preprocessing shared by every target language: segmentation, de-duplication
+    of repeated segments, placeholder masking and per-paragraph language identification.
+    """
+    segments = segment_text(text)
+    todo = [i for i, s in enumerate(segments) if s["translate"]]
+    positions: Dict[str, List[int]] = {}
+    for n, i in enumerate(todo):
+        positions.setdefault(normalize_segment(segments[i]["text"]), []).append(n)
+    return {
+        "segments": segments,
+        "todo": todo,
+        "positions": positions,
+        "masked": {source: protect(source) for source in positions},
+        "languages": _paragraph_languages(segments, todo),
+    }
+
+def translate_document(text: str, target_language: str, glossary: Optional[dict] = None,
+                       localize: bool = False, style: str = "neutral",
+                       on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                       max_workers: Optional[int] = None,
+                       prepared: Optional[Dict[str, Any]] = None,
+                       executor: Optional[ThreadPoolExecutor] = None) -> Dict[str, Any]:
+    """
+    Translate Markdown/plain text segment by segment through the translation memory.
+
+    Exact TM hits are served locally. Remaining unique segments have their inline code,
+    URLs and placeholders masked, are packed into token-bounded batches (with fuzzy TM
+    matches as hints) and translated concurrently; new translations are written back and
+    the document is reassembled in original order. `on_event`, if given, receives a
+    {"event": "start"} dict and then one {"event": "segment", ...} dict per translatable
+    segment as it completes. Only translations that pass deterministic QA are written to
+    the TM, so a bad output is repaired next time rather than served as an exact hit.
+
+    Paragraphs the local language identifier says are already in `target_language` are
+    passed through untouched and counted as skipped_same_language.
+
+    `prepared` (from prepare_document) and `executor` let several target languages share
+    one preprocessing pass and one concurrency budget.
+    Returns {"text": str, "segments": [...], "stats": {...}}; segments carry their "output"
+    so QA can check and patch them individually.
+    """
+    emit = on_event or (lambda event: None)
+    doc = prepared or prepare_document(text)
+    version = glossary_version(glossary, localize, style)
+    total, done, cached = len(doc["todo"]), 0, 0
+    emit({"event": "start", "total": total})
+
+    target_code = language_code(target_language)
+    skipped = {n for n, lang in enumerate(doc["languages"]) if target_code and lang == target_code}
+    positions = {}
+    for source, ns in doc["positions"].items():
+        keep = [n for n in ns if n not in skipped]
+        if keep:
+            positions[source] = keep
+    for n in sorted(skipped):
+        done += 1
+        emit({"event": "segment", "index": n, "source": "skipped", "done": done, "total": total})
+
+    hits = translation_memory.lookup(list(positions), target_language, version)
+    translated = dict(hits)
+    for source in hits:
+        for n in positions[source]:
+            done += 1
+            emit({"event": "segment", "index": n, "source": "tm", "done": done, "total": total})
+
+    pending = [source for source in positions if source not in hits]
+    masked = [doc["masked"][source] for source in pending]
+    hints = {}
+    for i, source in enumerate(pending):
+        matches = translation_memory.fuzzy(source, target_language)
+        if matches:
+            hints[i] = matches
+
+    def _run(batch: List[int]) -> List[Tuple[str, str]]:
+        outputs = translate_segments(
+            [masked[i][0] for i in batch], target_language, glossary, localize, style,
+            {k: hints[i] for k, i in enumerate(batch) if i in hints}
+        )
+        return [(pending[i], restore(out, masked[i][1])) for i, out in zip(batch, outputs)]
+
+    def _collect(futures) -> None:
+        nonlocal done, cached
+        for fut in as_completed(futures):
+            pairs = fut.result()
+            clean = passing_pairs(pairs, glossary, localize)
+            translation_memory.store(clean, target_language, version)
+            cached += len(clean)
+            for source, output in pairs:
+                translated[source] = output
+                for n in positions[source]:
+                    done += 1
+                    emit({"event": "segment", "index": n, "source": "llm", "done": done, "total": total})
+
+    batches = _batches([m[0] for m in masked], BATCH_TOKENS, BATCH_MAX_SEGMENTS)
+    if batches and executor:
+        _collect([executor.submit(_run, b) for b in batches])
+    elif batches:
+        workers = max(1, min(max_workers or CONCURRENCY, CONCURRENCY, len(batches)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            _collect([pool.submit(_run, b) for b in batches])
+
+    segments = [dict(s) for s in doc["segments"]]
+    for n, i in enumerate(doc["todo"]):
+        if n in skipped:
+            segments[i]["skipped"] = True
+            continue
+        segments[i]["output"] = translated[normalize_segment(segments[i]["text"])]
+
+    return {
+        "text": reassemble(segments),
+        "segments": segments,
+        "stats": {
+            "segments": total,
+            "tm_exact_hits": sum(len(positions[source]) for source in hits),
+            "tm_fuzzy_hinted": len(hints),
+            "llm_translated": len(pending),
+            "tm_stored": cached,
+            "batches": len(batches),
+            "skipped_same_language": len(skipped),
+        },
+    }
+
+def translate_many(text: str, target_languages: List[str],
+                   run: Optional[Callable[..., Dict[str, Any]]] = None,
+                   max_workers: Optional[int] = None, **options) -> Iterator[Dict[str, Any]]:
+    """
+    Translate one source into several languages, yielding one event per language as it
+    finishes: {"event": "result", "target_language", ...} or {"event": "error", ...}.
+
+    The source is prepared once and every language's LLM batches share a single pool of
+    `max_workers` (default TRANSLATION_CONCURRENCY) workers. `run(target_language, prepared,
+    executor)` overrides the per-language work (used by the agent graph); by default it is
+    translate_document with `options` (glossary, localize, style).
+    """
+    prepared = prepare_document(text)
+    if run is None:
+        def run(lang, prepared, executor):
+            result = translate_document(text, lang, prepared=prepared, executor=executor, **options)
+            return {"localized_text": result["text"], "stats": result["stats"]}
+
+    workers = max(1, min(max_workers or CONCURRENCY, CONCURRENCY))
+    # Build the shared client here so the nested language x batch workers only ever reuse it
+    get_bedrock_client()
+    # Per-language coordinators mostly wait on the shared batch pool, so they get their own threads
+    with ThreadPoolExecutor(max_workers=workers) as batch_pool, \
+            ThreadPoolExecutor(max_workers=max(1, len(target_languages))) as lang_pool:
+        futures = {lang_pool.submit(run, lang, prepared, batch_pool): lang for lang in target_languages}
+        for fut in as_completed(futures):
+            lang = futures[fut]
+            try:
+                yield {"event": "result", "target_language": lang, **fut.result()}
+            except Exception as e:
+                print(f"Translation to {lang} failed: {e}")
+                yield {"event": "error", "target_language": lang, "error": str(e)}
+
+def localize_text(text: str, target_language: str, glossary: dict | None = None, localize: bool = False) -> str:
+    """
+    Translates and localizes a given text using direct Bedrock API,
+    reusing the translation memory for previously translated segments.
+    """
+    return translate_document(text, target_language, glossary, localize)["text"]
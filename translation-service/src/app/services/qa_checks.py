@@ -0,0 +1,140 @@
+import re
+import unicodedata
+from collections import Counter, deque
+from typing import List, Dict, Any, Optional, Tuple
+from .segmenter import protect, TOKEN_PATTERN
+
+# A run of this many consecutive source words copied into the translation counts as an
+# untranslated fragment; shorter runs are usually names, product terms or code identifiers.
+LEFTOVER_RUN_WORDS = 4
+_WORD = re.compile(r"[^\W\d_]+(?:['’-][^\W\d_]+)*", re.UNICODE)
+_NUMBER = re.compile(r"\d+(?:[.,\u00a0\u202f]\d+| \d{3}(?!\d))*")
+
+class AhoCorasick:
+    """Case-insensitive multi-pattern matcher reporting whole-word matches only."""
+
+    def __init__(self, patterns: List[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.out: List[List[str]] = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str) -> None:
+        state = 0
+        for ch in pattern.lower():
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+                nxt = self.goto[state][ch] = len(self.goto) - 1
+            state = nxt
+        self.out[state].append(pattern)
+
+    def _build(self) -> None:
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, text: str) -> set:
+        """Patterns occurring in `text` bounded by non-word characters."""
+        found, state, lowered = set(), 0, text.lower()
+        for i, ch in enumerate(lowered):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for pattern in self.out[state]:
+                start, end = i - len(pattern) + 1, i + 1
+                if (start == 0 or not lowered[start - 1].isalnum()) and \
+                        (end == len(lowered) or not lowered[end].isalnum()):
+                    found.add(pattern)
+        return found
+
+def _glossary_terms(glossary: Optional[dict]) -> Dict[str, str]:
+    return {k.strip(): v.strip() for k, v in (glossary or {}).items()
+            if isinstance(k, str) and isinstance(v, str) and k.strip() and v.strip()}
+
+def _leftover_run(source: str, output: str) -> Optional[str]:
+    """First run of LEFTOVER_RUN_WORDS consecutive source words copied verbatim, if any."""
+    src = [w.lower() for w in _WORD.findall(source)]
+    out = [w.lower() for w in _WORD.findall(output)]
+    if len(src) < LEFTOVER_RUN_WORDS or len(out) < LEFTOVER_RUN_WORDS:
+        return None
+    runs = {tuple(src[i:i + LEFTOVER_RUN_WORDS]) for i in range(len(src) - LEFTOVER_RUN_WORDS + 1)}
+    for i in range(len(out) - LEFTOVER_RUN_WORDS + 1):
+        run = tuple(out[i:i + LEFTOVER_RUN_WORDS])
+        if run in runs:
+            return " ".join(run)
+    return None
+
+def _digits(text: str) -> Counter:
+    # Compare digit sequences only, so 1,000.5 and 1 000,5 count as the same number; any
+    # script's digits are mapped to ASCII, so Arabic-Indic or Devanagari 100 equals 100
+    return Counter("".join(str(unicodedata.decimal(c)) for c in n if c.isdecimal())
+                   for n in _NUMBER.findall(text))
+
+def check_segment(source: str, output: str, glossary: Dict[str, str],
+                  source_terms: AhoCorasick, target_terms: AhoCorasick,
+                  check_numbers: bool = True) -> List[str]:
+    """Human-readable problems found in one translated segment."""
+    issues = []
+    masked_source, source_spans = protect(source)
+    masked_output, output_spans = protect(output)
+    found = target_terms.find(masked_output)
+    missing = [glossary[t] for t in sorted(source_terms.find(masked_source)) if glossary[t] not in found]
+    if missing:
+        issues.append(f"glossary terms missing: {', '.join(missing)}")
+
+    if TOKEN_PATTERN.search(output):
+        issues.append("unresolved placeholder tokens")
+    expected, actual = Counter(source_spans), Counter(output_spans)
+    if expected != actual:
+        lost = list((expected - actual).elements())
+        added = list((actual - expected).elements())
+        issues.append("placeholders/code/links changed" +
+                      (f"; missing {lost}" if lost else "") + (f"; unexpected {added}" if added else ""))
+
+    if check_numbers and _digits(masked_source) != _digits(masked_output):
+        issues.append("numbers differ from source")
+
+    run = _leftover_run(masked_source, masked_output)
+    if run:
+        issues.append(f"untranslated source text: \"{run}\"")
+    return issues
+
+def check_segments(segments: List[Dict[str, Any]], glossary: Optional[dict] = None,
+                   localize: bool = False) -> List[Dict[str, Any]]:
+    """
+    Deterministic QA over translated segments (as produced by translate_document).
+    Returns [{"index", "source", "translation", "issues"}] for segments with problems;
+    number checks are skipped when `localize` is on since units and dates may be adapted.
+    """
+    terms = _glossary_terms(glossary)
+    source_terms = AhoCorasick(list(terms))
+    target_terms = AhoCorasick(list(set(terms.values())))
+    failures = []
+    for i, s in enumerate(segments):
+        if not s.get("translate") or "output" not in s:
+            continue
+        issues = check_segment(s["text"], s["output"], terms, source_terms, target_terms, not localize)
+        if issues:
+            failures.append({"index": i, "source": s["text"], "translation": s["output"], "issues": issues})
+    return failures
+
+def passing_pairs(pairs: List[Tuple[str, str]], glossary: Optional[dict] = None,
+                  localize: bool = False) -> List[Tuple[str, str]]:
+    """The (source, translation) pairs with no QA issues; only these are safe to cache."""
+    terms = _glossary_terms(glossary)
+    source_terms = AhoCorasick(list(terms))
+    target_terms = AhoCorasick(list(set(terms.values())))
+    return [(source, output) for source, output in pairs
+            if not check_segment(source, output, terms, source_terms, target_terms, not localize)]
@@ -0,0 +1,109 @@
+import re
+from typing import List, Dict, Any, Tuple
+
+# Separators are kept as their own non-translatable segments so the document can be
+# reassembled byte-for-byte around the translated sentences.
+_SENTENCE_SPLIT = re.compile(r"((?<=[.!?])\s+)")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_RULE = re.compile(r"^\s*([-*_])(\s*\1){2,}\s*$")
+_TABLE_DIVIDER = re.compile(r"^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$")
+# Markdown block prefixes: headings, blockquotes, bullets, numbered items, task boxes
+_BLOCK_PREFIX = re.compile(r"^(\s*(?:#{1,6}\s+|>\s?|[-*+]\s+(?:\[[ xX]\]\s+)?|\d+[.)]\s+)*)")
+
+# Inline spans that must come back untouched: code, URLs, link targets, HTML tags,
+# template placeholders ({name}, {{name}}, ${name}, %s, %(name)s).
+_PROTECTED = re.compile(
+    r"`[^`\n]+`"
+    r"|\]\([^)\s]+\)"
+    r"|https?://[^\s)>\]]+"
+    r"|<[A-Za-z/][^>\n]*>"
+    r"|\{\{[^{}\n]+\}\}|\$\{[^{}\n]+\}|\{[A-Za-z0-9_.]+\}"
+    r"|%\([A-Za-z0-9_]+\)[sdif]|%[sdif]"
+)
+TOKEN_FORMAT = "⟦{}⟧"  # ⟦n⟧
+TOKEN_PATTERN = re.compile("⟦(\\d+)⟧")
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token)."""
+    return (len(text or "") + 3) // 4
+
+def normalize_segment(text: str) -> str:
+    """Whitespace-normalized form used as the translation-memory key."""
+    return " ".join((text or "").split())
+
+def protect(text: str) -> Tuple[str, List[str]]:
+    """Replace protected inline spans with ⟦n⟧ tokens; returns (masked text, originals)."""
+    spans: List[str] = []
+
+    def _mask(m):
+        spans.append(m.group(0))
+        return TOKEN_FORMAT.format(len(spans) - 1)
+
+    return _PROTECTED.sub(_mask, text), spans
+
+def restore(text: str, spans: List[str]) -> str:
+    """Put protected spans back; unknown token numbers are left as-is for QA to flag."""
+    return TOKEN_PATTERN.sub(lambda m: spans[int(m.group(1))] if int(m.group(1)) < len(spans) else m.group(0), text)
+
+def _sep(segments: List[Dict[str, Any]], text: str) -> None:
+    if not text:
+        return
+    if segments and not segments[-1]["translate"]:
+        segments[-1]["text"] += text
+    else:
+        segments.append({"text": text, "translate": False})
+
+def _add_prose(segments: List[Dict[str, Any]], text: str) -> None:
+    """Split inline text into sentences; whitespace around them stays non-translatable."""
+    for i, part in enumerate(_SENTENCE_SPLIT.split(text)):
+        if not part:
+            continue
+        if i % 2 == 1 or not part.strip() or not re.search(r"[^\W\d_]", part):
+            _sep(segments, part)
+            continue
+        core = part.strip()
+        start = part.index(core)
+        _sep(segments, part[:start])
+        segments.append({"text": core, "translate": True})
+        _sep(segments, part[start + len(core):])
+
+def segment_text(text: str) -> List[Dict[str, Any]]:
+    """
+    Split Markdown/plain text into segments.
+    Returns [{"text": str, "translate": bool}]. Fenced code, rules, table dividers and block
+    prefixes (#, >, -, 1.) are non-translatable; headings, list items, table cells and
+    paragraphs are split into sentence segments.
+    """
+    segments: List[Dict[str, Any]] = []
+    in_fence = None
+    for line in (text or "").splitlines(keepends=True):
+        body = line.rstrip("\r\n")
+        newline = line[len(body):]
+        fence = _FENCE.match(body)
+        if in_fence:
+            _sep(segments, line)
+            if fence and fence.group(1) == in_fence:
+                in_fence = None
+            continue
+        if fence:
+            in_fence = fence.group(1)
+            _sep(segments, line)
+            continue
+        if not body.strip() or _RULE.match(body) or _TABLE_DIVIDER.match(body):
+            _sep(segments, line)
+            continue
+        if body.lstrip().startswith("|"):
+            # Table row: translate each cell between the pipes
+            for i, cell in enumerate(re.split(r"(\|)", body)):
+                (_sep if i % 2 == 1 or not cell.strip() else _add_prose)(segments, cell)
+            _sep(segments, newline)
+            continue
+        prefix = _BLOCK_PREFIX.match(body).group(1)
+        _sep(segments, prefix)
+        _add_prose(segments, body[len(prefix):])
+        _sep(segments, newline)
+    return segments
+
+def reassemble(segments: List[Dict[str, Any]]) -> str:
+    """Join segments in order, using each segment's "output" when it has one."""
+    return "".join(s.get("output", s["text"]) for s in segments)
@@ -0,0 +1,165 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import sqlite3
+import threading
+from typing import List, Dict, Tuple, Optional
+import numpy as np
+from .segmenter import normalize_segment
+
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+TM_PATH = os.getenv("TRANSLATION_MEMORY_PATH", os.path.join(_BASE_DIR, "data", "translation_memory.db"))
+FUZZY_THRESHOLD = float(os.getenv("TM_FUZZY_THRESHOLD", "0.5"))
+
+# MinHash over character 4-grams; 16 LSH bands of 4 rows put the candidate threshold
+# near Jaccard 0.5, matching FUZZY_THRESHOLD.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE = 4
+_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.RandomState(1337)
+_A = _rng.randint(1, 2 ** 31 - 1, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, 2 ** 31 - 1, size=NUM_PERM).astype(np.uint64)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tm_entries (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_hash TEXT NOT NULL,
+    target_language TEXT NOT NULL,
+    glossary_version TEXT NOT NULL,
+    source_text TEXT NOT NULL,
+    target_text TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    UNIQUE (source_hash, target_language, glossary_version)
+);
+CREATE TABLE IF NOT EXISTS tm_lsh (
+    bucket INTEGER NOT NULL,
+    entry_id INTEGER NOT NULL REFERENCES tm_entries (id)
+);
+CREATE INDEX IF NOT EXISTS idx_tm_lsh_bucket ON tm_lsh (bucket);
+"""
+
+def glossary_version(glossary: Optional[dict], localize: bool = False, style: str = "neutral") -> str:
+    """
+    Version tag for everything besides the source text that changes a translation:
+    the glossary contents plus the localize flag and style.
+    """
+    payload = json.dumps({"g": glossary or {}, "l": bool(localize), "s": style or "neutral"},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def _source_hash(text: str) -> str:
+    return hashlib.sha256(normalize_segment(text).encode("utf-8")).hexdigest()
+
+def minhash(text: str) -> np.ndarray:
+    norm = normalize_segment(text).lower()
+    grams = {norm[i:i + SHINGLE] for i in range(max(1, len(norm) - SHINGLE + 1))}
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+def _buckets(signature: np.ndarray, target_language: str) -> List[int]:
+    """One bucket id per band, namespaced by target language."""
+    lang = target_language.lower().encode("utf-8")
+    return [
+        zlib.crc32(lang + bytes([b]) + signature[b * ROWS:(b + 1) * ROWS].tobytes())
+        for b in range(BANDS)
+    ]
+
+class TranslationMemory:
+    """
+    Persistent segment-level translation memory.
+
+    Exact matches are keyed by (normalized source, target language, glossary version).
+    Fuzzy candidates come from a MinHash LSH index over all stored segments for the target
+    language and are meant to be passed to the LLM as hints, not reused verbatim.
+    """
+
+    def __init__(self, path: str = TM_PATH, fuzzy_threshold: float = FUZZY_THRESHOLD):
+        self.path = path
+        self.fuzzy_threshold = fuzzy_threshold
+        self._write_lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def lookup(self, sources: List[str], target_language: str, version: str) -> Dict[str, str]:
+        """Exact matches, as {normalized source: translation}."""
+        by_hash = {_source_hash(s): normalize_segment(s) for s in sources}
+        found = {}
+        hashes = list(by_hash)
+        with self._connect() as conn:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT id, source_hash, target_text FROM tm_entries "
+                    f"WHERE target_language = ? AND glossary_version = ? "
+                    f"AND source_hash IN ({','.join('?' * len(batch))})",
+                    [target_language.lower(), version, *batch],
+                ).fetchall()
+                for r in rows:
+                    found[by_hash[r["source_hash"]]] = r["target_text"]
+                if rows:
+                    conn.executemany("UPDATE tm_entries SET hits = hits + 1 WHERE id = ?",
+                                     [(r["id"],) for r in rows])
+        return found
+
+    def fuzzy(self, source: str, target_language: str, limit: int = 2) -> List[Tuple[str, str, float]]:
+        """
+        Similar stored segments as (source, translation, estimated Jaccard), best first.
+        This includes the same source stored under another glossary version.
+        """
+        signature = minhash(source)
+        buckets = _buckets(signature, target_language)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT DISTINCT e.source_text, e.target_text, e.signature FROM tm_lsh l "
+                f"JOIN tm_entries e ON e.id = l.entry_id "
+                f"WHERE l.bucket IN ({','.join('?' * len(buckets))}) AND e.target_language = ?",
+                [*buckets, target_language.lower()],
+            ).fetchall()
+        scored = {}
+        for r in rows:
+            score = float(np.mean(np.frombuffer(r["signature"], dtype=np.uint64) == signature))
+            if score >= self.fuzzy_threshold and score > scored.get(r["source_text"], ("", 0.0))[1]:
+                scored[r["source_text"]] = (r["target_text"], score)
+        best = sorted(scored.items(), key=lambda kv: kv[1][1], reverse=True)[:limit]
+        return [(src, tgt, round(score, 3)) for src, (tgt, score) in best]
+
+    def store(self, pairs: List[Tuple[str, str]], target_language: str, version: str) -> None:
+        """Insert or update (source, translation) pairs."""
+        lang = target_language.lower()
+        now = time.time()
+        with self._write_lock, self._connect() as conn:
+            for source, target in pairs:
+                norm, key = normalize_segment(source), _source_hash(source)
+                row = conn.execute(
+                    "SELECT id FROM tm_entries WHERE source_hash = ? AND target_language = ? AND glossary_version = ?",
+                    (key, lang, version),
+                ).fetchone()
+                if row:
+                    conn.execute("UPDATE tm_entries SET target_text = ? WHERE id = ?", (target, row["id"]))
+                    continue
+                signature = minhash(norm)
+                cur = conn.execute(
+                    "INSERT INTO tm_entries (source_hash, target_language, glossary_version, source_text, "
+                    "target_text, signature, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (key, lang, version, norm, target, signature.tobytes(), now),
+                )
+                conn.executemany(
+                    "INSERT INTO tm_lsh (bucket, entry_id) VALUES (?, ?)",
+                    [(b, cur.lastrowid) for b in _buckets(signature, lang)],
+                )
+
+# Singleton instance
+translation_memory = TranslationMemory()
@@ -0,0 +1,24 @@
+from app.services.language_id import detect, language_code
+
+PORTUGUESE = ("O sistema foi atualizado ontem e agora os usuários podem enviar arquivos pelo portal "
+              "sem nenhum problema. Você pode fazer o download do relatório completo na página inicial.")
+SPANISH = ("El sistema se actualizó ayer y ahora los usuarios pueden enviar archivos por el portal "
+           "sin ningún problema. Usted puede descargar el informe completo en la página de inicio.")
+CHINESE = "这是一个关于信息安全基础知识的培训课程，学员将学习如何保护公司数据。"
+
+def test_detects_plain_portuguese():
+    assert detect(PORTUGUESE) == "pt"
+    assert detect(SPANISH) == "es"
+
+def test_regional_and_script_variants_match_detected_language():
+    assert language_code("pt-BR") == detect(PORTUGUESE)
+    assert language_code("pt_BR") == "pt"
+    assert language_code("zh-Hans") == detect(CHINESE)
+    assert language_code("zh-Hant-TW") == "zh"
+
+def test_language_name_aliases():
+    assert language_code("Brazilian Portuguese") == "pt"
+    assert language_code("Portuguese (Brazil)") == "pt"
+    assert language_code("Simplified Chinese") == "zh"
+    assert language_code("Chinese (Simplified)") == "zh"
+    assert language_code("Klingon") is None